@@ -1,26 +1,361 @@
-from flask import Flask, request, jsonify
+import time
+
+# Measured from the first line so cold starts include import cost
+_PROCESS_STARTED = time.perf_counter()
+
+from dotenv import load_dotenv
+
+# Read .env before the modules below read their settings
+load_dotenv()
+
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify
 from sqlalchemy.exc import IntegrityError
 from models.user import User
-from utils.db_config import Session
+from models import library
+from utils.db_config import configure_engine, db_session
 from models.tmdb_model import *
+from models import tmdb_async
+from models.catalog_sync import CatalogSync, start_background_sync
+from models.genre_index import normalize_genre_name
+from models.locales import DEFAULT_LANGUAGE, normalize_language, normalize_region
+from utils.auth import SharedTokenStore, TokenStore
+from utils.cache import TTLCache
+from utils.circuit_breaker import UpstreamUnavailable, stale_results, start_stale_tracking, stop_stale_tracking
 from utils.create_db import create_db
+from utils.http_cache import EncodedPayload, finalize_response, payload_response
+from utils.logger import configure_logger
+from utils.metrics import registry, track_caches, track_flights
+from utils.profiling import RequestProfile, profiled
+from utils.rate_limit import UpstreamRateLimited
 
 
 import hashlib
+import hmac
+import json
+import logging
+import math
 import os
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+api = Blueprint('api', __name__)
+
+# Limits for /batch-recommendations
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Session tokens issued by /login; kept in a file shared by the workers when a multi-worker server configures one
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH")
+if SESSION_STORE_PATH:
+    sessions = SharedTokenStore(SESSION_STORE_PATH, secret=os.getenv("SESSION_SECRET"), ttl=SESSION_TTL,
+                                max_tokens=int(os.getenv("SESSION_MAX_TOKENS", "100000")))
+else:
+    sessions = TokenStore(secret=os.getenv("SESSION_SECRET"), ttl=SESSION_TTL,
+                          max_tokens=int(os.getenv("SESSION_MAX_TOKENS", "100000")))
+
+# Result counts for /search-movies
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 100
+
+# Serialized and compressed bodies of the most polled lists, reused across requests
+payload_cache = TTLCache(max_bytes=int(os.getenv("PAYLOAD_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+                         stale_factor=0, sizeof=lambda payload: payload.size)
+# Seconds a genre list body is reused; trending bodies live as long as their snapshot
+GENRE_PAYLOAD_TTL = 300
+
+# Most ratings or watchlist movies accepted in one request
+LIBRARY_MAX_ITEMS = int(os.getenv("LIBRARY_MAX_ITEMS", "1000"))
+
+# Per-route traffic, labelled with the URL rule so ids in paths don't multiply series
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Requests served, by route, method and status.", ("route", "method", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Time to build each response in seconds, by route and method.",
+    ("route", "method"))
+
+track_caches(lambda: {
+    **{f"tmdb:{partition}": stats for partition, stats in response_cache.stats().items()},
+    "payload": payload_cache.stats(),
+    "title_resolver": title_resolver.stats(),
+    **({"shared": shared_cache.stats()} if shared_cache is not None else {}),
+})
+# Identical TMDB calls made at once share one request
+track_flights(upstream_flights.stats)
+
+def create_app(config=None):
+    """
+    Build the Flask app.
+
+    Startup never deletes data: the schema is only created or upgraded
+    when the database is behind the latest migration. The database engine
+    and TMDB clients are created on first use.
 
-app = Flask(__name__)
+    Args:
+        config (dict): Overrides for the defaults below, e.g.
+            ``{"DATABASE_URL": "sqlite:///test.db", "SNAPSHOT_REFRESH_INTERVAL": 0}``.
+
+    Returns:
+        Flask: The configured app.
+    """
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.config.from_mapping(
+        DATABASE_URL=os.getenv("DATABASE_URL"),
+        DB_MODE=os.getenv("DB_MODE"),
+        MIGRATE_ON_START=os.getenv("MIGRATE_ON_START", "1").lower() in ("1", "true", "yes"),
+        # Keep the movies in the local catalog in step with TMDB's changes feed; off unless deployed
+        CATALOG_SYNC_INTERVAL=float(os.getenv("CATALOG_SYNC_INTERVAL", "0")),
+        # Lock file that lets only one worker of a multi-worker server run the sync
+        CATALOG_SYNC_LOCK=os.getenv("CATALOG_SYNC_LOCK"),
+        # Re-fetch the trending and popular lists served from memory
+        SNAPSHOT_REFRESH_INTERVAL=float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "900")),
+        # Share of requests profiled, and the X-Profile header value that profiles one on demand
+        PROFILE_SAMPLE_RATE=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+        PROFILE_TOKEN=os.getenv("PROFILE_TOKEN"),
+        PROFILE_DIR=os.getenv("PROFILE_DIR", "profiles"),
+    )
+    app.config.from_mapping(config or {})
+
+    if app.config["DATABASE_URL"] or app.config["DB_MODE"]:
+        configure_engine(url=app.config["DATABASE_URL"], mode=app.config["DB_MODE"])
+    if app.config["MIGRATE_ON_START"]:
+        create_db()
+    if app.config["CATALOG_SYNC_INTERVAL"] > 0:
+        start_background_sync(CatalogSync(get_client(), catalog, title_index=title_index),
+                              app.config["CATALOG_SYNC_INTERVAL"], app.config["CATALOG_SYNC_LOCK"])
+    if app.config["SNAPSHOT_REFRESH_INTERVAL"] > 0:
+        list_snapshots.start_background_refresh(app.config["SNAPSHOT_REFRESH_INTERVAL"])
+
+    app.register_blueprint(api)
+    _track_requests(app)
+    _track_stale_results(app)
+    _track_profiles(app)
+    _track_startup(app, started)
+    return app
+
+def _track_requests(app):
+    """Count every request and time it into HTTP_LATENCY; streamed bodies are timed to their first byte."""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+            HTTP_LATENCY.observe(time.perf_counter() - started, route, request.method)
+        return response
+
+def _track_stale_results(app):
+    """Mark responses built from expired TMDB data, served while TMDB was failing, with a Warning header."""
+
+    @app.before_request
+    def start_stale_results():
+        g.stale_token = start_stale_tracking()
+
+    @app.after_request
+    def mark_stale_response(response):
+        if stale_results():
+            response.headers['Warning'] = '110 - "Response is Stale"'
+        return response
+
+    @app.teardown_request
+    def stop_stale_results(exception=None):
+        token = g.pop('stale_token', None)
+        if token is not None:
+            stop_stale_tracking(token)
+
+def _track_startup(app, started):
+    """Log how long the app took to build and to serve its first request."""
+    ready = time.perf_counter()
+    timings = app.extensions['startup'] = {
+        "import_ms": round((started - _PROCESS_STARTED) * 1000, 1),
+        "create_app_ms": round((ready - started) * 1000, 1),
+        "first_request_ms": None,
+    }
+    logger.info("App ready in %.1f ms (%.1f ms of imports)", timings["create_app_ms"], timings["import_ms"])
+    lock = threading.Lock()
+
+    @app.after_request
+    def record_first_request(response):
+        if timings["first_request_ms"] is None:
+            with lock:
+                if timings["first_request_ms"] is None:
+                    timings["first_request_ms"] = round((time.perf_counter() - _PROCESS_STARTED) * 1000, 1)
+                    logger.info("First request served %.1f ms after process start", timings["first_request_ms"])
+        return response
+
+def _track_profiles(app):
+    """
+    Profile the requests picked by PROFILE_SAMPLE_RATE or sent with ``X-Profile: <PROFILE_TOKEN>``.
+
+    Nothing is installed unless one of the two is set, so apps that don't
+    profile pay nothing per request.
+    """
+    rate = app.config["PROFILE_SAMPLE_RATE"]
+    token = app.config["PROFILE_TOKEN"]
+    directory = app.config["PROFILE_DIR"]
+    if rate <= 0 and not token:
+        return
+
+    for endpoint, view in list(app.view_functions.items()):
+        app.view_functions[endpoint] = profiled(view)
+
+    @app.before_request
+    def start_profile():
+        header = request.headers.get('X-Profile')
+        requested = token is not None and header is not None and hmac.compare_digest(header, token)
+        if requested or (rate > 0 and random.random() < rate):
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            g.profile = RequestProfile(f"{request.method} {route}")
+            g.profile.start()
+
+    @app.after_request
+    def tag_profile(response):
+        if 'profile' in g:
+            response.headers['X-Profile-Id'] = g.profile.id
+        return response
+
+    @app.teardown_request
+    def save_profile(exception=None):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.stop()
+            try:
+                paths = profile.save(directory)
+            except OSError:
+                logger.exception("Could not save profile %s", profile.id)
+            else:
+                logger.info("Profiled %s in %.1f ms: %s", profile.name, profile.elapsed * 1000, ", ".join(paths))
+
+def _paging(data):
+    """
+    Read the optional "pages" and "limit" fields of a list request.
 
-# Database session setup
-create_db()
-session = Session()
+    Returns:
+        tuple: (pages, limit), or None if the client asked for neither.
 
-@app.route('/health-check', methods=['GET'])
+    Raises:
+        ValueError: If either field is not a positive integer.
+    """
+    pages = data.get('pages')
+    limit = data.get('limit')
+    if pages is None and limit is None:
+        return None
+
+    for name, value in (('pages', pages), ('limit', limit)):
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+            raise ValueError(f"'{name}' must be a positive integer.")
+    if pages is None:
+        pages = -(-limit // PAGE_SIZE)
+    return min(pages, MAX_PAGES), limit
+
+def _locale(data):
+    """
+    Read the optional "language" and "region" fields of a request.
+
+    Returns:
+        tuple: (language, region), defaulting to DEFAULT_LANGUAGE and None.
+
+    Raises:
+        ValueError: If either field is malformed.
+    """
+    language = data.get('language')
+    region = data.get('region')
+    return (normalize_language(language) if language is not None else DEFAULT_LANGUAGE,
+            normalize_region(region) if region is not None else None)
+
+def _session_user():
+    """Return the username of the request's bearer token, or None; never touches the database."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return None
+    return sessions.verify(token.strip())
+
+def _library_items(data, field):
+    """
+    Read the list a ratings or watchlist request sends in ``field``.
+
+    Raises:
+        ValueError: If the field is not a list of at most LIBRARY_MAX_ITEMS items.
+    """
+    items = data.get(field) if data else None
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"A non-empty list of {field} is required.")
+    if len(items) > LIBRARY_MAX_ITEMS:
+        raise ValueError(f"At most {LIBRARY_MAX_ITEMS} {field} are allowed per request.")
+    return items
+
+def _snapshot_pages(titles):
+    """Yield titles already in memory as ``(page, titles)`` batches of PAGE_SIZE."""
+    for start in range(0, len(titles), PAGE_SIZE):
+        yield start // PAGE_SIZE + 1, titles[start:start + PAGE_SIZE]
+
+def _ndjson_response(page_iter, limit=None):
+    """Stream (page, titles) batches as one JSON object per line, in page order."""
+    def generate():
+        sent = 0
+        try:
+            for page, titles in page_iter:
+                for title in titles:
+                    if limit is not None and sent >= limit:
+                        return
+                    yield json.dumps({"page": page, "title": title}) + "\n"
+                    sent += 1
+        finally:
+            page_iter.close()
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def _payload(value):
+    """Serialize a value byte for byte as jsonify does, with its ETag and compressed forms."""
+    # Built by the JSON provider itself, so its separators, indentation in debug mode and key order all apply
+    return EncodedPayload(current_app.json.response(value).get_data())
+
+@api.after_request
+def add_etag_and_compress(response):
+    """Tag JSON bodies for If-None-Match and compress them for clients that accept it."""
+    return finalize_response(response, request)
+
+@api.errorhandler(UpstreamRateLimited)
+def upstream_rate_limited(error):
+    """Tell the client when to come back instead of failing with a 500."""
+    response = jsonify({"error": "TMDB is rate limiting us; please retry shortly."})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(math.ceil(error.retry_after))
+    return response
+
+@api.errorhandler(UpstreamUnavailable)
+def upstream_unavailable(error):
+    """Fail fast while TMDB's circuit is open and nothing cached can stand in."""
+    response = jsonify({"error": "TMDB is currently unavailable; please retry shortly."})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(math.ceil(error.retry_after), 1))
+    return response
+
+@api.teardown_app_request
+def remove_db_session(exception=None):
+    """Return the request's database connection to the pool."""
+    db_session.remove()
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request, TMDB, database and cache metrics in the Prometheus text format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@api.route('/health-check', methods=['GET'])
 def health_check():
     """Verify the app is running."""
     return jsonify({"status": "ok"}), 200
 
-@app.route('/create-account', methods=['POST'])
+@api.route('/create-account', methods=['POST'])
 def create_account():
     """
     Create a new user account.
@@ -41,15 +376,15 @@ def create_account():
     new_user = User(username=username, salt=salt, hashed_password=hashed_password)
 
     try:
-        session.add(new_user)
-        session.commit()
+        db_session.add(new_user)
+        db_session.commit()
     except IntegrityError:
-        session.rollback()
+        db_session.rollback()
         return jsonify({"error": "Username already exists."}), 409
 
     return jsonify({"message": "Account created successfully."}), 201
 
-@app.route('/delete-user', methods=['DELETE'])
+@api.route('/delete-user', methods=['DELETE'])
 def delete_user():
     """
         Delete an existing user account.
@@ -62,20 +397,21 @@ def delete_user():
         # Extract and validate required fields
         username = data.get('username')
 
-        print(username)
+        logger.info("Deleting user %s", username)
 
         if not username:
             return jsonify({'error': 'Invalid input, username is required'})
 
         # Call the User function to delete the user from the database
         User.delete_user(username)
+        sessions.revoke_user(username)
 
         return jsonify({'status': 'user deleted', 'username': username})
     except Exception as e:
         return jsonify({'error': str(e)})
 
 
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
     """
     Log in a user.
@@ -89,7 +425,7 @@ def login():
         return jsonify({"error": "Username and password are required."}), 400
 
     # Retrieve user from the database
-    user = session.query(User).filter(User.username == username).first()
+    user = db_session.query(User).filter(User.username == username).first()
     if not user:
         return jsonify({"error": "Invalid username or password."}), 401
 
@@ -98,9 +434,24 @@ def login():
     if hashed_password != user.hashed_password:
         return jsonify({"error": "Invalid username or password."}), 401
 
-    return jsonify({"message": "Login successful."}), 200
+    # Later calls can authenticate with the token instead of the password
+    token = sessions.issue(username)
 
-@app.route('/update-password', methods=['POST'])
+    return jsonify({"message": "Login successful.", "token": token, "expires_in": int(SESSION_TTL)}), 200
+
+@api.route('/session', methods=['GET'])
+def current_session():
+    """
+    Identify the user of a session token.
+    Expects header: Authorization: Bearer <token>
+    """
+    username = _session_user()
+    if username is None:
+        return jsonify({"error": "A valid session token is required."}), 401
+
+    return jsonify({"username": username}), 200
+
+@api.route('/update-password', methods=['POST'])
 def update_password():
     """
     Update the user's password.
@@ -115,7 +466,7 @@ def update_password():
         return jsonify({"error": "Username, old password, and new password are required."}), 400
 
     # Retrieve user from the database
-    user = session.query(User).filter(User.username == username).first()
+    user = db_session.query(User).filter(User.username == username).first()
     if not user:
         return jsonify({"error": "Invalid username or password."}), 401
 
@@ -131,32 +482,122 @@ def update_password():
     # Update the database
     user.salt = new_salt
     user.hashed_password = new_hashed_password
-    session.commit()
+    db_session.commit()
+
+    # Sessions opened with the old password end here; the caller gets a fresh one
+    sessions.revoke_user(username)
+    token = sessions.issue(username)
+
+    return jsonify({"message": "Password updated successfully.", "token": token}), 200
+
+@api.route('/ratings', methods=['POST'])
+def rate_movies():
+    """
+    Rate movies in bulk; rating a movie again replaces the old rating.
+    Expects header: Authorization: Bearer <token>
+    Expects JSON: {"ratings": [{"movie_id": int, "rating": number (0.5-10)}, ...]}
+    """
+    username = _session_user()
+    user_id = library.user_id_for(db_session, username) if username else None
+    if user_id is None:
+        return jsonify({"error": "A valid session token is required."}), 401
+
+    try:
+        ratings = library.parse_ratings(_library_items(request.get_json(silent=True), 'ratings'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    saved = library.add_ratings(db_session, user_id, ratings)
+    db_session.commit()
+
+    return jsonify({"saved": saved}), 200
+
+@api.route('/watchlist', methods=['GET', 'POST', 'DELETE'])
+def watchlist():
+    """
+    Read, add to or remove from the user's watchlist.
+    Expects header: Authorization: Bearer <token>
+    Expects JSON for POST and DELETE: {"movie_ids": [int, ...]}
+    """
+    username = _session_user()
+    user_id = library.user_id_for(db_session, username) if username else None
+    if user_id is None:
+        return jsonify({"error": "A valid session token is required."}), 401
+
+    if request.method == 'GET':
+        return jsonify({"watchlist": library.watchlist(db_session, user_id)}), 200
+
+    try:
+        movie_ids = library.parse_movie_ids(_library_items(request.get_json(silent=True), 'movie_ids'))
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    if request.method == 'POST':
+        result = {"added": library.add_to_watchlist(db_session, user_id, movie_ids)}
+    else:
+        result = {"removed": library.remove_from_watchlist(db_session, user_id, movie_ids)}
+    db_session.commit()
+
+    return jsonify(result), 200
+
+@api.route('/get-personal-recommendations', methods=['GET'])
+def get_personal_recommendations():
+    """
+    Get the user's precomputed recommendations.
+    Expects header: Authorization: Bearer <token>
+    """
+    username = _session_user()
+    if username is None:
+        return jsonify({"error": "A valid session token is required."}), 401
+
+    # Built offline by models.personal_recommendations; nothing is computed here
+    recommendations, computed_at = library.personal_recommendations(db_session, username)
 
-    return jsonify({"message": "Password updated successfully."}), 200
+    return jsonify({"recommendations": recommendations, "computed_at": computed_at}), 200
 
-@app.route('/get-recommendation-from-movies', methods=['POST'])
-def get_recommendation_from_movies():
+@api.route('/get-recommendation-from-movies', methods=['POST'])
+async def get_recommendation_from_movies():
     """
     Get movie recommendations based on other movies.
-    Expects JSON: {"title": "string"}
+    Expects JSON: {"title": "string", "mode": "tmdb" | "local" (optional), "language": "string" (optional)}
     """
     data = request.get_json()
     title = data.get('title')
+    mode = data.get('mode', 'tmdb')
 
     if not title:
         return jsonify({"error": "Title and region are required."}), 400
+    if mode not in ('tmdb', 'local'):
+        return jsonify({"error": "Mode must be 'tmdb' or 'local'."}), 400
+    try:
+        language, _ = _locale(data)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    if mode == 'local':
+        # Rank neighbours from the precomputed local similarity index
+        try:
+            recommendations = get_local_recommendations(title)
+        except FileNotFoundError:
+            return jsonify({"error": "The local recommendation index is not available."}), 503
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 404
+        return jsonify({"recommendations": recommendations}), 200
 
     # Get recommendations from TMDB
-    recommendations = get_recommendations_from_movie(title)
+    try:
+        recommendations = await tmdb_async.get_recommendations_from_movie(title, language)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
 
     return jsonify({"recommendations": recommendations}), 200
 
-@app.route('/get-recommendation-from-genre', methods=['POST'])
-def get_recommendation_from_genre():
+@api.route('/get-recommendation-from-genre', methods=['POST'])
+async def get_recommendation_from_genre():
     """
     Get movie recommendations based on genre.
-    Expects JSON: {"genre": "string"}
+    Expects JSON: {"genre": "string", "pages": int (optional), "limit": int (optional),
+                   "language": "string" (optional), "region": "string" (optional)}
     """
     data = request.get_json()
     genre = data.get('genre')
@@ -164,16 +605,67 @@ def get_recommendation_from_genre():
     if not genre:
         return jsonify({"error": "Genre and region are required."}), 400
 
-    # Get recommendations from TMDB
-    recommendations = get_recommendations_for_genre(genre)
+    try:
+        paging = _paging(data)
+        language, region = _locale(data)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    if paging:
+        pages, limit = paging
+        try:
+            # Resolves the genre and fetches the first page before the stream starts
+            page_iter = iter_recommendations_for_genre(genre, pages, language, region)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 404
+        return _ndjson_response(page_iter, limit)
+
+    # Reuse the encoded body while it is fresh; clients that have it get a 304
+    key = ("genre", normalize_genre_name(genre), language, region)
+    payload = payload_cache.get(key)
+    if payload is None:
+        # Get recommendations from TMDB; unknown genres are rejected without calling it
+        try:
+            recommendations = await tmdb_async.get_recommendations_for_genre(genre, language, region)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 404
+        payload = _payload({"recommendations": recommendations})
+        # Not kept if built from stale data, so it isn't served on once TMDB recovers
+        if not stale_results():
+            payload_cache.set(key, payload, GENRE_PAYLOAD_TTL)
+
+    return payload_response(current_app.response_class, request, payload)
+
+@api.route('/batch-recommendations', methods=['POST'])
+async def batch_recommendations():
+    """
+    Get recommendations for several titles and genres in one call.
+    Expects JSON: {"queries": [{"title": "string"} or {"genre": "string"}, ...],
+                   "language": "string" (optional), "region": "string" (optional)}
+    """
+    data = request.get_json()
+    queries = data.get('queries') if data else None
 
-    return jsonify({"recommendations": recommendations}), 200
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "A non-empty list of queries is required."}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({"error": f"At most {BATCH_MAX_QUERIES} queries are allowed."}), 400
+    try:
+        language, region = _locale(data)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
 
-@app.route('/get-random-recommendation', methods=['POST'])
-def get_random_recommendation_endpoint():
+    # Run every query concurrently; failures are reported per item
+    results = await tmdb_async.get_batch_recommendations(queries, max_concurrency=BATCH_MAX_CONCURRENCY,
+                                                         language=language, region=region)
+
+    return jsonify({"results": results}), 200
+
+@api.route('/get-random-recommendation', methods=['POST'])
+async def get_random_recommendation_endpoint():
     """
     Get a random movie recommendation.
-    Expects JSON: {"region": "string"}
+    Expects JSON: {"region": "string", "pages": int (optional), "limit": int (optional),
+                   "language": "string" (optional)}
     """
     data = request.get_json()
 
@@ -185,8 +677,15 @@ def get_random_recommendation_endpoint():
         return jsonify({"error": "Region is required."}), 400
 
     try:
-        # Pass the region to the helper function
-        recommendations = get_random_recommendation()
+        paging = _paging(data)
+        language, region = _locale(data)
+        if paging:
+            # Sampled from memory; pages past the snapshot are streamed from TMDB
+            pages, limit = paging
+            return _ndjson_response(iter_random_popular_movies(region, pages, language), limit)
+
+        # Sampled from the popular list held in memory; TMDB is not called
+        recommendations = sample_popular_movies(region, language=language)
 
         # Respond appropriately if no recommendations are found
         if not recommendations:
@@ -195,31 +694,61 @@ def get_random_recommendation_endpoint():
         return jsonify({"recommendations": recommendations}), 200
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 400
+    except (UpstreamRateLimited, UpstreamUnavailable):
+        raise
     except Exception as e:
         return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
 
-@app.route('/get-movie-summary', methods=['POST'])
-def get_movie_summary_endpoint():
+@api.route('/get-movie-summary', methods=['POST'])
+async def get_movie_summary_endpoint():
     """
     Get a summary of a movie.
-    Expects JSON: {"title": "string"}
+    Expects JSON: {"title": "string", "language": "string" (optional)}
     """
     data = request.get_json()
     title = data.get('title')
 
     if not title:
         return jsonify({"error": "Title is required."}), 400
+    try:
+        language, _ = _locale(data)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
 
     # Get movie summary from TMDB
-    summary = get_movie_summary(title)
+    try:
+        summary = await tmdb_async.get_movie_summary(title, language)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
 
     return jsonify({"summary": summary, "status": "ok"}), 200
 
-@app.route('/get-trending-movies', methods=['POST'])
-def get_trending_movies():
+@api.route('/search-movies', methods=['POST'])
+def search_movies_endpoint():
+    """
+    Search movie titles and overviews with free text, e.g. "heist in space".
+    Expects JSON: {"query": "string", "limit": int (optional)}
+    """
+    data = request.get_json()
+    query = data.get('query') if data else None
+    limit = data.get('limit', SEARCH_DEFAULT_LIMIT) if data else SEARCH_DEFAULT_LIMIT
+
+    if not isinstance(query, str) or not query.strip():
+        return jsonify({"error": "Query is required."}), 400
+    if not isinstance(limit, int) or isinstance(limit, bool) or not 1 <= limit <= SEARCH_MAX_LIMIT:
+        return jsonify({"error": f"'limit' must be an integer between 1 and {SEARCH_MAX_LIMIT}."}), 400
+
+    # Ranked locally with BM25; TMDB is not called
+    results = search_movies(query, limit)
+
+    return jsonify({"results": results}), 200
+
+@api.route('/get-trending-movies', methods=['POST'])
+async def get_trending_movies():
     """
     Get trending movies.
-    Expects JSON: {"region": "string"}
+    Expects JSON: {"region": "string", "pages": int (optional), "limit": int (optional),
+                   "language": "string" (optional)}
     """
     data = request.get_json()
     region = data.get('region')
@@ -227,11 +756,32 @@ def get_trending_movies():
     if not region:
         return jsonify({"error": "Region is required."}), 400
 
-    # Get trending movies from TMDB
-    trending_movies = get_trending_movies_tmdb()
+    try:
+        paging = _paging(data)
+        language, region = _locale(data)
+        if paging and paging[0] > list_snapshots.pages:
+            # Deeper than the snapshot goes; stream the rest from TMDB
+            pages, limit = paging
+            return _ndjson_response(iter_trending_movies(pages, language), limit)
+
+        # Served from the trending list held in memory; TMDB is not called
+        if paging:
+            pages, limit = paging
+            snapshot = get_trending_snapshot(region, pages, language)
+            return _ndjson_response(_snapshot_pages([title for _, titles in snapshot for title in titles]), limit)
+        snapshot = list_snapshots.get("trending", region, language)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+
+    # One encoded body per snapshot; a refresh changes the key and so the ETag
+    key = ("trending", language, snapshot.fetched_at)
+    payload = payload_cache.get(key)
+    if payload is None:
+        trending_movies = snapshot.page_titles(1)[0][1] if snapshot.pages else []
+        payload = _payload({"trending_movies": trending_movies, "status": "ok"})
+        payload_cache.set(key, payload, list_snapshots.max_age * 2)
 
-    return jsonify({"trending_movies": trending_movies, "status": "ok"}), 200
+    return payload_response(current_app.response_class, request, payload)
 
-session.close()
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,312 @@
+"""
+Load-test every route against a local fake TMDB.
+
+Starts the fake TMDB server from test/fake_tmdb.py with the chosen
+latency, jitter and error rate, serves the app from a temporary
+database on a local port, and drives each route in turn with
+``--requests`` calls from ``--concurrency`` threads. Inputs rotate over
+the fake's titles, genres, regions and ``--languages``, so runs mix
+cache hits, local catalog answers and upstream calls. Reports throughput and
+p50/p95/p99 latency per route, e.g.:
+
+    python -m benchmarks.bench_load --concurrency 16 --requests 400 --latency 0.05 --jitter 0.02
+
+``--workers N`` serves the app with gunicorn, as in production, instead
+of in-process, e.g. to check that throughput grows with the worker count.
+
+``--save-baseline`` stores the results as JSON. ``--baseline`` compares
+a run with stored results and exits with status 1 if any route lost
+more than ``--tolerance`` of its throughput, got that much slower at
+p50/p95/p99, or failed more often.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from test.fake_tmdb import GENRES, MOVIES, FakeTMDB
+
+TITLES = [movie["title"] for movie in MOVIES]
+GENRE_NAMES = [genre["name"] for genre in GENRES]
+REGIONS = ["US", "GB", "DE"]
+MOVIE_IDS = [movie["id"] for movie in MOVIES]
+PASSWORD = "load-test-password"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _accounts(ctx, i):
+    return {"username": f"load-{ctx['run']}-{i}", "password": PASSWORD}
+
+
+def _language(ctx, i):
+    # Languages other than DEFAULT_LANGUAGE skip the local catalog and go to TMDB
+    return ctx["languages"][i % len(ctx["languages"])]
+
+
+def _auth(ctx, i):
+    return {"Authorization": f"Bearer {ctx['tokens'][i % len(ctx['tokens'])]}"}
+
+
+# (name, method, path, build) where build(ctx, i) returns the JSON body and headers of call i
+SCENARIOS = [
+    ("health-check", "GET", "/health-check", lambda ctx, i: (None, None)),
+    ("create-account", "POST", "/create-account", lambda ctx, i: (_accounts(ctx, i), None)),
+    ("login", "POST", "/login",
+     lambda ctx, i: ({"username": ctx["users"][i % len(ctx["users"])], "password": PASSWORD}, None)),
+    ("session", "GET", "/session", lambda ctx, i: (None, _auth(ctx, i))),
+    ("ratings", "POST", "/ratings", lambda ctx, i: (
+        {"ratings": [{"movie_id": MOVIE_IDS[(i + n) % len(MOVIE_IDS)], "rating": 1 + (i + n) % 10}
+                     for n in range(5)]}, _auth(ctx, i))),
+    ("watchlist add", "POST", "/watchlist",
+     lambda ctx, i: ({"movie_ids": [MOVIE_IDS[i % len(MOVIE_IDS)]]}, _auth(ctx, i))),
+    ("watchlist", "GET", "/watchlist", lambda ctx, i: (None, _auth(ctx, i))),
+    ("personal recommendations", "GET", "/get-personal-recommendations", lambda ctx, i: (None, _auth(ctx, i))),
+    ("recommendations from movie", "POST", "/get-recommendation-from-movies",
+     lambda ctx, i: ({"title": TITLES[i % len(TITLES)], "language": _language(ctx, i)}, None)),
+    ("recommendations from genre", "POST", "/get-recommendation-from-genre",
+     lambda ctx, i: ({"genre": GENRE_NAMES[i % len(GENRE_NAMES)], "region": REGIONS[i % len(REGIONS)],
+                      "language": _language(ctx, i)}, None)),
+    ("batch recommendations", "POST", "/batch-recommendations",
+     lambda ctx, i: ({"queries": [{"title": TITLES[i % len(TITLES)]},
+                                  {"genre": GENRE_NAMES[i % len(GENRE_NAMES)]}],
+                      "language": _language(ctx, i)}, None)),
+    ("random recommendation", "POST", "/get-random-recommendation",
+     lambda ctx, i: ({"region": REGIONS[i % len(REGIONS)], "language": _language(ctx, i)}, None)),
+    ("movie summary", "POST", "/get-movie-summary",
+     lambda ctx, i: ({"title": TITLES[-1 - i % len(TITLES)], "language": _language(ctx, i)}, None)),
+    ("search", "POST", "/search-movies", lambda ctx, i: ({"query": f"overview of movie {i % 99}"}, None)),
+    ("trending", "POST", "/get-trending-movies",
+     lambda ctx, i: ({"region": REGIONS[i % len(REGIONS)], "language": _language(ctx, i)}, None)),
+    ("metrics", "GET", "/metrics", lambda ctx, i: (None, None)),
+    ("delete-user", "DELETE", "/delete-user", lambda ctx, i: ({"username": _accounts(ctx, i)["username"]}, None)),
+]
+
+
+def percentile(ordered: list, p: float) -> float:
+    """Return the nearest-rank ``p``-th percentile (0-100) of sorted values."""
+    if not ordered:
+        return 0.0
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def drive(base_url: str, method: str, path: str, build, ctx: dict, total: int, concurrency: int,
+          warmup: int = 0) -> dict:
+    """
+    Make ``total`` calls to one route from ``concurrency`` threads and summarize them.
+
+    The first ``warmup`` calls load caches and snapshots and are left out
+    of the summary, so baselines compare steady-state runs.
+    """
+    local = threading.local()
+
+    def call(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        body, headers = build(ctx, i)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=body, headers=headers, timeout=30)
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        return time.perf_counter() - started, failed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total, total + warmup)))
+        started = time.perf_counter()
+        calls = list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds * 1000 for seconds, _ in calls)
+    return {
+        "requests": total,
+        "errors": sum(1 for _, failed in calls if failed),
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def serve_gunicorn(workers: int, threads: int, env: dict):
+    """
+    Serve the app with gunicorn on a free local port until it answers.
+
+    Returns:
+        tuple: The gunicorn process and the base URL it serves.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, **env, BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(workers),
+               GUNICORN_THREADS=str(threads))
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                               cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if requests.get(base_url + "/health-check", timeout=1).ok:
+                return process, base_url
+        except requests.ConnectionError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError("gunicorn did not start serving")
+        time.sleep(0.1)
+
+
+def run(args) -> dict:
+    directory = tempfile.mkdtemp(prefix="bench-load-")
+    # Read by the app's modules at import, so set before importing them
+    os.environ["OVERVIEW_INDEX_DIR"] = os.path.join(directory, "overview_index")
+    os.environ["SIMILARITY_INDEX_DIR"] = os.path.join(directory, "similarity_index")
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    import app as app_module
+    from models.catalog_sync import CatalogSync
+    from models.tmdb_model import catalog, title_index
+    from utils.tmdb_client import AsyncTMDBClient, TMDBClient, get_client, set_async_client, set_client
+    from werkzeug.serving import make_server
+
+    fake = FakeTMDB(seed=args.seed).start()
+    set_client(TMDBClient(api_key="bench", base_url=fake.url))
+    set_async_client(AsyncTMDBClient(api_key="bench", base_url=fake.url))
+    config = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(directory, 'app.db')}",
+        "DB_MODE": args.db_mode,
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }
+    flask_app = app_module.create_app(config)
+    server = process = None
+
+    try:
+        # Part of the fake's movies go into the local catalog, the rest are only upstream
+        CatalogSync(get_client(), catalog, title_index=title_index).seed(args.catalog_pages)
+        if args.workers:
+            # The workers import the app themselves and find the seeded database through the environment
+            env = {key: str(value) for key, value in config.items()}
+            env.update(TMDB_KEY="bench", TMDB_BASE_URL=fake.url, TMDB_RATE_LIMIT="0",
+                       SESSION_SECRET=uuid.uuid4().hex, SESSION_STORE_PATH=os.path.join(directory, "sessions.sqlite"),
+                       SHARED_CACHE_PATH=os.path.join(directory, "shared_cache.sqlite"),
+                       CATALOG_SYNC_LOCK=os.path.join(directory, "catalog_sync.lock"))
+            process, base_url = serve_gunicorn(args.workers, args.threads, env)
+        else:
+            server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+        fake.latency, fake.jitter, fake.error_rate = args.latency, args.jitter, args.error_rate
+
+        ctx = {"run": uuid.uuid4().hex[:8], "users": [], "tokens": [], "languages": args.languages}
+        with requests.Session() as session:
+            for n in range(args.concurrency):
+                account = {"username": f"load-{ctx['run']}-user-{n}", "password": PASSWORD}
+                session.post(base_url + "/create-account", json=account).raise_for_status()
+                login = session.post(base_url + "/login", json=account)
+                login.raise_for_status()
+                ctx["users"].append(account["username"])
+                ctx["tokens"].append(login.json()["token"])
+
+        results = {}
+        for name, method, path, build in SCENARIOS:
+            if args.routes and name not in args.routes:
+                continue
+            results[name] = drive(base_url, method, path, build, ctx, args.requests, args.concurrency, args.warmup)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if process is not None:
+            process.terminate()
+            process.wait()
+        fake.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, slack_ms: float) -> list:
+    """
+    Return a line for every route that regressed against ``baseline``.
+
+    Latencies regress when they exceed the baseline by more than
+    ``tolerance`` plus ``slack_ms``, throughput when it drops by more than
+    ``tolerance``, and errors when the error rate grows by more than a point.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + tolerance) + slack_ms:
+                regressions.append(f"{name}: {metric} {base[metric]} -> {current[metric]}")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput_rps {base['throughput_rps']} -> {current['throughput_rps']}")
+        if current["errors"] / current["requests"] > base["errors"] / base["requests"] + 0.01:
+            regressions.append(f"{name}: errors {base['errors']}/{base['requests']} -> "
+                               f"{current['errors']}/{current['requests']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Calls per route.")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured calls per route before timing.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the fake TMDB takes to answer.")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Random +/- seconds on top of --latency.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake TMDB calls that fail.")
+    parser.add_argument("--catalog-pages", type=int, default=1, help="Popular pages synced to the local catalog.")
+    parser.add_argument("--languages", nargs="+", default=["en-US", "de-DE"],
+                        help="Languages the TMDB routes rotate through, e.g. en-US de-DE.")
+    parser.add_argument("--db-mode", default="production")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Serve the app with this many gunicorn workers; 0 serves it in-process.")
+    parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker.")
+    parser.add_argument("--routes", nargs="*", help="Scenario names to run; all by default.")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare with.")
+    parser.add_argument("--save-baseline", help="Write this run's results to a JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression.")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="Allowed absolute latency regression.")
+    args = parser.parse_args()
+
+    settings = {key: getattr(args, key) for key in
+                ("concurrency", "requests", "warmup", "latency", "jitter", "error_rate", "catalog_pages", "languages",
+                 "db_mode", "workers")}
+    results = run(args)
+
+    print(f"{'route':<28} {'req/s':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'errors':>7}")
+    for name, result in results.items():
+        print(f"{name:<28} {result['throughput_rps']:>8} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['errors']:>7}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != settings:
+            print(f"Warning: the baseline was recorded with {baseline.get('settings')}", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.tolerance, args.slack_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
@@ -0,0 +1,65 @@
+"""
+Benchmark the offline personal-recommendation job on synthetic ratings.
+
+Reports how long building the interaction matrix, the pruned item-item
+similarities and every user's top-N take, e.g.:
+
+    python -m benchmarks.bench_personal --users 10000 100000 --movies 50000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from models.personal_recommendations import build_interactions, item_similarities, top_n_per_user
+
+
+def synthetic_ratings(users: int, movies: int, per_user: int = 40, seed: int = 0) -> list:
+    """Generate ``(user_id, movie_id, rating)`` rows with Zipf-popular movies."""
+    rng = np.random.default_rng(seed)
+    user_ids = np.repeat(np.arange(1, users + 1), per_user)
+    movie_ids = np.minimum(rng.zipf(1.3, size=len(user_ids)), movies)
+    ratings = rng.integers(1, 21, size=len(user_ids)) / 2
+    # One rating per (user, movie), like the table's primary key
+    _, first = np.unique(user_ids * (movies + 1) + movie_ids, return_index=True)
+    return list(zip(user_ids[first].tolist(), movie_ids[first].tolist(), ratings[first].tolist()))
+
+
+def bench(users: int, movies: int, k: int, top_n: int) -> dict:
+    ratings = synthetic_ratings(users, movies)
+
+    started = time.perf_counter()
+    _, movie_ids, matrix = build_interactions(ratings, [])
+    matrix_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sims = item_similarities(matrix, k)
+    sims_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    top_n_per_user(matrix, sims, top_n)
+    score_seconds = time.perf_counter() - started
+
+    return {
+        "users": users,
+        "ratings": len(ratings),
+        "movies": len(movie_ids),
+        "matrix_s": round(matrix_seconds, 2),
+        "sims_s": round(sims_seconds, 2),
+        "top_n_s": round(score_seconds, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("-k", type=int, default=50)
+    parser.add_argument("--top-n", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'users':>8} {'ratings':>10} {'movies':>8} {'matrix_s':>9} {'sims_s':>8} {'top_n_s':>8}")
+    for users in args.users:
+        result = bench(users, args.movies, args.k, args.top_n)
+        print(f"{result['users']:>8} {result['ratings']:>10} {result['movies']:>8} "
+              f"{result['matrix_s']:>9} {result['sims_s']:>8} {result['top_n_s']:>8}")
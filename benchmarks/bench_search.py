@@ -0,0 +1,81 @@
+"""
+Benchmark the local overview search index on synthetic catalogs.
+
+Reports index build time, load time of the saved index and free-text
+query latency for each catalog size, e.g.:
+
+    python -m benchmarks.bench_search --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from models.overview_search import OverviewIndex
+
+
+def synthetic_overviews(n: int, vocabulary: int = 50000, seed: int = 0) -> list:
+    """Generate ``n`` ``(id, title, overview)`` rows with Zipf-distributed words."""
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    lengths = rng.integers(20, 80, size=n)
+    draws = np.minimum(rng.zipf(1.2, size=int(lengths.sum())), vocabulary) - 1
+    rows = []
+    start = 0
+    for i in range(n):
+        stop = start + lengths[i]
+        rows.append((i + 1, f"Movie {i + 1}", " ".join(words[w] for w in draws[start:stop])))
+        start = stop
+    return rows
+
+
+def bench(n: int, k: int, queries: int) -> dict:
+    rows = synthetic_overviews(n)
+
+    started = time.perf_counter()
+    index = OverviewIndex.build(rows)
+    build_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        started = time.perf_counter()
+        loaded = OverviewIndex.load(directory)
+        load_seconds = time.perf_counter() - started
+
+        rng = np.random.default_rng(1)
+        timings = []
+        for _ in range(queries):
+            # Mix frequent and rare words, like "heist in space"
+            terms = [f"w{int(t)}" for t in rng.integers(0, 2000, size=rng.integers(1, 4))]
+            started = time.perf_counter()
+            loaded.search(" ".join(terms), k)
+            timings.append((time.perf_counter() - started) * 1e6)
+        size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6
+        del loaded
+
+    timings.sort()
+    return {
+        "movies": n,
+        "build_s": round(build_seconds, 3),
+        "load_ms": round(load_seconds * 1e3, 1),
+        "query_p50_us": round(statistics.median(timings), 1),
+        "query_p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+        "index_mb": round(size_mb, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'movies':>10} {'build_s':>10} {'load_ms':>10} {'p50_us':>10} {'p99_us':>10} {'index_mb':>10}")
+    for n in args.sizes:
+        result = bench(n, args.k, args.queries)
+        print(f"{result['movies']:>10} {result['build_s']:>10} {result['load_ms']:>10} "
+              f"{result['query_p50_us']:>10} {result['query_p99_us']:>10} {result['index_mb']:>10}")
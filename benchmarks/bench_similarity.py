@@ -0,0 +1,82 @@
+"""
+Benchmark the local similarity engine on synthetic catalogs.
+
+Reports index build time and single-movie query latency against the
+memory-mapped index for each catalog size, e.g.:
+
+    python -m benchmarks.bench_similarity --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from models.similarity import GENRE_IDS, SimilarityIndex
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> list:
+    """Generate ``n`` movie dicts with TMDB-like feature distributions."""
+    rng = np.random.default_rng(seed)
+    genre_counts = rng.integers(1, 4, size=n)
+    years = rng.integers(1920, 2025, size=n)
+    popularity = rng.lognormal(mean=1.5, sigma=1.5, size=n)
+    vote_average = np.clip(rng.normal(6.3, 1.2, size=n), 0, 10)
+    vote_count = rng.lognormal(mean=4, sigma=2, size=n).astype(int)
+    return [
+        {
+            "id": i + 1,
+            "genre_ids": rng.choice(GENRE_IDS, size=genre_counts[i], replace=False).tolist(),
+            "release_date": f"{years[i]}-01-01",
+            "popularity": float(popularity[i]),
+            "vote_average": float(vote_average[i]),
+            "vote_count": int(vote_count[i]),
+        }
+        for i in range(n)
+    ]
+
+
+def bench(n: int, k: int, queries: int, max_candidates: int) -> dict:
+    movies = synthetic_catalog(n)
+
+    started = time.perf_counter()
+    index = SimilarityIndex.build(movies, k=k, max_candidates=max_candidates)
+    build_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        loaded = SimilarityIndex.load(directory)
+        rng = np.random.default_rng(1)
+        timings = []
+        for movie_id in rng.integers(1, n + 1, size=queries):
+            started = time.perf_counter()
+            loaded.similar(int(movie_id), k)
+            timings.append((time.perf_counter() - started) * 1e6)
+        size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6
+        del loaded
+
+    timings.sort()
+    return {
+        "movies": n,
+        "build_s": round(build_seconds, 3),
+        "query_p50_us": round(statistics.median(timings), 1),
+        "query_p99_us": round(timings[int(len(timings) * 0.99) - 1], 1),
+        "index_mb": round(size_mb, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--max-candidates", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'movies':>10} {'build_s':>10} {'p50_us':>10} {'p99_us':>10} {'index_mb':>10}")
+    for n in args.sizes:
+        result = bench(n, args.k, args.queries, args.max_candidates)
+        print(f"{result['movies']:>10} {result['build_s']:>10} {result['query_p50_us']:>10} "
+              f"{result['query_p99_us']:>10} {result['index_mb']:>10}")
@@ -0,0 +1,50 @@
+"""
+Benchmark app cold starts.
+
+Starts fresh interpreters that import the app, build it with
+``create_app`` against a temporary database and serve one request,
+and reports the median import, build and time-to-first-request, e.g.:
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = """
+import json
+import app
+flask_app = app.create_app({"CATALOG_SYNC_INTERVAL": 0, "SNAPSHOT_REFRESH_INTERVAL": 0})
+flask_app.test_client().get("/health-check")
+print(json.dumps(flask_app.extensions["startup"]))
+"""
+
+
+def cold_start(database_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", _CHILD], cwd=root, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{os.path.join(directory, 'app.db')}"
+        # The first start creates the schema; the rest measure restarts against an existing database
+        first = cold_start(database_url)
+        runs = [cold_start(database_url) for _ in range(args.runs)]
+
+    print(f"{'':>12} {'import_ms':>10} {'create_ms':>10} {'first_req_ms':>13}")
+    print(f"{'new db':>12} {first['import_ms']:>10} {first['create_app_ms']:>10} {first['first_request_ms']:>13}")
+    print(f"{'restart p50':>12} {statistics.median(r['import_ms'] for r in runs):>10} "
+          f"{statistics.median(r['create_app_ms'] for r in runs):>10} "
+          f"{statistics.median(r['first_request_ms'] for r in runs):>13}")
@@ -0,0 +1,60 @@
+"""
+Gunicorn settings for serving the app in production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The master process forks ``WEB_CONCURRENCY`` workers, one per core by
+default. Each worker is its own interpreter with ``GUNICORN_THREADS``
+threads, so throughput grows with cores instead of stopping at the GIL.
+The app is imported in each worker after the fork, not in the master,
+so no worker inherits another's threads, event loops or database
+connections.
+
+Send the master ``SIGHUP`` for a graceful reload. It starts fresh
+workers, which load the current code and settings. It then lets the old
+workers finish their requests, waiting up to ``GUNICORN_GRACEFUL_TIMEOUT``
+seconds, before stopping them. ``SIGTERM`` shuts down just as gracefully.
+
+Workers on one host share a TMDB response cache (``SHARED_CACHE_PATH``).
+The catalog sync is turned on, hourly unless ``CATALOG_SYNC_INTERVAL``
+says otherwise, and only one worker runs it (``CATALOG_SYNC_LOCK``).
+Both files default to the temp directory. With ``SESSION_SECRET`` set, the
+workers also share session tokens (``SESSION_STORE_PATH``, by default
+the shared cache's file), so they survive reloads. More than one worker
+requires ``SESSION_SECRET``.
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# A worker silent for this long is killed and replaced; requests are bounded well below it by the TMDB timeouts
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recycle workers after this many requests to cap slow leaks; 0 never recycles
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+# Spread out the restarts so the workers don't all go cold at once
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# A token issued by one worker must verify on the others, so they need one signing key and one token store
+if workers > 1 and not os.getenv("SESSION_SECRET"):
+    raise RuntimeError("Set SESSION_SECRET to run more than one worker; each worker would "
+                       "otherwise sign session tokens with its own random key")
+
+# Set here, in the master, so every worker inherits the same paths
+_shared_dir = tempfile.gettempdir()
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(_shared_dir, "movie-recommender-cache.sqlite"))
+os.environ.setdefault("CATALOG_SYNC_LOCK", os.path.join(_shared_dir, "movie-recommender-catalog-sync.lock"))
+# The deployment is what keeps the catalog fresh; development servers and tests leave the sync off
+os.environ.setdefault("CATALOG_SYNC_INTERVAL", "3600")
+if os.getenv("SESSION_SECRET"):
+    os.environ.setdefault("SESSION_STORE_PATH", os.environ["SHARED_CACHE_PATH"])
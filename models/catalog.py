@@ -0,0 +1,271 @@
+import logging
+import time
+
+from sqlalchemy import Column, Float, Integer, String, Text, delete, select
+
+from models.title_resolution import normalize_title
+from utils.db_config import Base, Session
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class CatalogMovie(Base):
+    __tablename__ = 'catalog_movies'
+
+    id = Column(Integer, primary_key=True)  # TMDB movie ID
+    title = Column(String, nullable=False)
+    normalized_title = Column(String, nullable=False, index=True)
+    original_title = Column(String)
+    release_date = Column(String)
+    overview = Column(Text)
+    popularity = Column(Float, index=True)
+    vote_average = Column(Float)
+    vote_count = Column(Integer)
+    updated_at = Column(Float, nullable=False)
+
+
+class CatalogMovieGenre(Base):
+    __tablename__ = 'catalog_movie_genres'
+
+    movie_id = Column(Integer, primary_key=True)
+    genre_id = Column(Integer, primary_key=True, index=True)
+
+
+class CatalogGenre(Base):
+    __tablename__ = 'catalog_genres'
+
+    id = Column(Integer, primary_key=True)
+    language = Column(String, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+class CatalogRecommendation(Base):
+    __tablename__ = 'catalog_recommendations'
+
+    movie_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    recommended_id = Column(Integer, nullable=False)
+
+
+class CatalogSyncState(Base):
+    __tablename__ = 'catalog_sync_state'
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+
+class MovieCatalog:
+    """
+    Local mirror of TMDB movie data stored in the app's SQLite database.
+
+    Read methods return None when the catalog cannot answer, so callers
+    fall back to TMDB; a broken or missing catalog never fails a request.
+
+    Args:
+        session_factory (callable): Creates SQLAlchemy sessions.
+    """
+
+    def __init__(self, session_factory=Session) -> None:
+        self._session_factory = session_factory
+
+    def session(self):
+        """Open a session for a batch of writes; the caller commits and closes it."""
+        return self._session_factory()
+
+    def find_by_title(self, title: str):
+        """Return the most popular catalog movie with this title, or None."""
+        return self._read(lambda session: session.scalars(
+            select(CatalogMovie)
+            .where(CatalogMovie.normalized_title == normalize_title(title))
+            .order_by(CatalogMovie.popularity.desc())
+            .limit(1)
+        ).first())
+
+    def get_movie(self, movie_id: int):
+        """Return the catalog movie with this TMDB ID, or None."""
+        return self._read(lambda session: session.get(CatalogMovie, movie_id))
+
+    def recommendations(self, movie_id: int):
+        """Return recommended titles for a movie in TMDB's order, or None if none were synced."""
+        rows = self._read(lambda session: session.execute(
+            select(CatalogMovie.title)
+            .join(CatalogRecommendation, CatalogRecommendation.recommended_id == CatalogMovie.id)
+            .where(CatalogRecommendation.movie_id == movie_id)
+            .order_by(CatalogRecommendation.rank)
+        ).all())
+        return [row.title for row in rows] if rows else None
+
+    def titles(self, movie_ids: list) -> dict:
+        """Return a movie ID → title mapping for the given IDs that are in the catalog."""
+        rows = self._read(lambda session: session.execute(
+            select(CatalogMovie.id, CatalogMovie.title).where(CatalogMovie.id.in_(movie_ids))
+        ).all())
+        return {row.id: row.title for row in rows or ()}
+
+    def known_ids(self, movie_ids: list) -> set:
+        """
+        Return the given movie IDs that are in the catalog.
+
+        Unlike the lookups, a failed read raises, so a sync never mistakes
+        an unreadable catalog for an empty one.
+        """
+        session = self._session_factory()
+        try:
+            known = set()
+            # In chunks, to stay under SQLite's limit on bound parameters
+            for start in range(0, len(movie_ids), 500):
+                known.update(session.scalars(
+                    select(CatalogMovie.id).where(CatalogMovie.id.in_(movie_ids[start:start + 500]))))
+            return known
+        finally:
+            session.close()
+
+    def feature_rows(self) -> list:
+        """Return every movie as a dict of the fields the similarity engine uses."""
+        session = self._session_factory()
+        try:
+            genre_ids = {}
+            for movie_id, genre_id in session.execute(select(CatalogMovieGenre.movie_id, CatalogMovieGenre.genre_id)):
+                genre_ids.setdefault(movie_id, []).append(genre_id)
+            return [
+                {
+                    "id": row.id,
+                    "genre_ids": genre_ids.get(row.id, []),
+                    "release_date": row.release_date,
+                    "popularity": row.popularity,
+                    "vote_average": row.vote_average,
+                    "vote_count": row.vote_count,
+                }
+                for row in session.execute(select(
+                    CatalogMovie.id, CatalogMovie.release_date, CatalogMovie.popularity,
+                    CatalogMovie.vote_average, CatalogMovie.vote_count,
+                ))
+            ]
+        finally:
+            session.close()
+
+    def title_rows(self) -> list:
+        """Return ``(id, title, original_title, release_date)`` for every movie."""
+        rows = self._read(lambda session: session.execute(select(
+            CatalogMovie.id, CatalogMovie.title, CatalogMovie.original_title, CatalogMovie.release_date,
+        )).all())
+        return [tuple(row) for row in rows or ()]
+
+    def overview_rows(self) -> list:
+        """Return ``(id, title, overview)`` for every movie with an overview."""
+        rows = self._read(lambda session: session.execute(
+            select(CatalogMovie.id, CatalogMovie.title, CatalogMovie.overview)
+            .where(CatalogMovie.overview.is_not(None), CatalogMovie.overview != "")
+            .order_by(CatalogMovie.id)
+        ).all())
+        return [tuple(row) for row in rows or ()]
+
+    def popular_ids(self, limit: int) -> list:
+        """Return the IDs of the ``limit`` most popular movies, most popular first."""
+        rows = self._read(lambda session: session.scalars(
+            select(CatalogMovie.id).order_by(CatalogMovie.popularity.desc(), CatalogMovie.id).limit(limit)
+        ).all())
+        return list(rows or ())
+
+    def genres(self, language: str):
+        """Return the synced genre list for a language, or None."""
+        rows = self._read(lambda session: session.scalars(
+            select(CatalogGenre).where(CatalogGenre.language == language)
+        ).all())
+        return [{"id": row.id, "name": row.name} for row in rows] if rows else None
+
+    def upsert_movie(self, movie: dict, session=None) -> None:
+        """
+        Insert or update a movie from a TMDB movie payload.
+
+        Accepts both full detail payloads (``genres``) and list entries
+        (``genre_ids``). A detail payload with appended ``recommendations``
+        also replaces the movie's recommendation edges; recommended movies
+        are stored as well so the edges can be resolved to titles.
+        """
+        own_session = session is None
+        session = session or self._session_factory()
+        try:
+            self._merge_movie(session, movie)
+            recommended = (movie.get("recommendations") or {}).get("results")
+            if recommended is not None:
+                session.execute(delete(CatalogRecommendation).where(CatalogRecommendation.movie_id == movie["id"]))
+                for rank, other in enumerate(recommended):
+                    self._merge_movie(session, other, keep_existing=True)
+                    session.add(CatalogRecommendation(movie_id=movie["id"], rank=rank, recommended_id=other["id"]))
+            if own_session:
+                session.commit()
+        except Exception:
+            if own_session:
+                session.rollback()
+            raise
+        finally:
+            if own_session:
+                session.close()
+
+    def remember(self, movie: dict) -> None:
+        """Store a movie seen in a TMDB response; failures are only logged."""
+        try:
+            self.upsert_movie(movie)
+        except Exception as e:
+            logger.warning("Catalog write failed: %s", str(e))
+
+    def delete_movie(self, movie_id: int, session) -> None:
+        """Remove a movie and its edges, e.g. after TMDB answers 404 for it."""
+        session.execute(delete(CatalogRecommendation).where(CatalogRecommendation.movie_id == movie_id))
+        session.execute(delete(CatalogMovieGenre).where(CatalogMovieGenre.movie_id == movie_id))
+        session.execute(delete(CatalogMovie).where(CatalogMovie.id == movie_id))
+
+    def replace_genres(self, language: str, genres: list, session) -> None:
+        """Replace the stored genre list for a language."""
+        session.execute(delete(CatalogGenre).where(CatalogGenre.language == language))
+        for genre in genres:
+            session.add(CatalogGenre(id=genre["id"], language=language, name=genre["name"]))
+
+    def get_state(self, key: str, default: str = None) -> str:
+        """Return a sync bookmark value."""
+        row = self._read(lambda session: session.get(CatalogSyncState, key))
+        return row.value if row is not None else default
+
+    def set_state(self, key: str, value: str, session) -> None:
+        """Store a sync bookmark value."""
+        session.merge(CatalogSyncState(key=key, value=value))
+
+    def count(self) -> int:
+        """Return the number of movies in the catalog."""
+        return self._read(lambda session: session.query(CatalogMovie).count()) or 0
+
+    def _merge_movie(self, session, movie: dict, keep_existing: bool = False) -> None:
+        if keep_existing and session.get(CatalogMovie, movie["id"]) is not None:
+            return
+        session.merge(CatalogMovie(
+            id=movie["id"],
+            title=movie["title"],
+            normalized_title=normalize_title(movie["title"]),
+            original_title=movie.get("original_title"),
+            release_date=movie.get("release_date"),
+            overview=movie.get("overview"),
+            popularity=movie.get("popularity"),
+            vote_average=movie.get("vote_average"),
+            vote_count=movie.get("vote_count"),
+            updated_at=time.time(),
+        ))
+        genre_ids = movie.get("genre_ids")
+        if genre_ids is None:
+            genre_ids = [genre["id"] for genre in movie.get("genres", [])]
+        session.execute(delete(CatalogMovieGenre).where(CatalogMovieGenre.movie_id == movie["id"]))
+        for genre_id in set(genre_ids):
+            session.add(CatalogMovieGenre(movie_id=movie["id"], genre_id=genre_id))
+        session.flush()
+
+    def _read(self, query):
+        session = self._session_factory()
+        try:
+            return query(session)
+        except Exception as e:
+            logger.warning("Catalog read failed: %s", str(e))
+            return None
+        finally:
+            session.close()
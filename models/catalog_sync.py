@@ -0,0 +1,221 @@
+import datetime
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows; there is only one worker there anyway
+    fcntl = None
+
+import requests
+
+from models.catalog import MovieCatalog
+from models.locales import DEFAULT_LANGUAGE
+from utils.logger import configure_logger
+from utils.rate_limit import background_priority
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# TMDB's changes feed accepts at most 14 days per query
+MAX_CHANGES_WINDOW = datetime.timedelta(days=14)
+
+
+class CatalogSync:
+    """
+    Keep a MovieCatalog's movies up to date with TMDB.
+
+    Each run reads TMDB's ``/movie/changes`` feed since the last recorded
+    sync date and re-downloads the changed movies (with their
+    recommendations) that the catalog already holds, plus the genre list.
+    Movies the catalog doesn't hold are never added by a run; ``seed``
+    adds the popular list, and the app adds the movies users look up.
+
+    Args:
+        client: Object with a ``get(path, params)`` method returning decoded
+            JSON, e.g. a TMDBClient or a recorded-fixture replayer.
+        catalog (MovieCatalog): Destination store.
+        language (str): Language the catalog is synced in.
+        max_movies (int): Cap on movies downloaded per run; windows with
+            more changed catalog movies are worked through over several runs.
+        today (callable): Returns the current date, injectable for tests.
+        title_index (TrigramIndex): Fuzzy title index that downloaded
+            movies are added to as they are stored.
+    """
+
+    def __init__(self, client, catalog: MovieCatalog = None, language: str = DEFAULT_LANGUAGE,
+                 max_movies: int = 1000, today=datetime.date.today, title_index=None) -> None:
+        self.client = client
+        self.catalog = catalog or MovieCatalog()
+        self.language = language
+        self.max_movies = max_movies
+        self._today = today
+        self.title_index = title_index
+
+    def run_once(self) -> int:
+        """
+        Apply every change since the last sync to the movies in the catalog.
+
+        Returns:
+            int: Number of movies downloaded.
+        """
+        self.sync_genres()
+
+        end = self._today()
+        last = self.catalog.get_state("last_sync_date")
+        start = datetime.date.fromisoformat(last) if last else end - datetime.timedelta(days=1)
+        start = max(start, end - MAX_CHANGES_WINDOW)
+
+        movie_ids = self._changed_ids(start, end)
+        # The offset counts feed entries, not downloads, so movies added to the catalog mid-window don't shift it
+        offset = next_offset = int(self.catalog.get_state("changes_offset", "0"))
+        known = self.catalog.known_ids(movie_ids[offset:])
+        batch = []
+        for movie_id in movie_ids[offset:]:
+            if len(batch) >= self.max_movies:
+                break
+            next_offset += 1
+            if movie_id in known:
+                batch.append(movie_id)
+        synced = self.sync_movies(batch)
+
+        # Only move the bookmark once the whole window has been applied
+        session = self.catalog.session()
+        try:
+            if next_offset >= len(movie_ids):
+                self.catalog.set_state("last_sync_date", end.isoformat(), session)
+                self.catalog.set_state("changes_offset", "0", session)
+            else:
+                self.catalog.set_state("changes_offset", str(next_offset), session)
+            session.commit()
+        finally:
+            session.close()
+        logger.info("Catalog sync applied %d of %d changed movies since %s; %d are not in the catalog",
+                    synced, len(movie_ids), start, len(movie_ids) - offset - len(known))
+        return synced
+
+    def seed(self, pages: int = 5) -> int:
+        """Download the movies on the first ``pages`` pages of the popular list."""
+        movie_ids = []
+        for page in range(1, pages + 1):
+            data = self.client.get("/movie/popular", {"language": self.language, "page": page})
+            movie_ids.extend(movie["id"] for movie in data["results"])
+            if page >= data.get("total_pages", 1):
+                break
+        self.sync_genres()
+        return self.sync_movies(movie_ids)
+
+    def sync_genres(self) -> None:
+        """Replace the stored genre list."""
+        genres = self.client.get("/genre/movie/list", {"language": self.language})["genres"]
+        session = self.catalog.session()
+        try:
+            self.catalog.replace_genres(self.language, genres, session)
+            session.commit()
+        finally:
+            session.close()
+
+    def sync_movies(self, movie_ids) -> int:
+        """Download and store the given movies; movies TMDB no longer has are removed."""
+        synced = 0
+        for movie_id in movie_ids:
+            session = self.catalog.session()
+            try:
+                try:
+                    movie = self.client.get(f"/movie/{movie_id}", {
+                        "language": self.language,
+                        "append_to_response": "recommendations",
+                    })
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code != 404:
+                        raise
+                    self.catalog.delete_movie(movie_id, session)
+                else:
+                    self.catalog.upsert_movie(movie, session)
+                    synced += 1
+                    if self.title_index is not None:
+                        for indexed in [movie, *(movie.get("recommendations") or {}).get("results", [])]:
+                            self.title_index.add_movie(indexed)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+        return synced
+
+    def _changed_ids(self, start: datetime.date, end: datetime.date) -> list:
+        movie_ids = []
+        page = 1
+        while True:
+            data = self.client.get("/movie/changes", {
+                "start_date": start.isoformat(),
+                "end_date": end.isoformat(),
+                "page": page,
+            })
+            movie_ids.extend(change["id"] for change in data["results"] if not change.get("adult"))
+            if page >= data.get("total_pages", 1):
+                break
+            page += 1
+        return list(dict.fromkeys(movie_ids))
+
+
+def _try_lock(path):
+    """Take an exclusive lock on ``path``, held while the returned file stays open; None if another process has it."""
+    handle = open(path, "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return handle
+
+
+def start_background_sync(sync: CatalogSync, interval: float, lock_path: str = None) -> threading.Event:
+    """
+    Run ``sync.run_once`` every ``interval`` seconds on a daemon thread.
+
+    Args:
+        sync (CatalogSync): The sync to run.
+        interval (float): Seconds between runs.
+        lock_path (str): Lock file shared by the worker processes of one
+            server. Only the worker holding the lock syncs; another takes
+            over at its next interval if that worker exits.
+
+    Returns:
+        threading.Event: Set it to stop the loop.
+    """
+    stop = threading.Event()
+
+    def loop():
+        lock = None
+        with background_priority():
+            while not stop.is_set():
+                if lock_path and lock is None:
+                    # Kept for the life of the process; the OS releases it when the worker exits
+                    lock = _try_lock(lock_path)
+                if lock is not None or not lock_path:
+                    try:
+                        sync.run_once()
+                    except Exception as e:
+                        logger.warning("Catalog sync failed: %s", str(e))
+                stop.wait(interval)
+
+    threading.Thread(target=loop, name="catalog-sync", daemon=True).start()
+    return stop
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils.tmdb_client import get_client
+
+    parser = argparse.ArgumentParser(description="Sync the local movie catalog from TMDB.")
+    parser.add_argument("--seed", type=int, default=0, help="also download this many pages of popular movies")
+    args = parser.parse_args()
+
+    sync = CatalogSync(get_client())
+    if args.seed:
+        print(f"Seeded {sync.seed(args.seed)} movies")
+    print(f"Synced {sync.run_once()} changed movies")
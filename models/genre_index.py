@@ -0,0 +1,135 @@
+import logging
+import re
+import threading
+import time
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Common alternative spellings, keyed by normalized name and mapped to TMDB genre IDs
+GENRE_ALIASES = {
+    "sci fi": 878,
+    "scifi": 878,
+    "sf": 878,
+    "romcom": 10749,
+    "rom com": 10749,
+    "romantic": 10749,
+    "animated": 16,
+    "cartoon": 16,
+    "doc": 99,
+    "docs": 99,
+    "documentaries": 99,
+    "kids": 10751,
+    "musical": 10402,
+    "scary": 27,
+    "war movie": 10752,
+    "cowboy": 37,
+    "detective": 9648,
+    "suspense": 53,
+    "funny": 35,
+    "tv": 10770,
+}
+
+
+def normalize_genre_name(name: str) -> str:
+    """Fold case, separators and whitespace so lookups are insensitive to them."""
+    return re.sub(r"[\s\-_/&]+", " ", name.casefold()).strip()
+
+
+class GenreIndex:
+    """
+    In-memory genre name → ID index, one per language.
+
+    Each language's index is loaded on first use and refreshed in the
+    background once it is older than ``refresh_interval``; lookups never
+    wait on the network once an index exists.
+
+    Args:
+        loader (callable): Takes a language code and returns TMDB's genre
+            list, i.e. ``[{"id": int, "name": str}, ...]``.
+        refresh_interval (float): Seconds before an index is reloaded.
+        clock (callable): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, loader, refresh_interval: float = 24 * 3600, clock=time.monotonic) -> None:
+        self._loader = loader
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._indexes = {}
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = set()
+
+    def lookup(self, genre_name: str, language: str = "en-US") -> int:
+        """
+        Return the TMDB genre ID for a name or alias.
+
+        Args:
+            genre_name (str): Genre name, alias or numeric ID, in any case.
+            language (str): Language of the genre names.
+
+        Returns:
+            int: The TMDB genre ID.
+
+        Raises:
+            ValueError: If the genre is unknown.
+        """
+        genre_id = self._index(language).get(normalize_genre_name(genre_name))
+        if genre_id is None:
+            raise ValueError(f"Genre '{genre_name}' not found!")
+        return genre_id
+
+    def loaded(self, language: str = "en-US") -> bool:
+        """Return True if ``language`` can be looked up without a network call."""
+        return language in self._indexes
+
+    def names(self, language: str = "en-US") -> dict:
+        """Return the normalized name → ID mapping for ``language``."""
+        return dict(self._index(language))
+
+    def refresh(self, language: str = "en-US") -> None:
+        """Reload the index for ``language`` from the loader."""
+        genres = self._loader(language)
+        index = {normalize_genre_name(name): genre_id for name, genre_id in GENRE_ALIASES.items()}
+        for genre in genres:
+            index[normalize_genre_name(genre["name"])] = genre["id"]
+            index[str(genre["id"])] = genre["id"]
+        with self._lock:
+            self._indexes[language] = index
+            self._loaded_at[language] = self._clock()
+        logger.info("Loaded %d genres for %s", len(genres), language)
+
+    def clear(self) -> None:
+        """Forget every loaded index so the next lookup reloads it."""
+        with self._lock:
+            self._indexes.clear()
+            self._loaded_at.clear()
+
+    def _index(self, language: str) -> dict:
+        index = self._indexes.get(language)
+        if index is None:
+            with self._load_lock:
+                if language not in self._indexes:
+                    self.refresh(language)
+            return self._indexes[language]
+
+        if self._clock() - self._loaded_at[language] >= self.refresh_interval:
+            with self._lock:
+                due = language not in self._refreshing
+                if due:
+                    self._refreshing.add(language)
+            if due:
+                threading.Thread(target=self._background_refresh, args=(language,), daemon=True).start()
+        return index
+
+    def _background_refresh(self, language: str) -> None:
+        try:
+            self.refresh(language)
+        except Exception as e:
+            logger.warning("Genre refresh failed for %s: %s", language, str(e))
+        finally:
+            with self._lock:
+                self._refreshing.discard(language)
@@ -0,0 +1,149 @@
+import json
+import time
+
+from sqlalchemy import Column, Float, Integer, Text, column, delete, select, table
+from sqlalchemy.dialects.sqlite import insert
+
+from utils.db_config import Base
+
+# Accepted rating scale, matching TMDB's
+MIN_RATING = 0.5
+MAX_RATING = 10.0
+
+# Lightweight view of the users table, to look users up by name without importing models.user
+_users = table("users", column("id"), column("username"))
+
+
+class Rating(Base):
+    __tablename__ = 'ratings'
+
+    user_id = Column(Integer, primary_key=True)
+    movie_id = Column(Integer, primary_key=True, index=True)
+    rating = Column(Float, nullable=False)
+    rated_at = Column(Float, nullable=False)
+
+
+class WatchlistItem(Base):
+    __tablename__ = 'watchlist'
+
+    user_id = Column(Integer, primary_key=True)
+    movie_id = Column(Integer, primary_key=True, index=True)
+    added_at = Column(Float, nullable=False)
+
+
+class PersonalRecommendation(Base):
+    __tablename__ = 'personal_recommendations'
+
+    user_id = Column(Integer, primary_key=True)
+    payload = Column(Text, nullable=False)  # JSON list of {"id", "title", "score"}, best first
+    computed_at = Column(Float, nullable=False)
+
+
+def user_id_for(session, username: str):
+    """Return the ID of a user, or None if there is no such user."""
+    return session.execute(select(_users.c.id).where(_users.c.username == username)).scalar()
+
+
+def parse_ratings(items) -> list:
+    """
+    Validate a list of ``{"movie_id": int, "rating": number}`` objects.
+
+    Returns:
+        list: ``(movie_id, rating)`` pairs; a later duplicate wins.
+
+    Raises:
+        ValueError: If an item is malformed or out of range.
+    """
+    parsed = {}
+    for item in items:
+        movie_id = item.get("movie_id") if isinstance(item, dict) else None
+        rating = item.get("rating") if isinstance(item, dict) else None
+        if not _is_id(movie_id):
+            raise ValueError("Each rating needs an integer 'movie_id'.")
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not MIN_RATING <= rating <= MAX_RATING:
+            raise ValueError(f"Each rating needs a 'rating' between {MIN_RATING} and {MAX_RATING}.")
+        parsed[movie_id] = float(rating)
+    return list(parsed.items())
+
+
+def parse_movie_ids(movie_ids) -> list:
+    """
+    Validate a list of movie IDs, dropping duplicates.
+
+    Raises:
+        ValueError: If an ID is not a positive integer.
+    """
+    if not all(_is_id(movie_id) for movie_id in movie_ids):
+        raise ValueError("Movie IDs must be positive integers.")
+    return list(dict.fromkeys(movie_ids))
+
+
+def add_ratings(session, user_id: int, ratings: list) -> int:
+    """Insert or replace a user's ratings in one statement; the caller commits."""
+    if not ratings:
+        return 0
+    now = time.time()
+    statement = insert(Rating).values([
+        {"user_id": user_id, "movie_id": movie_id, "rating": rating, "rated_at": now}
+        for movie_id, rating in ratings
+    ])
+    session.execute(statement.on_conflict_do_update(
+        index_elements=[Rating.user_id, Rating.movie_id],
+        set_={"rating": statement.excluded.rating, "rated_at": statement.excluded.rated_at},
+    ))
+    return len(ratings)
+
+
+def add_to_watchlist(session, user_id: int, movie_ids: list) -> int:
+    """Add movies to a user's watchlist, ignoring ones already on it; the caller commits."""
+    if not movie_ids:
+        return 0
+    now = time.time()
+    result = session.execute(insert(WatchlistItem).values([
+        {"user_id": user_id, "movie_id": movie_id, "added_at": now} for movie_id in movie_ids
+    ]).on_conflict_do_nothing())
+    return result.rowcount
+
+
+def remove_from_watchlist(session, user_id: int, movie_ids: list) -> int:
+    """Remove movies from a user's watchlist; the caller commits."""
+    result = session.execute(delete(WatchlistItem).where(
+        WatchlistItem.user_id == user_id, WatchlistItem.movie_id.in_(movie_ids)))
+    return result.rowcount
+
+
+def watchlist(session, user_id: int) -> list:
+    """Return a user's watchlist movie IDs, most recently added first."""
+    return list(session.scalars(
+        select(WatchlistItem.movie_id)
+        .where(WatchlistItem.user_id == user_id)
+        .order_by(WatchlistItem.added_at.desc(), WatchlistItem.movie_id)
+    ))
+
+
+def personal_recommendations(session, username: str):
+    """
+    Return the precomputed recommendations of a user with one indexed lookup.
+
+    Returns:
+        tuple: (recommendations, computed_at), or ``([], None)`` if the
+        offline job has not covered the user yet.
+    """
+    row = session.execute(
+        select(PersonalRecommendation.payload, PersonalRecommendation.computed_at)
+        .join(_users, _users.c.id == PersonalRecommendation.user_id)
+        .where(_users.c.username == username)
+    ).first()
+    if row is None:
+        return [], None
+    return json.loads(row.payload), row.computed_at
+
+
+def delete_user_data(session, user_id: int) -> None:
+    """Remove a user's ratings, watchlist and recommendations; the caller commits."""
+    for model in (Rating, WatchlistItem, PersonalRecommendation):
+        session.execute(delete(model).where(model.user_id == user_id))
+
+
+def _is_id(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
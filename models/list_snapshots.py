@@ -0,0 +1,218 @@
+import heapq
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from models.locales import DEFAULT_LANGUAGE, normalize_language, normalize_region
+from utils.logger import configure_logger
+from utils.rate_limit import background_priority
+from utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Flattens popularity so long-tail movies still come up in random picks; 1 samples by raw popularity
+SAMPLE_WEIGHT_EXPONENT = 0.5
+
+
+class ListSnapshot:
+    """
+    The first pages of one TMDB list, as fetched at ``fetched_at``.
+
+    Args:
+        pages (list): Each page's movie dicts, page 1 first.
+        fetched_at (float): Clock time of the fetch.
+    """
+
+    def __init__(self, pages: list, fetched_at: float) -> None:
+        self.pages = pages
+        self.fetched_at = fetched_at
+        self.titles = [movie["title"] for page in pages for movie in page]
+        self.weights = [(max(movie.get("popularity") or 0.0, 0.0) + 1.0) ** SAMPLE_WEIGHT_EXPONENT
+                        for page in pages for movie in page]
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def page_titles(self, pages: int) -> list:
+        """Return ``(page, titles)`` for the first ``pages`` pages held."""
+        return [(number, [movie["title"] for movie in page])
+                for number, page in enumerate(self.pages[:pages], start=1)]
+
+    def sample(self, k: int, rng: random.Random) -> list:
+        """
+        Draw up to ``k`` distinct titles, weighted by popularity.
+
+        Uses the Efraimidis–Spirakis weighted reservoir: every movie gets
+        the key ``u ** (1 / w)`` for a uniform ``u`` and the k largest keys
+        win, which is one pass over the snapshot with a k-sized heap.
+        """
+        # log(u) / w orders the same as u ** (1 / w) without underflowing
+        keys = ((math.log(1.0 - rng.random()) / weight, i) for i, weight in enumerate(self.weights))
+        return [self.titles[i] for _, i in heapq.nlargest(max(k, 0), keys)]
+
+
+class ListSnapshots:
+    """
+    In-memory snapshots of TMDB's movie lists, one per list and locale.
+
+    Each snapshot holds the first ``pages`` pages of a list. Lists of the
+    hot ``locales`` are kept fresh by :meth:`start_background_refresh`, so
+    readers never wait on TMDB. Any other locale is cold: its lists are
+    loaded on first use, reloaded only when read after ``max_age``, and at
+    most ``max_cold`` of them are kept, least recently used first out. Lists
+    that TMDB does not vary by region are held once per language.
+
+    Args:
+        loader (callable): Takes ``(kind, region, language, page)`` and
+            returns the TMDB page, i.e. ``{"results": [...], "total_pages": int}``;
+            ``region`` is None for lists that are not regional.
+        kinds (tuple): List names the loader understands.
+        regional (tuple): The kinds whose contents depend on the region.
+        locales (list): Hot ``(language, region)`` pairs, fetched by every
+            background refresh and never evicted.
+        pages (int): Pages fetched per list.
+        max_age (float): Seconds before a snapshot counts as stale.
+        max_cold (int): Snapshots of cold locales kept in memory.
+        clock (callable): Monotonic time source, injectable for tests.
+        seed (int): Seed of the random sampler, for reproducible tests.
+    """
+
+    def __init__(self, loader, kinds=("trending", "popular"), regional=("popular",),
+                 locales=((DEFAULT_LANGUAGE, "US"),), pages: int = 5, max_age: float = 3 * 3600,
+                 max_cold: int = 16, clock=time.monotonic, seed: int = None) -> None:
+        self._loader = loader
+        self.kinds = tuple(kinds)
+        self.regional = set(regional)
+        self.pages = pages
+        self.max_age = max_age
+        self.max_cold = max_cold
+        self._clock = clock
+        self._rng = random.Random(seed)
+        self._hot = {self._key(kind, region, language) for language, region in locales for kind in self.kinds}
+        self._snapshots = {}
+        self._cold = OrderedDict()
+        self._lock = threading.Lock()
+        self._loads = SingleFlight()
+        self._refreshing = set()
+
+    def get(self, kind: str, region: str, language: str = DEFAULT_LANGUAGE) -> ListSnapshot:
+        """
+        Return the snapshot of a list, loading it first if it is not in memory.
+
+        Raises:
+            ValueError: If the list kind, region or language is invalid.
+        """
+        key = self._key(kind, region, language)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            # Callers of one list share its load; other lists load alongside it
+            snapshot = self._loads.do(key, lambda: self._snapshots.get(key) or self.refresh(*key))
+        elif self._clock() - snapshot.fetched_at >= self.max_age:
+            with self._lock:
+                due = key not in self._refreshing
+                if due:
+                    self._refreshing.add(key)
+            if due:
+                threading.Thread(target=self._background_refresh, args=(key,), daemon=True).start()
+
+        if key not in self._hot:
+            with self._lock:
+                if key in self._cold:
+                    self._cold.move_to_end(key)
+        return snapshot
+
+    def page_titles(self, kind: str, region: str, pages: int = 1, language: str = DEFAULT_LANGUAGE) -> list:
+        """Return ``(page, titles)`` for the first ``pages`` pages of a list's snapshot."""
+        return self.get(kind, region, language).page_titles(pages)
+
+    def sample(self, kind: str, region: str, k: int, language: str = DEFAULT_LANGUAGE) -> list:
+        """Return up to ``k`` distinct titles drawn at random from a list's snapshot."""
+        return self.get(kind, region, language).sample(k, self._rng)
+
+    def refresh(self, kind: str, region: str, language: str) -> ListSnapshot:
+        """Fetch a list's pages from the loader and replace its snapshot."""
+        first = self._loader(kind, region, language, 1)
+        last = min(self.pages, first.get("total_pages", 1))
+        pages = [first["results"]] + [self._loader(kind, region, language, page)["results"]
+                                      for page in range(2, last + 1)]
+        snapshot = ListSnapshot(pages, self._clock())
+        key = (kind, region, language)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            if key not in self._hot:
+                self._cold[key] = None
+                self._cold.move_to_end(key)
+                while len(self._cold) > self.max_cold:
+                    self._snapshots.pop(self._cold.popitem(last=False)[0], None)
+        logger.info("Loaded %d %s movies for %s/%s", len(snapshot), kind, language, region or "any region")
+        return snapshot
+
+    def refresh_all(self) -> int:
+        """
+        Refresh the lists of every hot locale.
+
+        A list that fails to load keeps serving its previous snapshot.
+
+        Returns:
+            int: Number of lists refreshed.
+        """
+        refreshed = 0
+        for key in sorted(self._hot, key=str):
+            try:
+                self.refresh(*key)
+                refreshed += 1
+            except Exception as e:
+                logger.warning("Refreshing %s for %s/%s failed: %s", key[0], key[2], key[1], str(e))
+        return refreshed
+
+    def start_background_refresh(self, interval: float) -> threading.Event:
+        """
+        Run :meth:`refresh_all` now and then every ``interval`` seconds on a daemon thread.
+
+        Returns:
+            threading.Event: Set it to stop the loop.
+        """
+        stop = threading.Event()
+
+        def loop():
+            # Refreshes only take upstream capacity that user requests leave free
+            with background_priority():
+                while not stop.is_set():
+                    self.refresh_all()
+                    stop.wait(interval)
+
+        threading.Thread(target=loop, name="list-snapshots", daemon=True).start()
+        return stop
+
+    def loaded(self, kind: str, region: str, language: str = DEFAULT_LANGUAGE) -> bool:
+        """Return True if a list can be served without a network call."""
+        return self._key(kind, region, language) in self._snapshots
+
+    def clear(self) -> None:
+        """Forget every snapshot so the next read reloads it."""
+        with self._lock:
+            self._snapshots.clear()
+            self._cold.clear()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def _key(self, kind: str, region: str, language: str) -> tuple:
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown list '{kind}'.")
+        if region is not None or kind in self.regional:
+            region = normalize_region(region)
+        return kind, region if kind in self.regional else None, normalize_language(language)
+
+    def _background_refresh(self, key: tuple) -> None:
+        try:
+            self.refresh(*key)
+        except Exception as e:
+            logger.warning("Refreshing %s for %s/%s failed: %s", key[0], key[2], key[1], str(e))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -0,0 +1,54 @@
+import os
+import re
+
+_LANGUAGE = re.compile(r"^([A-Za-z]{2})(?:-([A-Za-z]{2}))?$")
+_REGION = re.compile(r"^[A-Za-z]{2}$")
+
+
+def normalize_language(language: str) -> str:
+    """
+    Return a language tag in TMDB's form, e.g. ``"pt-br"`` → ``"pt-BR"``.
+
+    Raises:
+        ValueError: If the tag is not an ISO 639-1 code, optionally
+            followed by a country code.
+    """
+    match = _LANGUAGE.match(language.strip()) if isinstance(language, str) else None
+    if not match:
+        raise ValueError("Language must look like 'en' or 'en-US'.")
+    code, country = match.groups()
+    return f"{code.lower()}-{country.upper()}" if country else code.lower()
+
+
+def normalize_region(region: str) -> str:
+    """
+    Return a region as an upper-case ISO 3166-1 code, e.g. ``"us"`` → ``"US"``.
+
+    Raises:
+        ValueError: If the region is not a two-letter code.
+    """
+    if not isinstance(region, str) or not _REGION.match(region.strip()):
+        raise ValueError("Region must be a two-letter country code, e.g. 'US'.")
+    return region.strip().upper()
+
+
+def parse_locales(value: str) -> list:
+    """
+    Parse a comma-separated list of ``language-REGION`` tags into ``(language, region)`` pairs.
+
+    Raises:
+        ValueError: If a tag has no region part or is malformed.
+    """
+    locales = []
+    for tag in value.split(","):
+        if not tag.strip():
+            continue
+        language = normalize_language(tag)
+        if "-" not in language:
+            raise ValueError(f"Locale '{tag.strip()}' needs a region, e.g. 'en-US'.")
+        locales.append((language, normalize_region(language.split("-")[1])))
+    return locales
+
+
+# Language used when a request does not name one; the local catalog is synced in it too
+DEFAULT_LANGUAGE = normalize_language(os.getenv("DEFAULT_LANGUAGE", "en-US"))
@@ -0,0 +1,176 @@
+"""
+Local free-text search over movie overviews.
+
+Overviews from the local catalog are tokenized into a BM25 inverted index
+stored in CSR form: one ``offsets`` array delimiting each term's postings
+in flat ``docs`` and ``weights`` arrays. Weights already hold the BM25
+term score (saturated term frequency, length normalization and IDF), so a
+query only gathers and sums the postings of its terms. Indexes are saved
+as ``.npy`` files that are memory-mapped when loaded.
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = frozenset("""
+a about after all an and are as at be but by for from has have he her his in into is it its
+of on or she that the their them they this to was were when where which while who will with
+""".split())
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase terms, dropping stopwords and folding plurals."""
+    terms = []
+    for word in _WORD.findall((text or "").casefold()):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class OverviewIndex:
+    """
+    BM25 inverted index over movie overviews.
+
+    Args:
+        ids (np.ndarray): TMDB movie ID of each document.
+        titles (list): Title of each document.
+        terms (dict): Term → term number.
+        offsets (np.ndarray): Postings of term t are ``offsets[t]:offsets[t + 1]``.
+        docs (np.ndarray): Document number of each posting.
+        weights (np.ndarray): BM25 score each posting contributes.
+    """
+
+    ARRAYS = ("ids", "offsets", "docs", "weights")
+
+    def __init__(self, ids: np.ndarray, titles: list, terms: dict, offsets: np.ndarray,
+                 docs: np.ndarray, weights: np.ndarray) -> None:
+        self.ids = ids
+        self.titles = titles
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+
+    @classmethod
+    def build(cls, documents) -> "OverviewIndex":
+        """
+        Build an index from ``(movie_id, title, overview)`` rows.
+
+        The title is indexed along with the overview.
+        """
+        started = time.perf_counter()
+        ids, titles, terms = [], [], {}
+        term_ids, doc_ids, counts, lengths = [], [], [], []
+        for movie_id, title, overview in documents:
+            doc = len(ids)
+            tokens = tokenize(f"{title} {overview or ''}")
+            ids.append(movie_id)
+            titles.append(title)
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                term_ids.append(terms.setdefault(term, len(terms)))
+                doc_ids.append(doc)
+                counts.append(count)
+
+        n = len(ids)
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        counts = np.asarray(counts, dtype=np.float32)
+        lengths = np.asarray(lengths, dtype=np.float32)
+
+        order = np.lexsort((doc_ids, term_ids))
+        term_ids, doc_ids, counts = term_ids[order], doc_ids[order], counts[order]
+        document_frequency = np.bincount(term_ids, minlength=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=offsets[1:])
+
+        idf = np.log1p((n - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = lengths.mean() if n else 1.0
+        norm = K1 * (1 - B + B * lengths[doc_ids] / max(average_length, 1.0))
+        weights = idf[term_ids] * counts * (K1 + 1) / (counts + norm)
+
+        logger.info("Built overview index for %d movies and %d terms in %.2fs",
+                    n, len(terms), time.perf_counter() - started)
+        return cls(np.asarray(ids, dtype=np.int64), titles, terms, offsets, doc_ids, weights.astype(np.float32))
+
+    def save(self, directory: str) -> None:
+        """Write the index into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(sorted(self.terms, key=self.terms.get), f, ensure_ascii=False)
+        with open(os.path.join(directory, "titles.json"), "w", encoding="utf-8") as f:
+            json.dump(self.titles, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "OverviewIndex":
+        """Open a saved index, memory-mapping its arrays unless ``mmap`` is False."""
+        mode = "r" if mmap else None
+        ids, offsets, docs, weights = (np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+                                       for name in cls.ARRAYS)
+        with open(os.path.join(directory, "terms.json"), encoding="utf-8") as f:
+            terms = {term: number for number, term in enumerate(json.load(f))}
+        with open(os.path.join(directory, "titles.json"), encoding="utf-8") as f:
+            titles = json.load(f)
+        return cls(ids, titles, terms, offsets, docs, weights)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Return the best matching movies for a free-text query.
+
+        Returns:
+            list: ``(movie_id, title, score)`` tuples, best first.
+        """
+        numbers = {self.terms[term] for term in tokenize(query) if term in self.terms}
+        if not numbers or k < 1:
+            return []
+        spans = [(int(self.offsets[number]), int(self.offsets[number + 1])) for number in numbers]
+        docs = np.concatenate([self.docs[start:stop] for start, stop in spans])
+        weights = np.concatenate([self.weights[start:stop] for start, stop in spans])
+
+        # Sum each document's term scores, then select the k best matches
+        candidates, positions = np.unique(docs, return_inverse=True)
+        scores = np.bincount(positions, weights=weights)
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.ids[candidates[i]]), self.titles[candidates[i]], round(float(scores[i]), 4)) for i in top]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models.catalog import MovieCatalog
+
+    parser = argparse.ArgumentParser(description="Build the local overview search index from the movie catalog.")
+    parser.add_argument("--out", default=os.getenv("OVERVIEW_INDEX_DIR", "overview_index"))
+    args = parser.parse_args()
+
+    index = OverviewIndex.build(MovieCatalog().overview_rows())
+    index.save(args.out)
+    print(f"Indexed overviews of {len(index)} movies into {args.out}")
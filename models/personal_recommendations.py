@@ -0,0 +1,218 @@
+"""
+Offline collaborative-filtering job for personal recommendations.
+
+Ratings and watchlist entries are loaded into a sparse user × movie
+matrix. Ratings are centred on each user's (shrunk) mean so a low rating
+pushes similar movies down; a watchlist entry counts as a mild positive.
+Item-item cosine similarities come from one sparse product of the
+column-normalized matrix, pruned to each movie's top-k neighbours, and
+every user's scores are a second sparse product computed in batches.
+The top-N unseen movies per user, padded with popular catalog titles,
+are written to ``personal_recommendations`` so serving them is a single
+primary-key lookup. Run it periodically, e.g. from cron:
+
+    python -m models.personal_recommendations --top-n 20
+"""
+import json
+import logging
+import time
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, insert, select
+
+from models.library import MAX_RATING, MIN_RATING, PersonalRecommendation, Rating, WatchlistItem
+from utils.db_config import Session
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Weight of a watchlist entry that the user has not rated
+WATCHLIST_WEIGHT = 0.5
+# Pseudo-ratings at the middle of the scale blended into each user's mean,
+# so a user with one 9/10 rating still reads as liking that movie
+MEAN_SHRINKAGE = 2.0
+
+
+def build_interactions(ratings: list, watchlist: list) -> tuple:
+    """
+    Build the user × movie interaction matrix.
+
+    Args:
+        ratings (list): ``(user_id, movie_id, rating)`` rows.
+        watchlist (list): ``(user_id, movie_id)`` rows.
+
+    Returns:
+        tuple: (user_ids, movie_ids, matrix) where ``matrix`` is a float32
+        CSR matrix whose row i / column j belong to ``user_ids[i]`` /
+        ``movie_ids[j]``. Every interaction is stored, even a zero weight,
+        so the sparsity pattern doubles as the set of movies a user has seen.
+    """
+    rated = np.array(ratings, dtype=np.float64).reshape(-1, 3)
+    listed = np.array(watchlist, dtype=np.int64).reshape(-1, 2)
+    user_ids = np.unique(np.concatenate([rated[:, 0].astype(np.int64), listed[:, 0]]))
+    movie_ids = np.unique(np.concatenate([rated[:, 1].astype(np.int64), listed[:, 1]]))
+
+    rows = np.searchsorted(user_ids, rated[:, 0].astype(np.int64))
+    cols = np.searchsorted(movie_ids, rated[:, 1].astype(np.int64))
+    midpoint = (MIN_RATING + MAX_RATING) / 2
+    counts = np.bincount(rows, minlength=len(user_ids))
+    sums = np.bincount(rows, weights=rated[:, 2], minlength=len(user_ids))
+    means = (sums + MEAN_SHRINKAGE * midpoint) / (counts + MEAN_SHRINKAGE)
+    weights = (rated[:, 2] - means[rows]) / ((MAX_RATING - MIN_RATING) / 2)
+
+    # Watchlist entries only count for movies the user has not rated
+    listed_rows = np.searchsorted(user_ids, listed[:, 0])
+    listed_cols = np.searchsorted(movie_ids, listed[:, 1])
+    rated_keys = rows * len(movie_ids) + cols
+    unrated = ~np.isin(listed_rows * len(movie_ids) + listed_cols, rated_keys)
+
+    matrix = sparse.csr_matrix(
+        (np.concatenate([weights, np.full(unrated.sum(), WATCHLIST_WEIGHT)]).astype(np.float32),
+         (np.concatenate([rows, listed_rows[unrated]]), np.concatenate([cols, listed_cols[unrated]]))),
+        shape=(len(user_ids), len(movie_ids)),
+    )
+    return user_ids, movie_ids, matrix
+
+
+def item_similarities(matrix: sparse.csr_matrix, k: int = 50) -> sparse.csr_matrix:
+    """
+    Return the cosine similarity of every movie to its k nearest movies.
+
+    Args:
+        matrix (sparse.csr_matrix): User × movie interactions.
+        k (int): Neighbours kept per movie; bounds the size of the result
+            to ``k`` entries per row.
+
+    Returns:
+        sparse.csr_matrix: Movie × movie matrix where row i holds movie
+        i's positive neighbours, without the movie itself.
+    """
+    columns = matrix.tocsc()
+    norms = np.sqrt(np.asarray(columns.multiply(columns).sum(axis=0))).ravel()
+    normalized = columns @ sparse.diags(np.where(norms > 0, 1 / np.maximum(norms, 1e-12), 0).astype(np.float32))
+    sims = (normalized.T @ normalized).tocsr()
+    sims.setdiag(0)
+    sims.data[sims.data < 0] = 0
+    sims.eliminate_zeros()
+
+    # Keep each row's k largest entries
+    lengths = np.diff(sims.indptr)
+    for row in np.flatnonzero(lengths > k):
+        start, stop = sims.indptr[row], sims.indptr[row + 1]
+        values = sims.data[start:stop]
+        values[np.argpartition(values, -k)[:-k]] = 0
+    sims.eliminate_zeros()
+    return sims
+
+
+def top_n_per_user(matrix: sparse.csr_matrix, sims: sparse.csr_matrix, n: int = 20,
+                   batch_size: int = 1024) -> list:
+    """
+    Score every movie for every user and keep the n best unseen ones.
+
+    Args:
+        matrix (sparse.csr_matrix): User × movie interactions.
+        sims (sparse.csr_matrix): Output of :func:`item_similarities`.
+        n (int): Recommendations kept per user.
+        batch_size (int): Users scored per sparse product.
+
+    Returns:
+        list: For each user row, ``(columns, scores)`` arrays sorted by
+        decreasing score; only positive scores are kept.
+    """
+    results = []
+    for start in range(0, matrix.shape[0], batch_size):
+        batch = matrix[start:start + batch_size]
+        scores = (batch @ sims).tocsr()
+        for row in range(batch.shape[0]):
+            cols = scores.indices[scores.indptr[row]:scores.indptr[row + 1]]
+            values = scores.data[scores.indptr[row]:scores.indptr[row + 1]]
+            seen = batch.indices[batch.indptr[row]:batch.indptr[row + 1]]
+            keep = (values > 0) & ~np.isin(cols, seen)
+            cols, values = cols[keep], values[keep]
+            if len(values) > n:
+                top = np.argpartition(-values, n)[:n]
+                cols, values = cols[top], values[top]
+            order = np.argsort(-values, kind="stable")
+            results.append((cols[order], values[order]))
+    return results
+
+
+def refresh_personal_recommendations(session_factory=Session, catalog=None, top_n: int = 20,
+                                     k: int = 50) -> int:
+    """
+    Recompute and store the recommendations of every user with ratings or a watchlist.
+
+    Users whose neighbours run out are topped up with the most popular
+    catalog movies they have not seen. All rows are replaced in one
+    transaction, so readers see either the old or the new set.
+
+    Args:
+        session_factory: Creates the database session.
+        catalog: ``MovieCatalog`` used for titles and popular fallbacks.
+        top_n (int): Recommendations stored per user.
+        k (int): Neighbours kept per movie.
+
+    Returns:
+        int: The number of users written.
+    """
+    if catalog is None:
+        from models.catalog import MovieCatalog
+        catalog = MovieCatalog(session_factory)
+
+    started = time.perf_counter()
+    session = session_factory()
+    try:
+        ratings = session.execute(select(Rating.user_id, Rating.movie_id, Rating.rating)).all()
+        watchlist = session.execute(select(WatchlistItem.user_id, WatchlistItem.movie_id)).all()
+        user_ids, movie_ids, matrix = build_interactions(ratings, watchlist)
+        ranked = top_n_per_user(matrix, item_similarities(matrix, k), top_n)
+
+        popular = catalog.popular_ids(top_n * 2)
+        picks = {}
+        for row, (cols, scores) in enumerate(ranked):
+            chosen = list(zip(movie_ids[cols].tolist(), scores.round(4).tolist()))
+            if len(chosen) < top_n:
+                seen = set(movie_ids[matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]].tolist())
+                seen.update(movie_id for movie_id, _ in chosen)
+                chosen += [(movie_id, 0.0) for movie_id in popular if movie_id not in seen][:top_n - len(chosen)]
+            picks[int(user_ids[row])] = chosen
+
+        titles = catalog.titles(list({movie_id for chosen in picks.values() for movie_id, _ in chosen}))
+        now = time.time()
+        rows = [{
+            "user_id": user_id,
+            "payload": json.dumps([{"id": movie_id, "title": titles.get(movie_id), "score": score}
+                                   for movie_id, score in chosen]),
+            "computed_at": now,
+        } for user_id, chosen in picks.items()]
+
+        session.execute(delete(PersonalRecommendation))
+        if rows:
+            session.execute(insert(PersonalRecommendation), rows)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+    logger.info("Stored personal recommendations for %d users (%d movies) in %.2fs",
+                len(rows), len(movie_ids), time.perf_counter() - started)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from utils.create_db import create_db
+
+    parser = argparse.ArgumentParser(description="Recompute every user's personal recommendations.")
+    parser.add_argument("--top-n", type=int, default=20)
+    parser.add_argument("-k", type=int, default=50, help="neighbours kept per movie")
+    args = parser.parse_args()
+
+    create_db()
+    print(f"Stored recommendations for {refresh_personal_recommendations(top_n=args.top_n, k=args.k)} users")
@@ -0,0 +1,213 @@
+"""
+Local item-similarity recommendation engine.
+
+Movies are embedded as rows of a small dense feature matrix (genres,
+release year, popularity and vote statistics). Rows are L2-normalized so
+a matrix product gives cosine similarities; the top-k neighbours of every
+movie are precomputed in batches with ``argpartition`` and saved as
+``.npy`` files that are memory-mapped at query time.
+"""
+import logging
+import os
+import time
+
+import numpy as np
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# TMDB's movie genres, in feature-column order
+GENRE_IDS = [28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37]
+
+# Relative weight of each feature group in the similarity score
+GENRE_WEIGHT = 1.0
+YEAR_WEIGHT = 0.5
+POPULARITY_WEIGHT = 0.3
+VOTE_WEIGHT = 0.4
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def build_features(movies: list) -> tuple:
+    """
+    Build the normalized feature matrix for a list of movies.
+
+    Args:
+        movies (list): Dicts with ``id``, ``genre_ids``, ``release_date``,
+            ``popularity``, ``vote_average`` and ``vote_count``.
+
+    Returns:
+        tuple: (ids, features) where ``ids`` is a sorted int64 array and
+        ``features`` the float32 matrix whose row i describes ``ids[i]``.
+    """
+    movies = sorted(movies, key=lambda movie: movie["id"])
+    n = len(movies)
+    ids = np.fromiter((movie["id"] for movie in movies), dtype=np.int64, count=n)
+
+    genre_column = {genre_id: column for column, genre_id in enumerate(GENRE_IDS)}
+    genres = np.zeros((n, len(GENRE_IDS)), dtype=np.float32)
+    for row, movie in enumerate(movies):
+        for genre_id in movie.get("genre_ids") or ():
+            column = genre_column.get(genre_id)
+            if column is not None:
+                genres[row, column] = 1.0
+    # Spread each movie's genre weight over its genres so multi-genre titles don't dominate
+    genres /= np.maximum(np.sqrt(genres.sum(axis=1, keepdims=True)), 1.0)
+
+    years = np.fromiter((_year(movie.get("release_date")) for movie in movies), dtype=np.float32, count=n)
+    known = years > 0
+    if known.any():
+        years[~known] = years[known].mean()
+    popularity = np.log1p(np.fromiter((movie.get("popularity") or 0 for movie in movies), dtype=np.float32, count=n))
+    vote_average = np.fromiter((movie.get("vote_average") or 0 for movie in movies), dtype=np.float32, count=n)
+    vote_count = np.log1p(np.fromiter((movie.get("vote_count") or 0 for movie in movies), dtype=np.float32, count=n))
+
+    features = np.hstack([
+        genres * GENRE_WEIGHT,
+        (_zscore(years) * YEAR_WEIGHT)[:, None],
+        (_zscore(popularity) * POPULARITY_WEIGHT)[:, None],
+        (_zscore(vote_average) * VOTE_WEIGHT)[:, None],
+        (_zscore(vote_count) * VOTE_WEIGHT)[:, None],
+    ]).astype(np.float32)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    features /= np.where(norms > 0, norms, 1.0)
+    return ids, features
+
+
+def top_k_neighbours(features: np.ndarray, k: int = 20, batch_size: int = 1024,
+                     candidates: np.ndarray = None) -> tuple:
+    """
+    Find the k most cosine-similar rows for every row of ``features``.
+
+    Args:
+        features (np.ndarray): L2-normalized float32 matrix, one row per movie.
+        k (int): Neighbours kept per movie.
+        batch_size (int): Rows scored per matrix product; bounds peak memory
+            to ``batch_size * len(candidates)`` floats.
+        candidates (np.ndarray): Row indices neighbours may be drawn from,
+            e.g. the most popular movies; defaults to every row.
+
+    Returns:
+        tuple: (neighbours, scores), int32 and float32 arrays of shape (n, k)
+        sorted by decreasing similarity.
+    """
+    n = features.shape[0]
+    if candidates is None:
+        candidates = np.arange(n)
+    candidates = np.asarray(candidates)
+    pool = features[candidates]
+    k = max(min(k, len(candidates) - 1), 0)
+
+    neighbours = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    # Position of each row inside the candidate pool, or -1, to mask self-matches
+    pool_position = np.full(n, -1, dtype=np.int64)
+    pool_position[candidates] = np.arange(len(candidates))
+
+    for start in range(0, n if k else 0, batch_size):
+        stop = min(start + batch_size, n)
+        sims = features[start:stop] @ pool.T
+        rows = np.arange(stop - start)
+        own = pool_position[start:stop]
+        in_pool = own >= 0
+        sims[rows[in_pool], own[in_pool]] = -np.inf
+
+        top = np.argpartition(sims, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbours[start:stop] = candidates[np.take_along_axis(top, order, axis=1)]
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbours, scores
+
+
+class SimilarityIndex:
+    """
+    Precomputed top-k neighbour table over a movie catalog.
+
+    Args:
+        ids (np.ndarray): Sorted TMDB movie IDs, one per row.
+        neighbours (np.ndarray): Row indices of each movie's neighbours.
+        scores (np.ndarray): Cosine similarity of each neighbour.
+    """
+
+    FILES = ("ids", "neighbours", "scores")
+
+    def __init__(self, ids: np.ndarray, neighbours: np.ndarray, scores: np.ndarray) -> None:
+        self.ids = ids
+        self.neighbours = neighbours
+        self.scores = scores
+
+    @classmethod
+    def build(cls, movies: list, k: int = 20, max_candidates: int = 20000,
+              batch_size: int = 1024) -> "SimilarityIndex":
+        """
+        Build the index for a list of movie dicts (see :func:`build_features`).
+
+        Neighbours are drawn from the ``max_candidates`` most popular movies,
+        which keeps the build linear in catalog size for very large catalogs.
+        """
+        started = time.perf_counter()
+        ids, features = build_features(movies)
+        candidates = None
+        if len(movies) > max_candidates:
+            popularity = np.array([movie.get("popularity") or 0 for movie in
+                                   sorted(movies, key=lambda movie: movie["id"])], dtype=np.float32)
+            candidates = np.sort(np.argpartition(-popularity, max_candidates)[:max_candidates])
+        neighbours, scores = top_k_neighbours(features, k, batch_size, candidates)
+        logger.info("Built similarity index for %d movies in %.2fs", len(ids), time.perf_counter() - started)
+        return cls(ids, neighbours, scores)
+
+    def save(self, directory: str) -> None:
+        """Write the index as .npy files into ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "SimilarityIndex":
+        """Open a saved index, memory-mapping its arrays unless ``mmap`` is False."""
+        mode = "r" if mmap else None
+        return cls(*(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in cls.FILES))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def similar(self, movie_id: int, k: int = None) -> list:
+        """
+        Return the neighbours of a movie as ``(movie_id, score)`` pairs.
+
+        Raises:
+            KeyError: If the movie is not in the index.
+        """
+        row = int(np.searchsorted(self.ids, movie_id))
+        if row >= len(self.ids) or self.ids[row] != movie_id:
+            raise KeyError(movie_id)
+        neighbours = self.neighbours[row, :k]
+        return list(zip(self.ids[neighbours].tolist(), self.scores[row, :k].tolist()))
+
+
+def _year(release_date) -> float:
+    try:
+        return float(release_date[:4])
+    except (TypeError, ValueError):
+        return 0.0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from models.catalog import MovieCatalog
+
+    parser = argparse.ArgumentParser(description="Build the local similarity index from the movie catalog.")
+    parser.add_argument("--out", default=os.getenv("SIMILARITY_INDEX_DIR", "similarity_index"))
+    parser.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+
+    movies = MovieCatalog().feature_rows()
+    SimilarityIndex.build(movies, k=args.k).save(args.out)
+    print(f"Saved neighbours for {len(movies)} movies to {args.out}")
@@ -0,0 +1,198 @@
+import heapq
+import re
+import threading
+from array import array
+from difflib import SequenceMatcher
+
+from models.title_resolution import normalize_title
+
+# Trailing release year in a query, e.g. "inception 2010" or "Heat (1995)"
+_YEAR_SUFFIX = re.compile(r"^(.*?)\s*\(?((?:18|19|20)\d\d)\)?\s*$")
+
+
+def trigrams(text: str) -> set:
+    """Return the padded character trigrams of an already normalized string."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _numbers(text: str) -> set:
+    """Return the number tokens of a normalized title, e.g. {"2049"} for "blade runner 2049"."""
+    return {token for token in text.split() if token.isdigit()}
+
+
+def release_year(release_date) -> int:
+    """Return the year of a TMDB ``YYYY-MM-DD`` release date, or None."""
+    year = (release_date or "")[:4]
+    return int(year) if year.isdigit() else None
+
+
+class TrigramIndex:
+    """
+    Typo-tolerant title index built on character trigrams.
+
+    Titles and original titles are stored as UTF-8 in one shared buffer,
+    with movie IDs and years in parallel arrays, and every trigram maps to
+    an ``array('I')`` of entry numbers, so the index grows incrementally
+    and stays compact at millions of titles. A search counts shared
+    trigrams over the rarest posting lists of the query, then re-ranks the
+    best candidates by trigram overlap and edit similarity. A title only
+    matches a query with the same numbers in it, so "Toy Story 3" never
+    stands in for "Toy Story". A trailing year in the query is read both
+    as part of the title and as a release year that rules out movies from
+    other years.
+
+    Args:
+        loader (callable): Returns ``(movie_id, title, original_title, year)``
+            rows indexed before the first search, e.g. from the catalog.
+        posting_budget (int): Posting entries scanned per query before
+            falling back to the grams already counted.
+        rerank (int): Candidates re-ranked by edit similarity.
+    """
+
+    def __init__(self, loader=None, posting_budget: int = 5000, rerank: int = 20) -> None:
+        self._loader = loader
+        self.posting_budget = posting_budget
+        self.rerank = rerank
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._movie_ids)
+
+    def title(self, entry: int) -> str:
+        """Return the title stored for an entry."""
+        return self._text[self._offsets[entry]:self._offsets[entry + 1]].decode()
+
+    def add(self, movie_id: int, title: str, original_title: str = None, year: int = None) -> None:
+        """Index a movie under its title and, if different, its original title."""
+        for name in {title, original_title or title}:
+            normalized = normalize_title(name)
+            if not normalized:
+                continue
+            grams = trigrams(normalized)
+            with self._lock:
+                if self._contains(movie_id, normalized):
+                    continue
+                entry = len(self._movie_ids)
+                self._text += name.encode()
+                self._offsets.append(len(self._text))
+                self._movie_ids.append(movie_id)
+                self._years.append(year or 0)
+                self._gram_counts.append(min(len(grams), 0xFFFF))
+                if movie_id >= len(self._latest):
+                    self._latest.extend(array('i', [-1]) * (movie_id + 1 - len(self._latest)))
+                self._previous.append(self._latest[movie_id])
+                self._latest[movie_id] = entry
+                for gram in grams:
+                    postings = self._postings.get(gram)
+                    if postings is None:
+                        postings = self._postings[gram] = array('I')
+                    postings.append(entry)
+
+    def add_movie(self, movie: dict) -> None:
+        """Index a TMDB movie payload (``id``, ``title``, ``original_title``, ``release_date``)."""
+        self.add(movie["id"], movie["title"], movie.get("original_title"), release_year(movie.get("release_date")))
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """
+        Return the best matching movies for a possibly misspelled title.
+
+        Args:
+            query (str): Title as typed, optionally ending in a release year.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list: ``(movie_id, title, year, score)`` tuples, best first, with
+            scores between 0 and 1 and at most one entry per movie.
+        """
+        self._ensure_loaded()
+        # Ways to read the query: as typed, and with a trailing year taken as the release year
+        readings = [(normalize_title(query), None)]
+        match = _YEAR_SUFFIX.match(query)
+        if match and match.group(1):
+            readings.append((normalize_title(match.group(1)), int(match.group(2))))
+        readings = [(normalized, year, trigrams(normalized), _numbers(normalized))
+                    for normalized, year in readings if normalized]
+        if not readings:
+            return []
+        query_grams = set().union(*(grams for _, _, grams, _ in readings))
+
+        # Count shared grams, scanning the rarest posting lists first
+        postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+        counts = {}
+        budget = self.posting_budget
+        for entries in postings:
+            if counts and len(entries) > budget:
+                break
+            # A query made only of very common grams matches too much to rank anyway
+            for entry in entries[:budget]:
+                counts[entry] = counts.get(entry, 0) + 1
+            budget -= len(entries)
+        if not counts:
+            return []
+
+        # Titles sharing under half the best overlap cannot win the re-rank
+        floor = max(counts.values()) / 2
+        gram_counts = self._gram_counts
+        size = len(query_grams)
+        candidates = heapq.nlargest(self.rerank, (
+            (shared / (size + gram_counts[entry]), entry) for entry, shared in counts.items() if shared >= floor))
+
+        best = {}
+        for _, entry in candidates:
+            title = self.title(entry)
+            title_normalized = normalize_title(title)
+            title_grams = trigrams(title_normalized)
+            title_numbers = _numbers(title_normalized)
+            entry_year = self._years[entry] or None
+            for normalized, year, grams, numbers in readings:
+                if numbers != title_numbers or (year is not None and entry_year not in (None, year)):
+                    continue
+                dice = 2 * len(grams & title_grams) / (len(grams) + len(title_grams))
+                ratio = SequenceMatcher(None, normalized, title_normalized).ratio()
+                # A confirmed year only breaks ties between equally close titles
+                rank = (round(0.4 * dice + 0.6 * ratio, 4), year is not None and entry_year == year)
+                movie_id = self._movie_ids[entry]
+                if movie_id not in best or best[movie_id][0] < rank:
+                    best[movie_id] = (rank, (movie_id, title, entry_year, rank[0]))
+        return [result for _, result in heapq.nlargest(limit, best.values(), key=lambda item: item[0])]
+
+    def best_match(self, query: str, min_score: float):
+        """Return the ID of the best match scoring at least ``min_score``, or None."""
+        results = self.search(query, limit=1)
+        if results and results[0][3] >= min_score:
+            return results[0][0]
+        return None
+
+    def clear(self) -> None:
+        """Drop every entry; the loader runs again before the next search."""
+        with self._lock:
+            self._text = bytearray()
+            self._offsets = array('Q', [0])
+            self._movie_ids = array('q')
+            self._years = array('H')
+            self._gram_counts = array('H')
+            self._postings = {}
+            # Newest entry per movie ID, and each entry's previous entry for the same movie
+            self._latest = array('i')
+            self._previous = array('i')
+            self._loaded = self._loader is None
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                for movie_id, title, original_title, year in self._loader():
+                    self.add(movie_id, title, original_title, year)
+                self._loaded = True
+
+    def _contains(self, movie_id: int, normalized: str) -> bool:
+        entry = self._latest[movie_id] if movie_id < len(self._latest) else -1
+        while entry >= 0:
+            if normalize_title(self.title(entry)) == normalized:
+                return True
+            entry = self._previous[entry]
+        return False
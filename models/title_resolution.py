@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import re
+import time
+import unicodedata
+
+from sqlalchemy import Column, Float, Integer, String
+
+from utils.cache import TTLCache
+from utils.db_config import Base, Session
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Marker kept in the in-memory front for titles TMDB could not find
+_NOT_FOUND = -1
+
+
+def normalize_title(title: str) -> str:
+    """
+    Reduce a user-supplied title to a canonical lookup key.
+
+    Folds Unicode compatibility forms and case, drops punctuation and
+    collapses whitespace, so "Spider-Man: No Way Home " and
+    "spider man no way home" share one key.
+    """
+    title = unicodedata.normalize("NFKC", title).casefold()
+    title = re.sub(r"[^\w\s]", " ", title)
+    return " ".join(title.split())
+
+
+class TitleResolution(Base):
+    __tablename__ = 'title_resolutions'
+
+    normalized_title = Column(String, primary_key=True)
+    language = Column(String, primary_key=True)
+    movie_id = Column(Integer, nullable=True)  # NULL records a "not found" result
+    resolved_at = Column(Float, nullable=False)
+
+
+class TitleResolver:
+    """
+    Resolve movie titles to TMDB IDs through an in-memory and SQLite cache.
+
+    Both found and not-found results are remembered; not-found results
+    expire sooner so newly released titles are picked up, and are checked
+    against ``recheck`` before being trusted.
+
+    Args:
+        search (callable): Takes ``(title, language)`` and returns the best
+            matching TMDB movie ID, or None when nothing matches.
+        ttl (float): Seconds a found title stays resolved.
+        negative_ttl (float): Seconds a not-found title stays cached.
+        recheck (callable): Takes ``(title, language)`` and returns a movie
+            ID found without calling TMDB, or None. A cached not-found
+            title it resolves is stored as found.
+        max_entries (int): Size of the in-memory front.
+        session_factory (callable): Creates SQLAlchemy sessions.
+        clock (callable): Wall-clock time source, injectable for tests.
+    """
+
+    def __init__(self, search, ttl: float = 30 * 24 * 3600, negative_ttl: float = 24 * 3600,
+                 max_entries: int = 10000, session_factory=Session, clock=time.time, recheck=None) -> None:
+        self._search = search
+        self._recheck = recheck
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._session_factory = session_factory
+        self._clock = clock
+        self._memory = TTLCache(max_bytes=max_entries, stale_factor=0, sizeof=lambda value: 1)
+
+    def resolve(self, title: str, language: str = "en-US") -> int:
+        """
+        Return the TMDB movie ID for ``title``.
+
+        Args:
+            title (str): Title as typed by the user.
+            language (str): Search language.
+
+        Returns:
+            int: The TMDB movie ID.
+
+        Raises:
+            ValueError: If TMDB has no match for the title.
+        """
+        key = (normalize_title(title), language)
+        movie_id = self._cached(key, title)
+        if movie_id is None:
+            movie_id = self._search(title, language)
+            movie_id = self._store(key, movie_id)
+        return self._result(title, movie_id)
+
+    async def resolve_async(self, title: str, language: str, search) -> int:
+        """
+        Coroutine counterpart of :meth:`resolve`.
+
+        Args:
+            title (str): Title as typed by the user.
+            language (str): Search language.
+            search (callable): Coroutine function taking ``(title, language)``
+                used instead of the blocking search on a cache miss.
+
+        Returns:
+            int: The TMDB movie ID.
+
+        Raises:
+            ValueError: If TMDB has no match for the title.
+        """
+        key = (normalize_title(title), language)
+        # The cache reads and writes SQLite, so they run off the event loop
+        movie_id = await asyncio.to_thread(self._cached, key, title)
+        if movie_id is None:
+            movie_id = await search(title, language)
+            movie_id = await asyncio.to_thread(self._store, key, movie_id)
+        return self._result(title, movie_id)
+
+    def clear(self) -> None:
+        """Empty the in-memory front; the SQLite table is left untouched."""
+        self._memory.clear()
+
+    def stats(self) -> dict:
+        """Return the in-memory front's counters."""
+        return self._memory.stats()
+
+    def _cached(self, key, title):
+        movie_id = self._memory.get(key)
+        if movie_id is None:
+            movie_id = self._load(key)
+        if movie_id == _NOT_FOUND and self._recheck is not None:
+            # The title may have become known locally since the search missed it
+            found = self._recheck(title, key[1])
+            if found is not None:
+                movie_id = self._store(key, found)
+        return movie_id
+
+    @staticmethod
+    def _result(title: str, movie_id: int) -> int:
+        if movie_id == _NOT_FOUND:
+            raise ValueError(f"Movie '{title}' not found!")
+        return movie_id
+
+    def _expiry(self, movie_id: int, resolved_at: float) -> float:
+        return resolved_at + (self.negative_ttl if movie_id == _NOT_FOUND else self.ttl)
+
+    def _load(self, key):
+        session = self._session_factory()
+        try:
+            row = session.get(TitleResolution, key)
+        except Exception as e:
+            logger.warning("Title cache read failed: %s", str(e))
+            return None
+        finally:
+            session.close()
+        if row is None:
+            return None
+
+        movie_id = _NOT_FOUND if row.movie_id is None else row.movie_id
+        remaining = self._expiry(movie_id, row.resolved_at) - self._clock()
+        if remaining <= 0:
+            return None
+        self._memory.set(key, movie_id, remaining)
+        return movie_id
+
+    def _store(self, key, movie_id) -> int:
+        if movie_id is None:
+            movie_id = _NOT_FOUND
+        now = self._clock()
+        self._memory.set(key, movie_id, self._expiry(movie_id, now) - now)
+        session = self._session_factory()
+        try:
+            session.merge(TitleResolution(
+                normalized_title=key[0],
+                language=key[1],
+                movie_id=None if movie_id == _NOT_FOUND else movie_id,
+                resolved_at=now,
+            ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.warning("Title cache write failed: %s", str(e))
+        finally:
+            session.close()
+        return movie_id
@@ -0,0 +1,169 @@
+"""
+asyncio variants of the lookups in models/tmdb_model.py.
+
+The functions keep the same names and return values as their blocking
+counterparts and share their response cache, single-flight group, genre
+index and title resolver, so sync and async callers warm the same state.
+Calls into that state that can block, on SQLite or on a lock held while
+loading, run on worker threads, so one slow query doesn't stall every
+request in flight on the event loop.
+"""
+import asyncio
+
+from models import tmdb_model
+from models.locales import DEFAULT_LANGUAGE
+from models.title_resolution import normalize_title
+from utils.profiling import span
+from utils.rate_limit import background_priority
+from utils.tmdb_client import get_async_client
+
+
+async def _fetch(endpoint, path, params):
+    """Fetch a TMDB path through the shared response cache, keyed on path and params."""
+    key = (path, tuple(sorted(params.items())))
+    ttl = tmdb_model.CACHE_TTLS[endpoint]
+
+    async def download():
+        shared = tmdb_model.shared_cache is not None
+        value = await asyncio.to_thread(tmdb_model._shared_get, key) if shared else None
+        if value is None:
+            value = await get_async_client().get(path, params)
+            if shared:
+                await asyncio.to_thread(tmdb_model._shared_set, key, value, ttl)
+        return value
+
+    async def load():
+        return await tmdb_model.upstream_flights.do_async(key, download)
+
+    def refresh():
+        with background_priority():
+            return tmdb_model.upstream_flights.do(key, lambda: tmdb_model._download(key, path, params, ttl))
+
+    with span(f"tmdb_model {endpoint}"):
+        try:
+            return await tmdb_model.response_cache.get_or_load_async(key, load, ttl, refresh)
+        except Exception as e:
+            stale = await asyncio.to_thread(tmdb_model._stale_response, endpoint, key, e)
+            if stale is None:
+                raise
+            return stale
+
+async def _get_genre_id(genre_name, language=DEFAULT_LANGUAGE):
+    """Look up the genre ID for a given genre name or alias."""
+    # A lookup can load the genre list, from the catalog or TMDB, or wait for another caller loading it
+    return await asyncio.to_thread(tmdb_model.genre_index.lookup, genre_name, language)
+
+async def _search_movie_id(movie_name, language):
+    """Return the ID of a confident local title match, else of TMDB's top search hit, or None."""
+    # The title index is loaded from the catalog on first use
+    movie_id = await asyncio.to_thread(tmdb_model._match_title, movie_name, tmdb_model.FUZZY_MATCH_SCORE)
+    if movie_id is not None:
+        return movie_id
+
+    search_params = {
+        "query": movie_name,
+        "language": language
+    }
+    key = ("/search/movie", normalize_title(movie_name), language)
+    with span("tmdb_model search"):
+        response = await tmdb_model.upstream_flights.do_async(
+            key, lambda: get_async_client().get("/search/movie", search_params))
+    results = response["results"]
+    if results:
+        await asyncio.to_thread(_index_titles, results)
+        return results[0]["id"]
+    return await asyncio.to_thread(tmdb_model._match_title, movie_name, tmdb_model.FUZZY_FALLBACK_SCORE)
+
+def _index_titles(movies):
+    for movie in movies:
+        tmdb_model.title_index.add_movie(movie)
+
+async def _resolve_movie_id(movie_name, language=DEFAULT_LANGUAGE):
+    """Resolve a title to a TMDB movie ID, searching only on a cache miss."""
+    return await tmdb_model.title_resolver.resolve_async(movie_name, language, _search_movie_id)
+
+
+async def get_recommendations_for_genre(genre_name, language=DEFAULT_LANGUAGE, region=None):
+    """Fetch recommended movies for a specific genre."""
+    genre_id = await _get_genre_id(genre_name, language)
+
+    params = dict(tmdb_model._locale_params(language, region), **{
+        "sort_by": "popularity.desc",
+        "with_genres": genre_id,
+        "page": 1
+    })
+    movies = (await _fetch("discover", "/discover/movie", params))["results"]
+    return [movie["title"] for movie in movies]
+
+async def get_recommendations_from_movie(movie_name, language=DEFAULT_LANGUAGE):
+    """Fetch recommended movies based on another movie."""
+    local = await asyncio.to_thread(tmdb_model._catalog_recommendations, movie_name, language)
+    if local:
+        return local
+
+    movie_id = await _resolve_movie_id(movie_name, language)
+
+    recommendations_params = tmdb_model._locale_params(language)
+    recommended_movies = (await _fetch("recommendations", f"/movie/{movie_id}/recommendations",
+                                       recommendations_params))["results"]
+    return [movie["title"] for movie in recommended_movies]
+
+async def get_random_recommendation(language=DEFAULT_LANGUAGE, region=None):
+    """Fetch a random movie recommendation."""
+    params = dict(tmdb_model._locale_params(language, region), page=1)
+    movies = (await _fetch("popular", "/movie/popular", params))["results"]
+    return [movie["title"] for movie in movies]
+
+async def get_movie_summary(movie_name, language=DEFAULT_LANGUAGE):
+    """Fetch the summary of a movie."""
+    local = None
+    if language == DEFAULT_LANGUAGE:
+        local = await asyncio.to_thread(tmdb_model._catalog_movie, movie_name)
+    if local is not None and local.overview:
+        return local.overview
+
+    movie_id = await _resolve_movie_id(movie_name, language)
+
+    movie_params = tmdb_model._locale_params(language)
+    movie = await _fetch("movie", f"/movie/{movie_id}", movie_params)
+    if language == DEFAULT_LANGUAGE:
+        await asyncio.to_thread(tmdb_model.catalog.remember, movie)
+    return movie["overview"]
+
+async def get_trending_movies_tmdb(language=DEFAULT_LANGUAGE):
+    """Fetch the trending movie."""
+    params = dict(tmdb_model._locale_params(language), page=1)
+    movies = (await _fetch("trending", "/trending/movie/week", params))["results"]
+    return [movie["title"] for movie in movies]
+
+async def get_batch_recommendations(queries, max_concurrency=8, language=DEFAULT_LANGUAGE, region=None):
+    """
+    Fetch recommendations for many title and genre queries concurrently.
+
+    Each query is ``{"title": str}`` or ``{"genre": str}``. At most
+    ``max_concurrency`` queries run at once, and a failing query only
+    produces an error entry for itself. Every query uses the given
+    language, and genre queries the given region.
+
+    Returns:
+        list: One ``{"query", "recommendations"}`` or ``{"query", "error"}``
+        dict per query, in request order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(query):
+        async with semaphore:
+            try:
+                if not isinstance(query, dict):
+                    raise ValueError("Each query must be an object.")
+                if query.get("title"):
+                    recommendations = await get_recommendations_from_movie(query["title"], language)
+                elif query.get("genre"):
+                    recommendations = await get_recommendations_for_genre(query["genre"], language, region)
+                else:
+                    raise ValueError("Each query needs a title or a genre.")
+            except Exception as e:
+                return {"query": query, "error": str(e)}
+            return {"query": query, "recommendations": recommendations}
+
+    return await asyncio.gather(*(run(query) for query in queries))
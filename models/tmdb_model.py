@@ -109,140 +109,469 @@
   '''
 
 
-import requests
-from dotenv import load_dotenv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import logging
 import os
+import random
+import threading
+import time
+
+from models.catalog import MovieCatalog
+from models.genre_index import GenreIndex
+from models.list_snapshots import ListSnapshots
+from models.locales import DEFAULT_LANGUAGE, parse_locales
+from models.title_index import TrigramIndex, release_year
+from models.title_resolution import TitleResolver, normalize_title
+from utils.cache import PartitionedCache
+from utils.circuit_breaker import is_upstream_failure, note_stale_result
+from utils.singleflight import SingleFlight
+from utils.logger import configure_logger
+from utils.metrics import registry
+from utils.profiling import span
+from utils.rate_limit import background_priority
+from utils.shared_cache import SharedCache
+from utils.tmdb_client import get_client
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Seconds each kind of TMDB response stays fresh in the response cache
+CACHE_TTLS = {
+    "genres": 24 * 3600,
+    "discover": 3600,
+    "movie": 24 * 3600,
+    "recommendations": 6 * 3600,
+    "popular": 3 * 3600,
+    "trending": 3 * 3600,
+}
+
+# Markets whose lists are kept warm; their cache partitions are never dropped
+HOT_LOCALES = parse_locales(os.getenv("HOT_LOCALES", DEFAULT_LANGUAGE))
+
+def _cache_partition(key):
+    """Name the response cache partition of a ``(path, params)`` key after its locale, e.g. ``"de-DE/AT"``."""
+    params = dict(key[1])
+    language, region = params.get("language", DEFAULT_LANGUAGE), params.get("region")
+    return f"{language}/{region}" if region else language
+
+# One memory budget per locale, so a busy market can't evict another's entries
+response_cache = PartitionedCache(
+    _cache_partition,
+    partition_bytes=int(os.getenv("TMDB_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    max_partitions=int(os.getenv("TMDB_CACHE_MAX_LOCALES", "4")),
+    pinned=[partition for language, region in HOT_LOCALES for partition in (language, f"{language}/{region}")],
+    # Expired responses stay until evicted, as a fallback while TMDB is failing
+    keep_expired=True,
+)
+
+# Responses shared with the other worker processes of a multi-worker server, if configured
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH")
+shared_cache = SharedCache(
+    SHARED_CACHE_PATH,
+    max_bytes=int(os.getenv("SHARED_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+) if SHARED_CACHE_PATH else None
+
+STALE_FALLBACKS = registry.counter(
+    "tmdb_stale_fallbacks_total", "Expired TMDB responses served because TMDB was failing.", ("endpoint",))
+
+def _stale_response(endpoint, key, error):
+    """Return the last good response for ``key`` if ``error`` means TMDB is failing, else None."""
+    stale = None
+    if is_upstream_failure(error):
+        stale = response_cache.get_stale(key)
+        if stale is None and shared_cache is not None:
+            stale = shared_cache.get_stale(key)
+    if stale is not None:
+        logger.warning("Serving a stale %s response for %s: %s", endpoint, key[0], error)
+        STALE_FALLBACKS.inc(endpoint)
+        note_stale_result(key)
+    return stale
+
+def _shared_get(key):
+    """Return the fresh response another worker stored for ``key``, or None."""
+    return shared_cache.get(key) if shared_cache is not None else None
+
+def _shared_set(key, value, ttl):
+    """Offer a downloaded response to the other workers."""
+    if shared_cache is not None:
+        shared_cache.set(key, value, ttl)
+
+def _download(key, path, params, ttl):
+    """Return a TMDB response from the shared cache, else download it and share it."""
+    # A response taken from the shared cache starts a full TTL in this worker,
+    # so data can be up to twice its TTL old
+    value = _shared_get(key)
+    if value is None:
+        value = get_client().get(path, params)
+        _shared_set(key, value, ttl)
+    return value
+
+# Concurrent identical upstream calls share one request
+upstream_flights = SingleFlight()
+
+def _fetch(endpoint, path, params):
+    """Fetch a TMDB path through the response cache, keyed on path and params."""
+    key = (path, tuple(sorted(params.items())))
+
+    def load():
+        return upstream_flights.do(key, lambda: _download(key, path, params, CACHE_TTLS[endpoint]))
+
+    def refresh():
+        # Stale entries are still being served, so their refresh yields to user requests
+        with background_priority():
+            return load()
+
+    with span(f"tmdb_model {endpoint}"):
+        try:
+            return response_cache.get_or_load(key, load, CACHE_TTLS[endpoint], refresh)
+        except Exception as e:
+            stale = _stale_response(endpoint, key, e)
+            if stale is None:
+                raise
+            return stale
+
+# TMDB serves lists 20 movies per page, and at most 500 pages of any list
+PAGE_SIZE = 20
+MAX_PAGES = 500
+
+# How many pages of a multi-page request are fetched ahead of the one being consumed
+PAGE_WINDOW = int(os.getenv("TMDB_PAGE_WINDOW", "4"))
+
+_page_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tmdb-pages")
+
+def _iter_pages(endpoint, path, params, pages, start=1):
+    """
+    Fetch pages start..pages of a TMDB list and yield ``(page, titles)`` in page order.
+
+    The first page is fetched before returning so errors surface to the
+    caller; later pages are fetched in parallel, at most PAGE_WINDOW ahead,
+    so memory stays flat however many pages are requested. Every page is
+    fetched in the caller's context, so its priority, profiling spans and
+    stale-result tracking apply to them all.
+    """
+    context = contextvars.copy_context()
+    first = _fetch(endpoint, path, dict(params, page=start))
+    last = min(pages, first.get("total_pages", 1), MAX_PAGES)
+    return _page_stream(endpoint, path, params, start, first, last, context)
+
+def _page_stream(endpoint, path, params, start, first, last, context):
+    yield start, [movie["title"] for movie in first["results"]]
+
+    pending = deque()
+    next_page = start + 1
+    try:
+        while next_page <= last or pending:
+            while next_page <= last and len(pending) < PAGE_WINDOW:
+                # A context can only be entered by one thread at a time, so each fetch gets a copy
+                future = _page_executor.submit(context.copy().run, _fetch, endpoint, path,
+                                               dict(params, page=next_page))
+                pending.append((next_page, future))
+                next_page += 1
+            page, future = pending.popleft()
+            yield page, [movie["title"] for movie in future.result()["results"]]
+    finally:
+        # The consumer stopped early; drop pages it will never read
+        for _, future in pending:
+            future.cancel()
+
+# Local mirror of TMDB data, consulted before any upstream call
+catalog = MovieCatalog()
+
+def _load_genres(language):
+    """Load a language's genre list from the catalog, or download it from TMDB."""
+    return catalog.genres(language) or get_client().get("/genre/movie/list", {"language": language})["genres"]
+
+genre_index = GenreIndex(_load_genres, refresh_interval=CACHE_TTLS["genres"])
+
+def _get_genre_id(genre_name, language=DEFAULT_LANGUAGE):
+    """Look up the genre ID for a given genre name or alias."""
+    return genre_index.lookup(genre_name, language)
+
+
+def _load_titles():
+    """Return the catalog's titles for the fuzzy title index."""
+    return [(movie_id, title, original_title, release_year(release_date))
+            for movie_id, title, original_title, release_date in catalog.title_rows()]
+
+# Typo-tolerant index over catalog titles and every title seen in search results
+title_index = TrigramIndex(_load_titles)
+
+# Fuzzy match score trusted without searching TMDB, and the lower score
+# still accepted when TMDB's search finds nothing
+FUZZY_MATCH_SCORE = float(os.getenv("FUZZY_MATCH_SCORE", "0.85"))
+FUZZY_FALLBACK_SCORE = float(os.getenv("FUZZY_FALLBACK_SCORE", "0.5"))
+
+def _match_title(movie_name, min_score):
+    """Return the ID of the best fuzzy title match scoring at least ``min_score``, or None."""
+    return title_index.best_match(movie_name, min_score)
+
+def _search_movie_id(movie_name, language):
+    """Return the ID of a confident local title match, else of TMDB's top search hit, or None."""
+    movie_id = _match_title(movie_name, FUZZY_MATCH_SCORE)
+    if movie_id is not None:
+        return movie_id
 
-# Load the .env file
-load_dotenv()
-
-# Access the variables
-TMDB_KEY = os.getenv("TMDB_KEY")
-
-def _get_genre_id(genre_name):
-    """Fetch the genre ID for a given genre name."""
-    url = f"https://api.themoviedb.org/3/genre/movie/list"
-    params = {
-        "api_key": TMDB_KEY,
-        "language": "en-US"
+    search_params = {
+        "query": movie_name,
+        "language": language
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-
-    genres = response.json()["genres"]
-    for genre in genres:
-        if genre["name"].lower() == genre_name.lower():
-            return genre["id"]
-
-    raise ValueError(f"Genre '{genre_name}' not found!")
-
-
-def get_recommendations_for_genre(genre_name):
-    """Fetch recommended movies for a specific genre."""
+    key = ("/search/movie", normalize_title(movie_name), language)
+    with span("tmdb_model search"):
+        results = upstream_flights.do(key, lambda: get_client().get("/search/movie", search_params))["results"]
+    for movie in results:
+        title_index.add_movie(movie)
+    return results[0]["id"] if results else _match_title(movie_name, FUZZY_FALLBACK_SCORE)
+
+def _recheck_missing_title(movie_name, language):
+    """Return the ID of a fuzzy match for a title TMDB's search missed earlier, or None."""
+    return _match_title(movie_name, FUZZY_FALLBACK_SCORE)
+
+title_resolver = TitleResolver(_search_movie_id, recheck=_recheck_missing_title)
+
+def _resolve_movie_id(movie_name, language=DEFAULT_LANGUAGE):
+    """Resolve a title to a TMDB movie ID, searching only on a cache miss."""
+    return title_resolver.resolve(movie_name, language)
+
+def _catalog_movie(movie_name):
+    """Return the catalog movie for a title, tolerating typos, or None."""
+    movie = catalog.find_by_title(movie_name)
+    if movie is None:
+        movie_id = _match_title(movie_name, FUZZY_MATCH_SCORE)
+        movie = catalog.get_movie(movie_id) if movie_id is not None else None
+    return movie
+
+def _catalog_recommendations(movie_name, language=DEFAULT_LANGUAGE):
+    """Return synced recommendations for a title from the local catalog, or None."""
+    if language != DEFAULT_LANGUAGE:
+        # The catalog is synced in the default language only
+        return None
+    movie = _catalog_movie(movie_name)
+    return catalog.recommendations(movie.id) if movie is not None else None
+
+
+# Directory holding the precomputed local similarity index (see models/similarity.py)
+SIMILARITY_INDEX_DIR = os.getenv("SIMILARITY_INDEX_DIR", "similarity_index")
+
+_similarity_index = None
+_similarity_lock = threading.Lock()
+
+def _get_similarity_index():
+    """Memory-map the local similarity index on first use."""
+    global _similarity_index
+    if _similarity_index is None:
+        with _similarity_lock:
+            if _similarity_index is None:
+                # Imported lazily so NumPy is only loaded when the local engine is used
+                from models.similarity import SimilarityIndex
+                _similarity_index = SimilarityIndex.load(SIMILARITY_INDEX_DIR)
+    return _similarity_index
+
+def get_local_recommendations(movie_name, k=20):
+    """Recommend movies similar to another movie from the local similarity index."""
+    local = _catalog_movie(movie_name)
+    movie_id = local.id if local is not None else _resolve_movie_id(movie_name)
+
+    try:
+        neighbours = _get_similarity_index().similar(movie_id, k)
+    except KeyError:
+        raise ValueError(f"Movie '{movie_name}' is not in the local index!")
+
+    titles = catalog.titles([other for other, _ in neighbours])
+    return [titles[other] for other, _ in neighbours if other in titles]
+
+
+# Directory holding the saved overview search index (see models/overview_search.py)
+OVERVIEW_INDEX_DIR = os.getenv("OVERVIEW_INDEX_DIR", "overview_index")
+
+# Seconds before an index built from the catalog is rebuilt to pick up new overviews
+OVERVIEW_INDEX_REFRESH = float(os.getenv("OVERVIEW_INDEX_REFRESH", "600"))
+
+_overview_index = None
+_overview_built_at = None
+_overview_lock = threading.Lock()
+_overview_rebuilding = False
+
+def _overview_index_stale():
+    """Whether the overview index was built from the catalog longer than OVERVIEW_INDEX_REFRESH ago."""
+    return _overview_built_at is not None and time.monotonic() - _overview_built_at > OVERVIEW_INDEX_REFRESH
+
+def _build_overview_index():
+    """Index the overviews currently in the catalog, then swap the new index in."""
+    global _overview_index, _overview_built_at
+    from models.overview_search import OverviewIndex
+    index = OverviewIndex.build(catalog.overview_rows())
+    _overview_index, _overview_built_at = index, time.monotonic()
+
+def _rebuild_overview_index():
+    global _overview_rebuilding
+    try:
+        _build_overview_index()
+    except Exception as e:
+        logger.warning("Overview index rebuild failed: %s", str(e))
+    finally:
+        with _overview_lock:
+            _overview_rebuilding = False
+
+def _get_overview_index():
+    """
+    Open the saved overview index on first use, or build one from the catalog.
+
+    Once an index exists, searches never wait for a rebuild: a stale index
+    keeps being served while a background thread builds its replacement.
+    """
+    global _overview_index, _overview_rebuilding
+    index = _overview_index
+    if index is None:
+        with _overview_lock:
+            if _overview_index is None:
+                # Imported lazily so NumPy is only loaded when search is used
+                from models.overview_search import OverviewIndex
+                try:
+                    _overview_index = OverviewIndex.load(OVERVIEW_INDEX_DIR)
+                except FileNotFoundError:
+                    _build_overview_index()
+            return _overview_index
+
+    if _overview_index_stale():
+        with _overview_lock:
+            due = not _overview_rebuilding
+            _overview_rebuilding = True
+        if due:
+            threading.Thread(target=_rebuild_overview_index, name="overview-index", daemon=True).start()
+    return index
+
+def search_movies(query, k=10):
+    """Search movie titles and overviews locally, returning ``{"id", "title", "score"}`` dicts."""
+    return [{"id": movie_id, "title": title, "score": score}
+            for movie_id, title, score in _get_overview_index().search(query, k)]
+
+
+def _locale_params(language, region=None):
+    """Return the TMDB query parameters for a locale; ``region`` is left out when None."""
+    return {"language": language, "region": region} if region else {"language": language}
+
+def iter_recommendations_for_genre(genre_name, pages=1, language=DEFAULT_LANGUAGE, region=None):
+    """Fetch several pages of recommended movies for a genre, yielding ``(page, titles)``."""
 
     # call _get_genre_id to get the genre id
-    genre_id = _get_genre_id(genre_name)
-
+    genre_id = _get_genre_id(genre_name, language)
 
-
-    url = f"https://api.themoviedb.org/3/discover/movie"
-    params = {
-        "api_key": TMDB_KEY,
-        "language": "en-US",
+    params = dict(_locale_params(language, region), **{
         "sort_by": "popularity.desc",
-        "with_genres": genre_id,
-        "page": 1
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+        "with_genres": genre_id
+    })
+    return _iter_pages("discover", "/discover/movie", params, pages)
 
-    movies = response.json()["results"]
-    return [movie["title"] for movie in movies]
+def get_recommendations_for_genre(genre_name, pages=1, language=DEFAULT_LANGUAGE, region=None):
+    """Fetch recommended movies for a specific genre."""
+    return [title for _, titles in iter_recommendations_for_genre(genre_name, pages, language, region)
+            for title in titles]
 
-def get_recommendations_from_movie(movie_name):
+def get_recommendations_from_movie(movie_name, language=DEFAULT_LANGUAGE):
     """Fetch recommended movies based on another movie."""
-    search_url = f"https://api.themoviedb.org/3/search/movie"
-    search_params = {
-        "api_key": TMDB_KEY,
-        "query": movie_name,
-        "language": "en-US"
-    }
-    search_response = requests.get(search_url, params=search_params)
-    search_response.raise_for_status()
+    local = _catalog_recommendations(movie_name, language)
+    if local:
+        return local
 
-    results = search_response.json()["results"]
-    if not results:
-        raise ValueError(f"Movie '{movie_name}' not found!")
+    movie_id = _resolve_movie_id(movie_name, language)
 
-    movie_id = results[0]["id"]
-
-    recommendations_url = f"https://api.themoviedb.org/3/movie/{movie_id}/recommendations"
-    recommendations_params = {
-        "api_key": TMDB_KEY,
-        "language": "en-US"
-    }
-    recommendations_response = requests.get(recommendations_url, params=recommendations_params)
-    recommendations_response.raise_for_status()
-
-    recommended_movies = recommendations_response.json()["results"]
+    recommendations_params = _locale_params(language)
+    recommended_movies = _fetch("recommendations", f"/movie/{movie_id}/recommendations", recommendations_params)["results"]
     return [movie["title"] for movie in recommended_movies]
 
-def get_random_recommendation():
-    """Fetch a random movie recommendation."""
-    url = f"https://api.themoviedb.org/3/movie/popular"
-    params = {
-        "api_key": TMDB_KEY,
-        "language": "en-US",
-        "page": 1
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+def iter_random_recommendations(pages=1, language=DEFAULT_LANGUAGE, region=None):
+    """Fetch several pages of popular movies, yielding ``(page, titles)``."""
+    params = _locale_params(language, region)
+    return _iter_pages("popular", "/movie/popular", params, pages)
 
-    movies = response.json()["results"]
-    return [movie["title"] for movie in movies]
+def get_random_recommendation(pages=1, language=DEFAULT_LANGUAGE, region=None):
+    """Fetch a random movie recommendation."""
+    return [title for _, titles in iter_random_recommendations(pages, language, region) for title in titles]
 
-def get_movie_summary(movie_name):
+def get_movie_summary(movie_name, language=DEFAULT_LANGUAGE):
     """Fetch the summary of a movie."""
-    search_url = f"https://api.themoviedb.org/3/search/movie"
-    search_params = {
-        "api_key": TMDB_KEY,
-        "query": movie_name,
-        "language": "en-US"
-    }
-    search_response = requests.get(search_url, params=search_params)
-    search_response.raise_for_status()
-
-    results = search_response.json()["results"]
-    if not results:
-        raise ValueError(f"Movie '{movie_name}' not found!")
+    local = _catalog_movie(movie_name) if language == DEFAULT_LANGUAGE else None
+    if local is not None and local.overview:
+        return local.overview
 
-    movie_id = results[0]["id"]
-
-    movie_url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-    movie_params = {
-        "api_key": TMDB_KEY,
-        "language": "en-US"
-    }
-    movie_response = requests.get(movie_url, params=movie_params)
-    movie_response.raise_for_status()
+    movie_id = _resolve_movie_id(movie_name, language)
 
-    movie = movie_response.json()
+    movie_params = _locale_params(language)
+    movie = _fetch("movie", f"/movie/{movie_id}", movie_params)
+    if language == DEFAULT_LANGUAGE:
+        # Keep the overview for local search and later summary lookups
+        catalog.remember(movie)
     return movie["overview"]
 
-def get_trending_movies_tmdb():
-    """Fetch the trending movie."""
-    url = f"https://api.themoviedb.org/3/trending/movie/week"
-    params = {
-        "api_key": TMDB_KEY,
-        "language": "en-US",
-        "page": 1
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
+def iter_trending_movies(pages=1, language=DEFAULT_LANGUAGE):
+    """Fetch several pages of trending movies, yielding ``(page, titles)``; TMDB's trending list has no regions."""
+    params = _locale_params(language)
+    return _iter_pages("trending", "/trending/movie/week", params, pages)
 
-    movies = response.json()["results"]
-    print("retreived movies")
-    return [movie["title"] for movie in movies]
+def get_trending_movies_tmdb(pages=1, language=DEFAULT_LANGUAGE):
+    """Fetch the trending movie."""
+    movies = [title for _, titles in iter_trending_movies(pages, language) for title in titles]
+    logger.debug("Retrieved %d trending movies", len(movies))
+    return movies
+
+# TMDB lists kept in memory for the trending and random endpoints
+LIST_PATHS = {
+    "trending": "/trending/movie/week",
+    "popular": "/movie/popular",
+}
+
+# Seconds a list page downloaded by one worker's snapshot refresh serves the other workers' refreshes
+SNAPSHOT_SHARE_TTL = float(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "900"))
+
+def _load_list_page(kind, region, language, page):
+    """Download one page of a TMDB list for a locale, bypassing the in-process response cache."""
+    path, params = LIST_PATHS[kind], dict(_locale_params(language, region), page=page)
+    return _download((path, tuple(sorted(params.items()))), path, params, SNAPSHOT_SHARE_TTL)
+
+list_snapshots = ListSnapshots(
+    _load_list_page,
+    kinds=tuple(LIST_PATHS),
+    regional=("popular",),
+    locales=HOT_LOCALES,
+    pages=int(os.getenv("SNAPSHOT_PAGES", "5")),
+    max_age=CACHE_TTLS["trending"],
+    max_cold=int(os.getenv("SNAPSHOT_MAX_COLD", "16")),
+)
+
+def get_trending_snapshot(region, pages=1, language=DEFAULT_LANGUAGE):
+    """Return ``(page, titles)`` for the first pages of the trending list held in memory."""
+    return list_snapshots.page_titles("trending", region, pages, language)
+
+def sample_popular_movies(region, k=PAGE_SIZE, language=DEFAULT_LANGUAGE):
+    """Pick up to k random popular titles from the list held in memory, weighted by popularity."""
+    return list_snapshots.sample("popular", region, k, language)
+
+def iter_random_popular_movies(region, pages=1, language=DEFAULT_LANGUAGE):
+    """
+    Yield ``(page, titles)`` for ``pages`` pages of popular movies in random order.
+
+    The pages held in memory are sampled as by :func:`sample_popular_movies`.
+    Pages past them are streamed from TMDB, each one shuffled; the first of
+    those is fetched before returning so errors surface to the caller.
+    """
+    titles = sample_popular_movies(region, pages * PAGE_SIZE, language)
+    deeper = None
+    if pages > list_snapshots.pages:
+        deeper = _iter_pages("popular", "/movie/popular", _locale_params(language, region), pages,
+                             start=list_snapshots.pages + 1)
+    return _random_page_stream(titles, deeper)
+
+def _random_page_stream(titles, deeper):
+    try:
+        for start in range(0, len(titles), PAGE_SIZE):
+            yield start // PAGE_SIZE + 1, titles[start:start + PAGE_SIZE]
+        for page, page_titles in deeper or ():
+            yield page, random.sample(page_titles, len(page_titles))
+    finally:
+        if deeper is not None:
+            deeper.close()
 
 if __name__ == "__main__":
     
@@ -4,8 +4,9 @@ import os
 
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import Column, String, Integer
+from models.library import delete_user_data
 from utils.logger import configure_logger
-from utils.db_config import Base, Session
+from utils.db_config import Base, db_session
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
@@ -44,7 +45,8 @@ class User(Base):
         Raises:
             ValueError: If a user with the username already exists.
         """
-        session = Session()
+        # Thread-local session; the app removes it when the request ends
+        session = db_session()
         salt, hashed_password = cls._generate_hashed_password(password)
         new_user = cls(username=username, salt=salt, password=hashed_password)
         try:
@@ -59,7 +61,6 @@ class User(Base):
             session.rollback()
             logger.error("Database error: %s", str(e))
             raise
-        session.close()
     @classmethod
     def check_password(cls, username: str, password: str) -> bool:
         """
@@ -75,7 +76,7 @@ class User(Base):
         Raises:
             ValueError: If the user does not exist.
         """
-        session = Session()
+        session = db_session()
         user = session.query(User).filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
@@ -94,15 +95,16 @@ class User(Base):
         Raises:
             ValueError: If the user does not exist.
         """
-        session = Session()
+        session = db_session()
         user = session.query(User).filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
             raise ValueError(f"User {username} not found")
+        # Ratings and watchlist rows go with the account
+        delete_user_data(session, user.id)
         session.delete(user)
         session.commit()
-        print("User %s deleted successfully", username)
-        session.close()
+        logger.info("User %s deleted successfully", username)
     @classmethod
     def update_password(cls, username: str, new_password: str) -> None:
         """
@@ -115,7 +117,7 @@ class User(Base):
         Raises:
             ValueError: If the user does not exist.
         """
-        session = Session()
+        session = db_session()
         user = session.query(User).filter_by(username=username).first()
         if not user:
             logger.info("User %s not found", username)
@@ -126,4 +128,3 @@ class User(Base):
         user.password = hashed_password
         session.commit()
         logger.info("Password updated successfully for user: %s", username)
-        session.close()
@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy import create_engine
+
+from models import tmdb_model
+from test.fake_tmdb import FakeTMDB
+from utils.db_config import Base, Session
+from utils.tmdb_client import AsyncTMDBClient, TMDBClient, set_async_client, set_client
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path):
+    """Bind the shared session factory to a fresh SQLite file per test."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    Session.configure(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def fake_tmdb():
+    """Start a local fake TMDB server and route the shared client to it."""
+    fake = FakeTMDB().start()
+    set_client(TMDBClient(api_key="test-key", base_url=fake.url))
+    set_async_client(AsyncTMDBClient(api_key="test-key", base_url=fake.url))
+    tmdb_model.response_cache.clear()
+    tmdb_model.genre_index.clear()
+    tmdb_model.title_resolver.clear()
+    tmdb_model.title_index.clear()
+    tmdb_model.list_snapshots.clear()
+    yield fake
+    set_client(None)
+    set_async_client(None)
+    fake.stop()
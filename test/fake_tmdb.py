@@ -0,0 +1,187 @@
+"""A tiny in-process stand-in for the TMDB API used by the offline tests."""
+import json
+import random
+from collections import deque
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 20
+
+GENRES = [
+    {"id": 28, "name": "Action"},
+    {"id": 35, "name": "Comedy"},
+    {"id": 18, "name": "Drama"},
+    {"id": 878, "name": "Science Fiction"},
+    {"id": 27, "name": "Horror"},
+]
+
+
+def _build_movies():
+    movies = [
+        {"id": 155, "title": "The Dark Knight", "original_title": "The Dark Knight",
+         "release_date": "2008-07-16", "genre_ids": [28, 18], "popularity": 120.5,
+         "vote_average": 8.5, "vote_count": 30000,
+         "overview": "Batman raises the stakes in his war on crime in Gotham."},
+        {"id": 27205, "title": "Inception", "original_title": "Inception",
+         "release_date": "2010-07-15", "genre_ids": [28, 878], "popularity": 95.2,
+         "vote_average": 8.4, "vote_count": 34000,
+         "overview": "A thief who steals corporate secrets through dream-sharing technology."},
+    ]
+    for n in range(1, 99):
+        genre = GENRES[n % len(GENRES)]["id"]
+        movies.append({
+            "id": 1000 + n, "title": f"Movie {n}", "original_title": f"Movie {n}",
+            "release_date": f"{1980 + n % 40}-01-01", "genre_ids": [genre],
+            "popularity": float(200 - n), "vote_average": 5 + (n % 5),
+            "vote_count": 100 * n, "overview": f"Overview of movie {n}.",
+        })
+    return movies
+
+
+MOVIES = _build_movies()
+
+
+class FakeTMDB:
+    """
+    Serve a fixed TMDB-shaped dataset over HTTP on localhost.
+
+    Every request is recorded in ``requests`` as ``(path, params)`` and the
+    client port of each accepted connection in ``connections``.
+
+    Args:
+        latency (float): Seconds each response is delayed by.
+        jitter (float): Up to this many seconds are added to or taken off
+            the delay, uniformly at random.
+        error_rate (float): Share of requests answered with ``error_status``.
+        error_status (int): Status of injected errors.
+        seed (int): Seed of the latency and error draws.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, seed=None):
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.scripted_failures = deque()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/3"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, path):
+        """Return how many requests were made to ``path``."""
+        with self.lock:
+            return sum(1 for p, _ in self.requests if p == path)
+
+    def fail_next(self, count, status=429, retry_after=None):
+        """Answer the next ``count`` requests with ``status``, sending ``Retry-After`` if given."""
+        with self.lock:
+            self.scripted_failures.extend([(status, retry_after)] * count)
+
+    def delay_and_fault(self):
+        """
+        Return the seconds to wait before answering and the injected failure, if any.
+
+        The failure is a ``(status, retry_after)`` pair, or None to answer normally.
+        """
+        with self.lock:
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+            if self.scripted_failures:
+                failure = self.scripted_failures.popleft()
+            elif self.error_rate > 0 and self.random.random() < self.error_rate:
+                failure = (self.error_status, None)
+            else:
+                failure = None
+        return max(delay, 0.0), failure
+
+    def route(self, path, params):
+        """Return ``(status, body)`` for a request."""
+        if path == "/genre/movie/list":
+            return 200, {"genres": GENRES}
+        if path == "/discover/movie":
+            genre = int(params.get("with_genres", 0))
+            return 200, self._page([m for m in MOVIES if genre in m["genre_ids"]], params)
+        if path in ("/movie/popular", "/trending/movie/week"):
+            ranked = sorted(MOVIES, key=lambda m: m["popularity"], reverse=True)
+            return 200, self._page(ranked, params)
+        if path == "/search/movie":
+            query = params.get("query", "").lower()
+            return 200, self._page([m for m in MOVIES if query in m["title"].lower()], params)
+        parts = path.strip("/").split("/")
+        if len(parts) >= 2 and parts[0] == "movie" and parts[1].isdigit():
+            movie = next((m for m in MOVIES if m["id"] == int(parts[1])), None)
+            if movie is None:
+                return 404, {"status_message": "The resource you requested could not be found."}
+            if len(parts) == 3 and parts[2] == "recommendations":
+                related = [m for m in MOVIES if m["id"] != movie["id"]
+                           and set(m["genre_ids"]) & set(movie["genre_ids"])]
+                return 200, self._page(related, params)
+            if len(parts) == 2:
+                return 200, movie
+        return 404, {"status_message": "The resource you requested could not be found."}
+
+    @staticmethod
+    def _page(items, params):
+        page = int(params.get("page", 1))
+        start = (page - 1) * PAGE_SIZE
+        total_pages = max(1, -(-len(items) // PAGE_SIZE))
+        return {"page": page, "results": items[start:start + PAGE_SIZE],
+                "total_pages": total_pages, "total_results": len(items)}
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections.add(self.client_address[1])
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path = parsed.path[len("/3"):] if parsed.path.startswith("/3/") else parsed.path
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                with fake.lock:
+                    fake.requests.append((path, params))
+                delay, failure = fake.delay_and_fault()
+                if delay:
+                    time.sleep(delay)
+                retry_after = None
+                if failure:
+                    (status, retry_after), body = failure, {"status_message": "Injected failure."}
+                else:
+                    status, body = fake.route(path, params)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                if retry_after is not None:
+                    self.send_header("Retry-After", retry_after)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
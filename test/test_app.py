@@ -0,0 +1,94 @@
+import sqlite3
+
+import pytest
+
+import app as app_module
+from utils.migrations import latest_version
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    def make(**config):
+        return app_module.create_app({
+            "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+            "CATALOG_SYNC_INTERVAL": 0,
+            "SNAPSHOT_REFRESH_INTERVAL": 0,
+            **config,
+        })
+    return make
+
+
+def test_login_token_flow(make_app):
+    client = make_app().test_client()
+    assert client.post("/create-account", json={"username": "ann", "password": "pw"}).status_code == 201
+
+    token = client.post("/login", json={"username": "ann", "password": "pw"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/session", headers=headers).get_json() == {"username": "ann"}
+
+    response = client.post("/update-password", json={"username": "ann", "old_password": "pw", "new_password": "pw2"})
+    assert response.status_code == 200
+    assert client.get("/session", headers=headers).status_code == 401
+    fresh = {"Authorization": f"Bearer {response.get_json()['token']}"}
+    assert client.get("/session", headers=fresh).status_code == 200
+
+
+def test_restart_keeps_users(make_app, tmp_path):
+    make_app().test_client().post("/create-account", json={"username": "ann", "password": "pw"})
+
+    client = make_app().test_client()
+    assert client.post("/login", json={"username": "ann", "password": "pw"}).status_code == 200
+    with sqlite3.connect(tmp_path / "app.db") as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == latest_version()
+
+
+def test_startup_timings_recorded(make_app):
+    app = make_app()
+    timings = app.extensions["startup"]
+    assert timings["create_app_ms"] >= 0 and timings["first_request_ms"] is None
+    app.test_client().get("/health-check")
+    assert timings["first_request_ms"] > 0
+
+
+def test_ratings_watchlist_and_personal_recommendations(make_app):
+    client = make_app().test_client()
+    client.post("/create-account", json={"username": "ann", "password": "pw"})
+    token = client.post("/login", json={"username": "ann", "password": "pw"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.post("/ratings", json={"ratings": [{"movie_id": 1, "rating": 8}]}).status_code == 401
+    assert client.post("/ratings", json={"ratings": [{"movie_id": 1, "rating": 11}]}, headers=headers).status_code == 400
+    response = client.post("/ratings", json={"ratings": [{"movie_id": 1, "rating": 8}, {"movie_id": 2, "rating": 3}]},
+                           headers=headers)
+    assert response.get_json() == {"saved": 2}
+
+    assert client.post("/watchlist", json={"movie_ids": [5, 6, 5]}, headers=headers).get_json() == {"added": 2}
+    assert client.post("/watchlist", json={"movie_ids": [6]}, headers=headers).get_json() == {"added": 0}
+    assert client.delete("/watchlist", json={"movie_ids": [5]}, headers=headers).get_json() == {"removed": 1}
+    assert client.get("/watchlist", headers=headers).get_json() == {"watchlist": [6]}
+
+    # Nothing is computed at request time until the offline job has run
+    assert client.get("/get-personal-recommendations", headers=headers).get_json() == {
+        "recommendations": [], "computed_at": None}
+    from models.personal_recommendations import refresh_personal_recommendations
+    assert refresh_personal_recommendations() == 1
+    assert client.get("/get-personal-recommendations", headers=headers).status_code == 200
+
+
+def test_unknown_genre_is_a_json_404(make_app, fake_tmdb):
+    client = make_app().test_client()
+
+    for body in ({"genre": "no such genre"}, {"genre": "no such genre", "pages": 2}):
+        response = client.post("/get-recommendation-from-genre", json=body)
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "Genre 'no such genre' not found!"}
+    assert fake_tmdb.count("/discover/movie") == 0
+
+
+def test_unknown_title_is_a_json_404(make_app, fake_tmdb):
+    client = make_app().test_client()
+
+    for route in ("/get-recommendation-from-movies", "/get-movie-summary"):
+        response = client.post(route, json={"title": "Qwxzy Plorb"})
+        assert response.status_code == 404
+        assert response.get_json() == {"error": "Movie 'Qwxzy Plorb' not found!"}
@@ -0,0 +1,100 @@
+import os
+import runpy
+
+import pytest
+
+from utils.auth import SharedTokenStore, TokenStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_issue_and_verify():
+    store = TokenStore(secret="s3cret")
+    token = store.issue("alice")
+    assert store.verify(token) == "alice"
+    assert store.verify("nonsense") is None
+    assert store.verify(None) is None
+
+
+def test_forged_signature_rejected():
+    token = TokenStore(secret="one").issue("alice")
+    other = TokenStore(secret="two")
+    assert other.verify(token) is None
+    token_id, _ = token.split(".")
+    assert TokenStore(secret="one").verify(f"{token_id}.AAAA") is None
+
+
+def test_tokens_expire():
+    clock = FakeClock()
+    store = TokenStore(ttl=10, clock=clock)
+    token = store.issue("alice")
+    clock.now = 9
+    assert store.verify(token) == "alice"
+    clock.now = 10
+    assert store.verify(token) is None
+    assert len(store) == 0
+
+
+def test_revoke_user_and_single_token():
+    store = TokenStore()
+    first, second = store.issue("alice"), store.issue("alice")
+    bob = store.issue("bob")
+    store.revoke(bob)
+    assert store.verify(bob) is None
+    assert store.revoke_user("alice") == 2
+    assert store.verify(first) is None and store.verify(second) is None
+
+
+def test_least_recently_used_token_evicted():
+    store = TokenStore(max_tokens=2)
+    first, second = store.issue("a"), store.issue("b")
+    store.verify(first)
+    third = store.issue("c")
+    assert store.verify(second) is None
+    assert store.verify(first) == "a" and store.verify(third) == "c"
+    assert store.evictions == 1
+
+
+def test_shared_store_works_across_workers(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "sessions.sqlite")
+    # Two instances on one file stand in for two worker processes
+    first = SharedTokenStore(path, secret="s3cret", ttl=10, clock=clock)
+    second = SharedTokenStore(path, secret="s3cret", ttl=10, clock=clock)
+
+    alice, bob = first.issue("alice"), first.issue("bob")
+    assert second.verify(alice) == "alice"
+    assert SharedTokenStore(path, secret="other").verify(alice) is None
+
+    assert second.revoke_user("alice") == 1
+    assert first.verify(alice) is None
+    clock.now = 10
+    assert second.verify(bob) is None and len(first) == 0
+
+    with pytest.raises(ValueError):
+        SharedTokenStore(path, secret=None)
+
+
+def test_shared_store_keeps_at_most_max_tokens(tmp_path):
+    clock = FakeClock()
+    store = SharedTokenStore(str(tmp_path / "sessions.sqlite"), secret="s3cret", max_tokens=2, clock=clock)
+    tokens = []
+    for n in range(3):
+        clock.now = n
+        tokens.append(store.issue(f"user-{n}"))
+
+    assert store.prune() == 1 and store.evictions == 1
+    assert store.verify(tokens[0]) is None and store.verify(tokens[2]) == "user-2"
+
+
+def test_gunicorn_refuses_several_workers_without_a_secret(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.delenv("SESSION_SECRET", raising=False)
+    with pytest.raises(RuntimeError):
+        runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py"))
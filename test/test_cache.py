@@ -0,0 +1,101 @@
+import threading
+
+from utils.cache import PartitionedCache, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_and_miss_counters():
+    cache = TTLCache()
+    calls = []
+    loader = lambda: calls.append(1) or {"results": [1, 2]}
+
+    assert cache.get_or_load("k", loader, ttl=60) == {"results": [1, 2]}
+    assert cache.get_or_load("k", loader, ttl=60) == {"results": [1, 2]}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_by_size():
+    cache = TTLCache(max_bytes=30, sizeof=lambda value: 10)
+    for key in "abc":
+        cache.set(key, key, ttl=60)
+    cache.get("a")
+    cache.set("d", "d", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_reloaded():
+    clock = FakeClock()
+    cache = TTLCache(stale_factor=0, clock=clock)
+    cache.set("k", "old", ttl=10)
+    clock.now = 11
+
+    assert cache.get_or_load("k", lambda: "new", ttl=10) == "new"
+
+
+def test_stale_entry_served_while_refreshing():
+    clock = FakeClock()
+    cache = TTLCache(clock=clock)
+    cache.set("k", "old", ttl=10)
+    clock.now = 15
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return "new"
+
+    assert cache.get_or_load("k", loader, ttl=10) == "old"
+    assert refreshed.wait(1)
+    cache._executor.shutdown(wait=True)
+    assert cache.get("k") == "new"
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_partitions_have_separate_budgets_and_are_bounded():
+    cache = PartitionedCache(lambda key: key[0], partition_bytes=20, max_partitions=2, pinned=["en"],
+                             sizeof=lambda value: 10)
+    for n in range(3):
+        cache.set(("de", n), n, ttl=60)
+    cache.set(("en", 0), 0, ttl=60)
+
+    # A busy partition only evicts its own entries
+    assert cache.get(("de", 0)) is None and cache.get(("de", 2)) == 2
+    assert cache.get(("en", 0)) == 0
+
+    # A third locale drops the least recently used unpinned partition whole
+    cache.set(("fr", 0), 0, ttl=60)
+    assert cache.get(("de", 2)) is None and cache.get(("en", 0)) == 0
+    assert cache.dropped == 1
+    assert cache.stats()["de"]["entries"] == 0 and {"en", "fr"} <= set(cache.stats())
+
+
+
+def test_counters_never_go_down():
+    cache = PartitionedCache(lambda key: key[0], max_partitions=1)
+    cache.get_or_load(("de", 0), lambda: 0, ttl=60)
+    cache.get_or_load(("de", 0), lambda: 0, ttl=60)
+    before = cache.stats()["de"]
+
+    # Dropping the partition, clearing and recreating it all keep its totals
+    cache.set(("fr", 0), 0, ttl=60)
+    assert cache.stats()["de"]["hits"] == before["hits"] == 1
+    cache.get_or_load(("de", 1), lambda: 1, ttl=60)
+    cache.clear()
+    assert cache.stats()["de"]["misses"] == before["misses"] + 1
+    assert cache.stats()["de"]["entries"] == 0
+
+    single = TTLCache()
+    single.get_or_load("k", lambda: 1, ttl=60)
+    single.clear()
+    assert single.stats()["misses"] == 1 and len(single) == 0
@@ -0,0 +1,97 @@
+import datetime
+import json
+import os
+
+import requests
+
+from models import tmdb_model
+from models.catalog import MovieCatalog
+from models.catalog_sync import CatalogSync
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "catalog_sync")
+
+
+class RecordedClient:
+    """Replay recorded TMDB responses from test/fixtures/catalog_sync."""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, path, params=None):
+        self.calls.append((path, params))
+        name = path.strip("/").replace("/", "_") + ".json"
+        try:
+            with open(os.path.join(FIXTURES, name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            response = requests.Response()
+            response.status_code = 404
+            raise requests.HTTPError("404 Not Found", response=response)
+
+
+def _sync(client, today=datetime.date(2024, 11, 20)):
+    return CatalogSync(client, MovieCatalog(), today=lambda: today)
+
+
+def _seeded(client, today=datetime.date(2024, 11, 20)):
+    sync = _sync(client, today)
+    sync.sync_movies([155, 27205])
+    client.calls.clear()
+    return sync
+
+
+def test_sync_applies_changes_feed():
+    client = RecordedClient()
+
+    assert _seeded(client).run_once() == 2
+
+    catalog = MovieCatalog()
+    assert catalog.find_by_title("the dark knight").id == 155
+    assert catalog.recommendations(155) == ["Batman Begins", "The Dark Knight Rises", "Inception"]
+    assert {"id": 878, "name": "Science Fiction"} in catalog.genres("en-US")
+    assert catalog.get_state("last_sync_date") == "2024-11-20"
+    # Adult titles are skipped and duplicate change entries fetched once
+    assert [path for path, _ in client.calls].count("/movie/155") == 1
+    assert "/movie/4242" not in [path for path, _ in client.calls]
+
+
+def test_sync_only_refreshes_movies_in_the_catalog():
+    client = RecordedClient()
+    sync = _sync(client)
+    # A movie a user looked up, without its recommendations
+    sync.catalog.upsert_movie({"id": 155, "title": "The Dark Knight", "genre_ids": []})
+
+    assert sync.run_once() == 1
+
+    fetched = [path for path, _ in client.calls]
+    assert "/movie/155" in fetched
+    assert "/movie/27205" not in fetched and "/movie/999999" not in fetched
+    assert sync.catalog.get_movie(155).overview
+
+
+def test_sync_resumes_from_bookmark():
+    _sync(RecordedClient()).run_once()
+    client = RecordedClient()
+    _sync(client, today=datetime.date(2024, 11, 21)).run_once()
+
+    changes = [params for path, params in client.calls if path == "/movie/changes"]
+    assert changes[0]["start_date"] == "2024-11-20"
+
+
+def test_large_windows_are_split_across_runs():
+    sync = _seeded(RecordedClient())
+    sync.max_movies = 1
+
+    assert sync.run_once() == 1
+    assert sync.catalog.get_state("last_sync_date") is None
+    sync.run_once()
+    sync.run_once()
+    assert sync.catalog.get_state("last_sync_date") == "2024-11-20"
+
+
+def test_model_functions_read_catalog_first(fake_tmdb):
+    _seeded(RecordedClient())
+
+    assert tmdb_model.get_movie_summary("Inception").startswith("Cobb")
+    assert tmdb_model.get_recommendations_from_movie("The Dark Knight")[0] == "Batman Begins"
+    assert fake_tmdb.requests == []
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from models import tmdb_model
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, UpstreamUnavailable
+from utils.tmdb_client import AsyncTMDBClient, TMDBClient, parse_endpoint_timeouts, set_async_client, set_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_after_failures_and_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker("/movie/{id}", failure_threshold=2, reset_timeout=30, clock=clock)
+
+    breaker.record_status(404)
+    breaker.record_status(500)
+    breaker.record_status(503)
+    assert breaker.state == OPEN
+    with pytest.raises(UpstreamUnavailable) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call()
+    breaker.record_error(requests.ConnectionError())
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_status(200)
+    assert breaker.state == CLOSED and breaker.failures == 0
+    breaker.before_call()
+
+
+def test_clients_time_out_per_endpoint_and_fail_fast(fake_tmdb):
+    breakers = CircuitBreakers(failure_threshold=2, reset_timeout=60)
+    timeouts = {"/genre/movie/list": 0.05}
+    client = TMDBClient(api_key="test-key", base_url=fake_tmdb.url, endpoint_timeouts=timeouts, breakers=breakers)
+    async_client = AsyncTMDBClient(api_key="test-key", base_url=fake_tmdb.url, endpoint_timeouts=timeouts,
+                                   breakers=breakers)
+    fake_tmdb.latency = 0.5
+    try:
+        with pytest.raises(requests.Timeout):
+            client.get("/genre/movie/list")
+        with pytest.raises(httpx.TimeoutException):
+            asyncio.run(async_client.get("/genre/movie/list"))
+
+        calls = len(fake_tmdb.requests)
+        with pytest.raises(UpstreamUnavailable):
+            client.get("/genre/movie/list")
+        assert len(fake_tmdb.requests) == calls
+        assert breakers.states() == {"/genre/movie/list": OPEN}
+    finally:
+        async_client.close()
+
+    assert parse_endpoint_timeouts(" /search/movie=3, /movie/{id}=4.5 ") == {"/search/movie": 3.0, "/movie/{id}": 4.5}
+    with pytest.raises(ValueError):
+        parse_endpoint_timeouts("/search/movie")
+
+
+def test_open_circuit_serves_the_last_good_response_as_stale(fake_tmdb, tmp_path, monkeypatch):
+    import app as app_module
+
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    set_client(TMDBClient(api_key="test-key", base_url=fake_tmdb.url, breakers=breakers))
+    set_async_client(AsyncTMDBClient(api_key="test-key", base_url=fake_tmdb.url, breakers=breakers))
+    # Cached discover responses expire at once but are kept as a fallback
+    monkeypatch.setitem(tmdb_model.CACHE_TTLS, "discover", 0)
+    app_module.payload_cache.clear()
+    app = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+
+    fresh = app.post("/get-recommendation-from-genre", json={"genre": "Action"})
+    assert fresh.status_code == 200 and "Warning" not in fresh.headers
+    app_module.payload_cache.clear()
+
+    fake_tmdb.fail_next(1, status=500)
+    stale = app.post("/get-recommendation-from-genre", json={"genre": "Action"})
+    assert stale.status_code == 200 and stale.json == fresh.json
+    assert stale.headers["Warning"] == '110 - "Response is Stale"'
+
+    # The circuit is open now: the fallback is served without calling TMDB
+    calls = len(fake_tmdb.requests)
+    again = app.post("/get-recommendation-from-genre", json={"genre": "Action"})
+    assert again.json == fresh.json and "Warning" in again.headers
+    assert len(fake_tmdb.requests) == calls
+
+    uncached = app.post("/get-recommendation-from-genre", json={"genre": "Comedy"})
+    assert uncached.status_code == 503
+    assert int(uncached.headers["Retry-After"]) > 0
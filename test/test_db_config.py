@@ -0,0 +1,51 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from models.user import User
+from utils.db_config import Base, make_engine
+
+
+def test_production_mode_pragmas(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'prod.db'}", mode="production", echo=False)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+    assert engine.pool.size() == 10
+    assert not engine.echo
+    engine.dispose()
+
+
+def test_development_mode_keeps_rollback_journal(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'dev.db'}", mode="development", echo=False)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
+
+
+def test_concurrent_writers_do_not_lock(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'prod.db'}", mode="production", echo=False)
+    Base.metadata.create_all(engine)
+    sessions = scoped_session(sessionmaker(bind=engine))
+    seen = set()
+    lock = threading.Lock()
+
+    def create(n):
+        session = sessions()
+        with lock:
+            seen.add(id(session))
+        try:
+            session.add(User(username=f"user{n}", salt="s", hashed_password=os.urandom(8).hex()))
+            session.commit()
+            return session.query(User).filter(User.username == f"user{n}").count()
+        finally:
+            sessions.remove()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(create, range(200))) == [1] * 200
+    assert len(seen) > 1
+    engine.dispose()
@@ -0,0 +1,27 @@
+import pytest
+
+from models.genre_index import GenreIndex
+
+
+def test_lookup_is_case_and_separator_insensitive():
+    index = GenreIndex(lambda language: [{"id": 878, "name": "Science Fiction"}])
+    assert index.lookup("science fiction") == 878
+    assert index.lookup("SCIENCE-FICTION") == 878
+    assert index.lookup("Sci-Fi") == 878
+    assert index.lookup("878") == 878
+
+
+def test_one_index_per_language():
+    names = {"en-US": "Comedy", "fr-FR": "Comédie"}
+    loads = []
+
+    def loader(language):
+        loads.append(language)
+        return [{"id": 35, "name": names[language]}]
+
+    index = GenreIndex(loader)
+    assert index.lookup("comédie", "fr-FR") == 35
+    assert index.lookup("comedy", "en-US") == 35
+    with pytest.raises(ValueError):
+        index.lookup("comédie", "en-US")
+    assert loads == ["fr-FR", "en-US"]
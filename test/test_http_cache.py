@@ -0,0 +1,80 @@
+import gzip
+import json
+
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from models import tmdb_model
+from utils import http_cache
+from utils.http_cache import EncodedPayload, choose_encoding
+
+
+def _client(tmp_path):
+    import app as app_module
+
+    app_module.payload_cache.clear()
+    return app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+
+
+def test_encoding_negotiation():
+    accept = parse_accept_header("gzip;q=0.5, br", Accept)
+    assert choose_encoding(accept, ("br", "gzip")) == "br"
+    assert choose_encoding(accept, ("gzip",)) == "gzip"
+    assert choose_encoding(parse_accept_header("identity", Accept), ("gzip",)) is None
+
+
+def test_small_payloads_are_not_compressed():
+    assert EncodedPayload(b'{"a":1}').encoded == {}
+    payload = EncodedPayload(json.dumps(list(range(500))).encode())
+    assert gzip.decompress(payload.encoded["gzip"]) == payload.body
+
+
+def test_trending_polls_become_304s(fake_tmdb, tmp_path, monkeypatch):
+    monkeypatch.setattr(http_cache, "MIN_COMPRESS_BYTES", 64)
+    client = _client(tmp_path)
+    first = client.post("/get-trending-movies", json={"region": "US"}, headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(first.data))["trending_movies"][0] == "Movie 1"
+
+    again = client.post("/get-trending-movies", json={"region": "US"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == etag
+
+    # The tag follows the content, so a refresh that changes nothing still answers 304
+    tmdb_model.list_snapshots.refresh_all()
+    fresh = client.post("/get-trending-movies", json={"region": "US"}, headers={"If-None-Match": etag})
+    assert fresh.status_code == 304
+
+
+def test_genre_payload_reused_and_dynamic_responses_tagged(fake_tmdb, tmp_path):
+    client = _client(tmp_path)
+    first = client.post("/get-recommendation-from-genre", json={"genre": "Action"})
+    client.post("/get-recommendation-from-genre", json={"genre": "action "})
+    assert fake_tmdb.count("/discover/movie") == 1
+
+    summary = client.post("/get-movie-summary", json={"title": "Inception"})
+    assert summary.headers["ETag"].startswith('W/"')
+    repeat = client.post("/get-movie-summary", json={"title": "Inception"},
+                         headers={"If-None-Match": summary.headers["ETag"]})
+    assert repeat.status_code == 304
+    assert first.get_json()["recommendations"]
+
+
+def test_pre_encoded_bodies_match_jsonify(fake_tmdb, tmp_path):
+    import app as app_module
+    from flask import jsonify
+
+    client = _client(tmp_path)
+    body = client.post("/get-trending-movies", json={"region": "US"}).get_data()
+    genre_body = client.post("/get-recommendation-from-genre", json={"genre": "action"}).get_data()
+
+    with client.application.app_context():
+        assert body == jsonify(json.loads(body)).get_data()
+        assert genre_body == jsonify(json.loads(genre_body)).get_data()
+        assert app_module._payload({"a": [1, 2]}).body == b'{"a":[1,2]}\n'
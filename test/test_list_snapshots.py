@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+
+import pytest
+
+from models import tmdb_model
+from models.list_snapshots import ListSnapshots
+from models.locales import normalize_language, normalize_region
+
+
+def _loader(calls, movies=100, fail=False):
+    def load(kind, region, language, page):
+        calls.append((kind, region, language, page))
+        if fail:
+            raise ConnectionError("TMDB is down")
+        start = (page - 1) * 20
+        results = [{"title": f"{kind} {language} {region} {n}", "popularity": float(movies - n)}
+                   for n in range(start, min(start + 20, movies))]
+        return {"results": results, "total_pages": -(-movies // 20)}
+    return load
+
+
+def test_locale_is_normalized():
+    assert normalize_region(" gb ") == "GB"
+    assert normalize_language("PT-br") == "pt-BR"
+    with pytest.raises(ValueError):
+        normalize_region("United States")
+    with pytest.raises(ValueError):
+        normalize_language("english")
+
+
+def test_refresh_all_fetches_hot_locales_only():
+    calls = []
+    snapshots = ListSnapshots(_loader(calls), locales=[("en-US", "US"), ("de-DE", "DE")], pages=3)
+
+    assert snapshots.refresh_all() == 4
+    # Trending does not vary by region, so it is fetched once per language
+    assert len(calls) == 12
+    assert [page for page, _ in snapshots.page_titles("trending", "AT", 5, "de-de")] == [1, 2, 3]
+    snapshots.sample("popular", "us", 10)
+    assert len(calls) == 12
+
+
+def test_cold_locales_are_lazy_and_bounded():
+    calls = []
+    snapshots = ListSnapshots(_loader(calls), locales=[("en-US", "US")], pages=1, max_cold=2)
+    snapshots.refresh_all()
+
+    for region in ("FR", "IT", "ES"):
+        snapshots.sample("popular", region, 5, "fr-FR")
+    assert not snapshots.loaded("popular", "FR", "fr-FR")
+    assert len(snapshots) == 4
+    # Only hot locales are refreshed in the background
+    calls.clear()
+    snapshots.refresh_all()
+    assert {(region, language) for _, region, language, _ in calls} == {(None, "en-US"), ("US", "en-US")}
+
+
+def test_samples_are_distinct_and_vary():
+    snapshots = ListSnapshots(_loader([]), pages=5, seed=1)
+    draws = [snapshots.sample("popular", "US", 20) for _ in range(20)]
+
+    assert all(len(set(draw)) == 20 for draw in draws)
+    assert len({tuple(draw) for draw in draws}) > 1
+    # Picks come from the whole snapshot, not just page 1
+    assert len({title for draw in draws for title in draw}) > 40
+    assert len(snapshots.sample("popular", "US", 500)) == 100
+
+
+def test_failed_refresh_keeps_previous_snapshot():
+    calls = []
+    snapshots = ListSnapshots(_loader(calls), pages=1)
+    before = snapshots.page_titles("trending", "US")
+
+    snapshots._loader = _loader(calls, fail=True)
+    assert snapshots.refresh_all() == 0
+    assert snapshots.page_titles("trending", "US") == before
+
+
+def test_cold_loads_only_wait_for_the_same_list():
+    calls = []
+    release = threading.Event()
+    load = _loader(calls, movies=20)
+
+    def slow_for_german(kind, region, language, page):
+        if language == "de-DE":
+            release.wait(5)
+        return load(kind, region, language, page)
+
+    snapshots = ListSnapshots(slow_for_german, locales=[], pages=1)
+    waiting = [threading.Thread(target=snapshots.get, args=("trending", None, "de-DE")) for _ in range(3)]
+    for thread in waiting:
+        thread.start()
+    while not any(thread.is_alive() for thread in waiting) or not snapshots._loads.stats()["in_flight"]:
+        time.sleep(0.001)
+
+    # Another locale loads while the German list is stuck
+    assert snapshots.page_titles("trending", None, language="fr-FR")[0][1][0] == "trending fr-FR None 0"
+    assert not [call for call in calls if call[2] == "de-DE"]
+    release.set()
+    for thread in waiting:
+        thread.join()
+    assert [call for call in calls if call[2] == "de-DE"] == [("trending", None, "de-DE", 1)]
+
+
+def test_endpoints_serve_snapshots_without_upstream_calls(fake_tmdb, tmp_path):
+    import app as app_module
+
+    client = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+    tmdb_model.list_snapshots.refresh_all()
+    fetched = len(fake_tmdb.requests)
+
+    trending = client.post("/get-trending-movies", json={"region": "us"}).get_json()["trending_movies"]
+    random_picks = client.post("/get-random-recommendation", json={"region": "US"}).get_json()["recommendations"]
+    streamed = client.post("/get-trending-movies", json={"region": "US", "limit": 45}).get_data(as_text=True)
+
+    assert trending[:2] == ["Movie 1", "Movie 2"] and len(random_picks) == 20
+    assert len(streamed.splitlines()) == 45
+    assert len(fake_tmdb.requests) == fetched
+    assert client.post("/get-trending-movies", json={"region": "USA"}).status_code == 400
+
+    # Another market is fetched on its first request, with its language passed through
+    client.post("/get-random-recommendation", json={"region": "DE", "language": "de-DE"})
+    assert ("/movie/popular", {"api_key": "test-key", "language": "de-DE", "region": "DE", "page": "1"}) \
+        in fake_tmdb.requests
+
+
+def test_random_pages_past_the_snapshot_are_streamed_from_tmdb(fake_tmdb, tmp_path, monkeypatch):
+    import app as app_module
+
+    client = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+    monkeypatch.setattr(tmdb_model.list_snapshots, "pages", 2)
+
+    lines = client.post("/get-random-recommendation", json={"region": "US", "pages": 4}).get_data(as_text=True)
+    titles = [json.loads(line)["title"] for line in lines.splitlines()]
+
+    # Two pages sampled from memory, then pages 3 and 4 from TMDB; nothing is cut off or repeated
+    assert len(titles) == len(set(titles)) == 80
+    assert fake_tmdb.count("/movie/popular") == 4
+    assert set(titles[40:]) == set(tmdb_model.get_random_recommendation(pages=4)[40:])
+
+    limited = client.post("/get-random-recommendation", json={"region": "US", "limit": 30}).get_data(as_text=True)
+    assert len(limited.splitlines()) == 30
@@ -0,0 +1,113 @@
+import threading
+import time
+
+from utils.metrics import Registry, path_template, track_caches
+
+
+def test_counters_merge_threads_and_survive_their_exit():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+
+    def work():
+        for _ in range(1000):
+            requests.inc("/a")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests.inc("/b", amount=2)
+
+    assert requests.value("/a") == 8000
+    # Finished threads are folded into one retired shard
+    assert len(requests._shards) == 1
+    assert 'requests_total{route="/a"} 8000' in registry.render()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, "/a")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 4.05' in lines
+    assert latency.count("/a") == 4
+
+
+def test_cache_stats_and_path_templates():
+    registry = Registry()
+    stats = {"hits": 3, "stale_hits": 1, "misses": 4, "evictions": 0, "bytes": 10}
+    track_caches(lambda: {"tmdb:en-US": stats}, registry)
+
+    text = registry.render()
+    assert 'cache_hit_ratio{cache="tmdb:en-US"} 0.5' in text
+    assert 'cache_misses_total{cache="tmdb:en-US"} 4' in text
+    assert path_template("/movie/155/recommendations") == "/movie/{id}/recommendations"
+
+
+def test_metrics_endpoint_covers_routes_upstream_and_database(fake_tmdb, tmp_path):
+    import app as app_module
+
+    client = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+    served = app_module.HTTP_REQUESTS.value("/get-movie-summary", "POST", "200")
+    client.post("/get-movie-summary", json={"title": "Inception"})
+    client.post("/login", json={"username": "nobody", "password": "secret"})
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+    assert response.mimetype == "text/plain"
+    # The registry is process-wide, so compare with the count before this test
+    assert app_module.HTTP_REQUESTS.value("/get-movie-summary", "POST", "200") == served + 1
+    assert 'http_requests_total{route="unmatched",method="GET",status="404"}' in text
+    assert 'tmdb_request_duration_seconds_count{endpoint="/movie/{id}"}' in text
+    assert 'tmdb_requests_total{endpoint="/search/movie",status="200"}' in text
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in text
+    assert 'cache_hit_ratio{cache="payload"}' in text
+
+
+def test_metrics_endpoint_counts_coalesced_upstream_calls(tmp_path):
+    import app as app_module
+    from models.tmdb_model import upstream_flights
+
+    client = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+
+    def scrape():
+        lines = client.get("/metrics").get_data(as_text=True).splitlines()
+        return {name: float(value) for name, value in (line.split() for line in lines if line.startswith("upstream_"))}
+
+    before = scrape()
+    release = threading.Event()
+    leader = threading.Thread(target=upstream_flights.do, args=("coalesce-test", lambda: release.wait(5)))
+    leader.start()
+    while upstream_flights.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    follower = threading.Thread(target=upstream_flights.do, args=("coalesce-test", lambda: None))
+    follower.start()
+    while upstream_flights.stats()["coalesced"] == before["upstream_coalesced_total"]:
+        time.sleep(0.001)
+    during = scrape()
+    release.set()
+    leader.join()
+    follower.join()
+
+    # The registry is process-wide, so compare with the counts before this test
+    assert during["upstream_calls_in_flight"] >= 1
+    after = scrape()
+    assert after["upstream_calls_total"] == before["upstream_calls_total"] + 1
+    assert after["upstream_coalesced_total"] == before["upstream_coalesced_total"] + 1
+    assert after["upstream_call_errors_total"] == before["upstream_call_errors_total"]
@@ -0,0 +1,29 @@
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from utils.migrations import latest_version, migrate, migrations, schema_version
+
+
+def test_fresh_database_reaches_latest_version(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert migrate(engine) == latest_version() == len(migrations())
+    assert schema_version(engine) == latest_version()
+    engine.dispose()
+
+
+def test_existing_unversioned_database_keeps_its_data(tmp_path):
+    path = tmp_path / "legacy.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE,"
+                     " salt TEXT NOT NULL, hashed_password TEXT NOT NULL)")
+        conn.execute("INSERT INTO users (username, salt, hashed_password) VALUES ('ann', 's', 'h')")
+
+    engine = create_engine(f"sqlite:///{path}")
+    migrate(engine)
+    migrate(engine)
+    engine.dispose()
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT username FROM users").fetchall() == [("ann",)]
+        assert conn.execute("SELECT count(*) FROM catalog_movies").fetchone() == (0,)
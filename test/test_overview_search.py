@@ -0,0 +1,68 @@
+import threading
+import time
+
+from models import tmdb_model
+from models.overview_search import OverviewIndex, tokenize
+
+ROWS = [
+    (1, "Ocean's Eleven", "A crew of thieves plans a casino heist in Las Vegas."),
+    (2, "Interstellar", "Explorers travel through a wormhole in space to save humanity."),
+    (3, "Space Heist", "A gang of thieves attempts a heist on a space station."),
+    (4, "The Notebook", "A poor young man falls in love with a rich young woman."),
+]
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("The thieves plan heists in SPACE") == ["thieve", "plan", "heist", "space"]
+
+
+def test_best_match_combines_terms():
+    results = OverviewIndex.build(ROWS).search("heist in space", k=3)
+    assert results[0][:2] == (3, "Space Heist")
+    assert {movie_id for movie_id, _, _ in results} == {1, 2, 3}
+    assert results[0][2] > results[1][2]
+
+
+def test_unknown_terms_and_limit():
+    index = OverviewIndex.build(ROWS)
+    assert index.search("dinosaur") == []
+    assert len(index.search("heist space love", k=2)) == 2
+
+
+def test_save_and_load(tmp_path):
+    OverviewIndex.build(ROWS).save(tmp_path)
+    loaded = OverviewIndex.load(tmp_path)
+    assert len(loaded) == 4
+    assert loaded.search("wormhole")[0][:2] == (2, "Interstellar")
+
+
+def test_search_covers_seen_summaries(fake_tmdb, tmp_path, monkeypatch):
+    monkeypatch.setattr(tmdb_model, "OVERVIEW_INDEX_DIR", str(tmp_path / "missing"))
+    monkeypatch.setattr(tmdb_model, "_overview_index", None)
+    tmdb_model.get_movie_summary("Inception")
+
+    results = tmdb_model.search_movies("dream sharing thief")
+    assert results[0]["id"] == 27205
+    assert results[0]["title"] == "Inception"
+
+
+def test_stale_index_is_served_while_rebuilt(fake_tmdb, tmp_path, monkeypatch):
+    monkeypatch.setattr(tmdb_model, "OVERVIEW_INDEX_DIR", str(tmp_path / "missing"))
+    monkeypatch.setattr(tmdb_model, "_overview_index", None)
+    monkeypatch.setattr(tmdb_model, "_overview_built_at", None)
+    assert tmdb_model.search_movies("dream sharing thief") == []
+
+    tmdb_model.get_movie_summary("Inception")
+    monkeypatch.setattr(tmdb_model, "OVERVIEW_INDEX_REFRESH", 0)
+    release = threading.Event()
+    overview_rows = tmdb_model.catalog.overview_rows
+    monkeypatch.setattr(tmdb_model.catalog, "overview_rows", lambda: release.wait(5) and overview_rows())
+
+    # The rebuild is stuck reading the catalog; searches keep using the old index
+    assert tmdb_model.search_movies("dream sharing thief") == []
+    release.set()
+    deadline = time.monotonic() + 5
+    while tmdb_model._overview_rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+    monkeypatch.setattr(tmdb_model, "OVERVIEW_INDEX_REFRESH", 600)
+    assert tmdb_model.search_movies("dream sharing thief")[0]["title"] == "Inception"
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from models import library
+from models.catalog import MovieCatalog
+from models.user import User
+from models.personal_recommendations import build_interactions, item_similarities, refresh_personal_recommendations
+from utils.db_config import Session
+
+RATINGS = [
+    (1, 10, 9), (1, 11, 8), (1, 12, 2),
+    (2, 10, 9), (2, 11, 9), (2, 13, 9),
+    (3, 10, 8), (3, 13, 7), (3, 14, 3),
+]
+
+
+def test_ratings_are_centred_per_user():
+    user_ids, movie_ids, matrix = build_interactions(RATINGS, [(1, 13), (1, 10)])
+    row = matrix[0].toarray().ravel()
+    # Liked, liked, disliked, and a watchlist entry; the rated movie 10 keeps its rating
+    assert row[0] > 0 and row[1] > 0 and row[2] < 0
+    assert row[3] == pytest.approx(0.5)
+    assert list(user_ids) == [1, 2, 3] and list(movie_ids) == [10, 11, 12, 13, 14]
+
+
+def test_similarities_keep_top_k_without_self():
+    _, _, matrix = build_interactions(RATINGS, [])
+    sims = item_similarities(matrix, k=1)
+    assert np.diff(sims.indptr).max() <= 1
+    assert sims.diagonal().sum() == 0
+
+
+def test_refresh_stores_unseen_top_n():
+    catalog = MovieCatalog()
+    for movie_id, popularity in ((10, 5.0), (11, 4.0), (13, 3.0), (50, 99.0)):
+        catalog.upsert_movie({"id": movie_id, "title": f"Movie {movie_id}", "popularity": popularity})
+    session = Session()
+    session.add_all([User(id=1, username="ann", salt="s", hashed_password="h"),
+                     User(id=2, username="bob", salt="s", hashed_password="h")])
+    library.add_ratings(session, 1, [(10, 9.0), (11, 8.0)])
+    library.add_ratings(session, 2, [(10, 9.0), (11, 9.0), (13, 9.0)])
+    session.commit()
+    session.close()
+
+    assert refresh_personal_recommendations(catalog=catalog, top_n=2) == 2
+
+    session = Session()
+    picks, computed_at = library.personal_recommendations(session, "ann")
+    session.close()
+    # Bob's taste suggests 13; the most popular unseen movie fills the remaining slot
+    assert [pick["id"] for pick in picks] == [13, 50]
+    assert picks[1] == {"id": 50, "title": "Movie 50", "score": 0.0} and computed_at is not None
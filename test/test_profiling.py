@@ -0,0 +1,61 @@
+import asyncio
+import pstats
+
+from utils.profiling import RequestProfile, record_span, span
+
+
+def test_spans_nest_per_task_and_fold_into_self_time():
+    profile = RequestProfile("GET /x")
+    profile.start()
+
+    async def fetch(name):
+        with span(name):
+            await asyncio.sleep(0.01)
+            record_span("sql SELECT", 0.002)
+
+    async def view():
+        with span("view"):
+            await asyncio.gather(fetch("GET /a"), fetch("GET /b"))
+
+    asyncio.run(view())
+    profile.stop()
+    folded = dict(line.rsplit(" ", 1) for line in profile.collapsed().splitlines())
+
+    assert set(folded) == {"GET /x", "GET /x;view", "GET /x;view;GET /a", "GET /x;view;GET /b",
+                           "GET /x;view;GET /a;sql SELECT", "GET /x;view;GET /b;sql SELECT"}
+    assert int(folded["GET /x;view;GET /a;sql SELECT"]) == 2000
+    assert int(folded["GET /x;view;GET /a"]) >= 7000
+    # Outside a profile spans are no-ops
+    with span("ignored"):
+        record_span("sql SELECT", 1.0)
+    assert ("GET /x", "ignored") not in profile.spans
+
+
+def test_header_profiles_one_request(fake_tmdb, tmp_path):
+    import app as app_module
+
+    profiles = tmp_path / "profiles"
+    client = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+        "PROFILE_TOKEN": "let-me-see",
+        "PROFILE_DIR": str(profiles),
+    }).test_client()
+
+    plain = client.post("/get-recommendation-from-movies", json={"title": "Inception"},
+                        headers={"X-Profile": "wrong"})
+    assert "X-Profile-Id" not in plain.headers and not profiles.exists()
+
+    response = client.post("/get-recommendation-from-movies", json={"title": "The Dark Knight"},
+                           headers={"X-Profile": "let-me-see"})
+    assert response.status_code == 200
+
+    stem = response.headers["X-Profile-Id"]
+    folded = (profiles / f"{stem}-post-get-recommendation-from-movies.folded").read_text()
+    root = "POST /get-recommendation-from-movies;view"
+    assert f"{root};tmdb_model search;GET /search/movie;decode" in folded
+    assert f"{root};tmdb_model recommendations;GET /movie/{{id}}/recommendations" in folded
+
+    stats = pstats.Stats(str(profiles / f"{stem}-post-get-recommendation-from-movies.pstats"))
+    assert any(function == "get_recommendation_from_movies" for _, _, function in stats.stats)
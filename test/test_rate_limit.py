@@ -0,0 +1,84 @@
+import pytest
+
+from models import tmdb_model
+from utils.rate_limit import BACKGROUND, THROTTLED, UpstreamRateLimited, UpstreamScheduler, parse_retry_after
+from utils.tmdb_client import AsyncTMDBClient, TMDBClient, set_async_client, set_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_queues_interactive_calls_and_caps_the_delay():
+    clock = FakeClock()
+    scheduler = UpstreamScheduler(rate=10, burst=2, max_delay=0.25, clock=clock)
+
+    assert scheduler.reserve() == (True, 0.0)
+    assert scheduler.reserve() == (True, 0.0)
+    assert scheduler.reserve() == (True, pytest.approx(0.1))
+    assert scheduler.reserve() == (True, pytest.approx(0.2))
+    with pytest.raises(UpstreamRateLimited):
+        scheduler.reserve()
+
+    clock.now += 1
+    assert scheduler.reserve() == (True, 0.0)
+
+
+def test_background_calls_leave_a_reserve_for_users():
+    clock = FakeClock()
+    scheduler = UpstreamScheduler(rate=10, burst=4, background_reserve=0.5, clock=clock)
+
+    assert scheduler.reserve(BACKGROUND) == (True, 0.0)
+    scheduler.reserve()
+    # Two tokens are left, which is the interactive reserve
+    granted, wait = scheduler.reserve(BACKGROUND)
+    assert not granted and wait == pytest.approx(0.1)
+    assert scheduler.reserve() == (True, 0.0)
+
+    clock.now += wait + 0.1
+    assert scheduler.reserve(BACKGROUND) == (True, 0.0)
+
+
+def test_429_pauses_every_caller_then_gives_up():
+    clock = FakeClock()
+    scheduler = UpstreamScheduler(rate=0, max_retries=1, backoff_base=0.5, clock=clock)
+
+    scheduler.throttled(0, "2")
+    granted, wait = scheduler.reserve()
+    assert granted and 2.0 <= wait <= 2.5
+    with pytest.raises(UpstreamRateLimited):
+        scheduler.throttled(1)
+
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+def test_clients_retry_429s_and_the_app_answers_503(fake_tmdb, tmp_path):
+    import app as app_module
+
+    throttled = THROTTLED.value()
+    client = TMDBClient(api_key="test-key", base_url=fake_tmdb.url,
+                        scheduler=UpstreamScheduler(backoff_base=0.01))
+    fake_tmdb.fail_next(2, retry_after="0")
+    assert client.get("/genre/movie/list")["genres"]
+    assert THROTTLED.value() == throttled + 2
+
+    # No retries, so the 429's Retry-After is passed straight on
+    scheduler = UpstreamScheduler(max_retries=0, backoff_base=0.01)
+    set_client(TMDBClient(api_key="test-key", base_url=fake_tmdb.url, scheduler=scheduler))
+    set_async_client(AsyncTMDBClient(api_key="test-key", base_url=fake_tmdb.url, scheduler=scheduler))
+    tmdb_model.title_resolver.clear()
+    app = app_module.create_app({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "CATALOG_SYNC_INTERVAL": 0,
+        "SNAPSHOT_REFRESH_INTERVAL": 0,
+    }).test_client()
+
+    fake_tmdb.fail_next(1, retry_after="3")
+    response = app.post("/get-movie-summary", json={"title": "Inception"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 3
@@ -0,0 +1,77 @@
+import multiprocessing
+
+from models import tmdb_model
+from models.catalog_sync import _try_lock
+from utils.shared_cache import SharedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_are_shared_expire_and_stay_as_fallback(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "shared.sqlite")
+    writer, reader = SharedCache(path, clock=clock), SharedCache(path, clock=clock)
+
+    writer.set(("/movie/1", (("language", "en-US"),)), {"title": "Movie 1"}, ttl=60)
+    assert reader.get(("/movie/1", (("language", "en-US"),))) == {"title": "Movie 1"}
+    assert reader.get(("/movie/2", ())) is None
+
+    clock.now += 60
+    assert reader.get(("/movie/1", (("language", "en-US"),))) is None
+    assert reader.get_stale(("/movie/1", (("language", "en-US"),))) == {"title": "Movie 1"}
+    assert reader.stats()["hits"] == 1 and reader.stats()["misses"] == 2
+
+
+def test_prune_drops_the_entries_closest_to_expiry(tmp_path):
+    clock = FakeClock()
+    cache = SharedCache(str(tmp_path / "shared.sqlite"), max_bytes=100, prune_every=1000, clock=clock)
+    for n in range(5):
+        cache.set(n, "x" * 28, ttl=10 * (n + 1))
+
+    # 150 bytes held; trimmed to 90% of the budget
+    assert cache.prune() == 2
+    assert [cache.get(n) is not None for n in range(5)] == [False, False, True, True, True]
+
+
+def _store_in_child(cache):
+    cache.set("from-child", [1, 2, 3], ttl=60)
+
+
+def test_forked_workers_share_entries(tmp_path):
+    cache = SharedCache(str(tmp_path / "shared.sqlite"))
+    # Opens the parent's connection before the fork; the child must not reuse it
+    cache.set("from-parent", "hello", ttl=60)
+
+    child = multiprocessing.get_context("fork").Process(target=_store_in_child, args=(cache,))
+    child.start()
+    child.join()
+
+    assert child.exitcode == 0
+    assert cache.get("from-child") == [1, 2, 3]
+
+
+def test_workers_reuse_responses_downloaded_by_another(fake_tmdb, tmp_path, monkeypatch):
+    monkeypatch.setattr(tmdb_model, "shared_cache", SharedCache(str(tmp_path / "shared.sqlite")))
+
+    first = tmdb_model._fetch("popular", "/movie/popular", {"language": "en-US", "page": 1})
+    # A worker with a cold in-process cache
+    tmdb_model.response_cache.clear()
+    second = tmdb_model._fetch("popular", "/movie/popular", {"language": "en-US", "page": 1})
+
+    assert second == first
+    assert fake_tmdb.count("/movie/popular") == 1
+
+
+def test_only_one_process_holds_the_sync_lock(tmp_path):
+    path = str(tmp_path / "sync.lock")
+    held = _try_lock(path)
+    assert held is not None
+    assert _try_lock(path) is None
+    held.close()
+    assert _try_lock(path) is not None
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from models.similarity import SimilarityIndex, build_features, top_k_neighbours
+
+
+def _movie(movie_id, genre_ids, year, popularity=10.0):
+    return {"id": movie_id, "genre_ids": genre_ids, "release_date": f"{year}-05-01",
+            "popularity": popularity, "vote_average": 7.0, "vote_count": 1000}
+
+
+MOVIES = [
+    _movie(3, [28, 878], 2010),
+    _movie(1, [28, 878], 2012),
+    _movie(2, [35, 10749], 1995),
+    _movie(4, [35, 10749], 1997),
+    _movie(5, [27], 1980),
+]
+
+
+def test_features_are_sorted_and_normalized():
+    ids, features = build_features(MOVIES)
+    assert ids.tolist() == [1, 2, 3, 4, 5]
+    assert np.allclose(np.linalg.norm(features, axis=1), 1.0)
+
+
+def test_neighbours_match_brute_force():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(200, 8)).astype(np.float32)
+    features /= np.linalg.norm(features, axis=1, keepdims=True)
+
+    neighbours, scores = top_k_neighbours(features, k=5, batch_size=32)
+
+    sims = features @ features.T
+    np.fill_diagonal(sims, -np.inf)
+    expected = np.argsort(-sims, axis=1)[:, :5]
+    assert (neighbours == expected).all()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_saved_index_is_memory_mapped(tmp_path):
+    SimilarityIndex.build(MOVIES, k=2).save(tmp_path)
+    index = SimilarityIndex.load(tmp_path)
+
+    assert isinstance(index.neighbours, np.memmap)
+    assert [movie_id for movie_id, _ in index.similar(1)][0] == 3
+    assert [movie_id for movie_id, _ in index.similar(2)][0] == 4
+    with pytest.raises(KeyError):
+        index.similar(99)
+
+
+def test_candidate_pool_limits_neighbours():
+    movies = [dict(movie, popularity=float(movie["id"])) for movie in MOVIES]
+    index = SimilarityIndex.build(movies, k=2, max_candidates=2)
+
+    popular_rows = set(np.flatnonzero(np.isin(index.ids, [4, 5])).tolist())
+    assert set(index.neighbours.ravel().tolist()) <= popular_rows
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+def _run_concurrently(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    _run_concurrently(8, lambda: results.append(flights.do("key", slow)))
+
+    assert calls == [1]
+    assert results == ["result"] * 8
+    assert flights.stats()["coalesced"] == 7
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_errors_propagate_to_every_waiter():
+    flights = SingleFlight()
+    errors = []
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    def call():
+        try:
+            flights.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    _run_concurrently(4, call)
+
+    assert errors == ["upstream down"] * 4
+    assert flights.stats()["errors"] == 1
+
+
+def test_later_calls_run_again():
+    flights = SingleFlight()
+    assert flights.do("key", lambda: 1) == 1
+    assert flights.do("key", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flights.do("key", lambda: {}["missing"])
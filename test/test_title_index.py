@@ -0,0 +1,83 @@
+from models import tmdb_model
+from models.title_index import TrigramIndex
+
+
+def _index():
+    index = TrigramIndex()
+    index.add(155, "The Dark Knight", year=2008)
+    index.add(49026, "The Dark Knight Rises", year=2012)
+    index.add(27205, "Inception", year=2010)
+    index.add(129, "Spirited Away", "千と千尋の神隠し", 2001)
+    return index
+
+
+def test_misspelled_title_ranks_first():
+    results = _index().search("the dark knigth")
+    assert [movie_id for movie_id, *_ in results[:2]] == [155, 49026]
+    assert results[0][3] > results[1][3]
+
+
+def test_year_breaks_ties():
+    index = TrigramIndex()
+    index.add(1, "Heat", year=1986)
+    index.add(949, "Heat", year=1995)
+    assert index.search("heat (1995)")[0][0] == 949
+    assert index.search("Heat 1986")[0][0] == 1
+
+
+def test_numbers_in_titles_must_match():
+    index = _index()
+    index.add(78, "Blade Runner", year=1982)
+    index.add(335984, "Blade Runner 2049", year=2017)
+    index.add(10483, "Death Race", year=2008)
+    index.add(862, "Toy Story", year=1995)
+    index.add(10193, "Toy Story 3", year=2010)
+
+    # A title ending in a number wins as typed, and a year that isn't the movie's rules it out
+    assert index.search("Blade Runner 2049")[0][:2] == (335984, "Blade Runner 2049")
+    assert index.best_match("Blade Runner 1982", tmdb_model.FUZZY_MATCH_SCORE) == 78
+    assert index.best_match("Death Race 2000", tmdb_model.FUZZY_FALLBACK_SCORE) is None
+    assert index.best_match("The Dark Knight 2012", tmdb_model.FUZZY_MATCH_SCORE) is None
+    assert 155 not in [movie_id for movie_id, *_ in index.search("The Dark Knight 2012")]
+    assert index.best_match("Toy Story 2", tmdb_model.FUZZY_FALLBACK_SCORE) is None
+    assert index.best_match("toy story", tmdb_model.FUZZY_MATCH_SCORE) == 862
+
+
+def test_original_title_and_dedupe():
+    index = _index()
+    index.add(129, "Spirited Away", "千と千尋の神隠し", 2001)
+    assert len(index) == 5
+    assert index.search("千と千尋")[0][0] == 129
+
+
+def test_best_match_threshold():
+    index = _index()
+    assert index.best_match("incepton", 0.8) == 27205
+    assert index.best_match("something else", 0.8) is None
+
+
+def test_loader_runs_once_and_after_clear():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [(27205, "Inception", None, 2010)]
+
+    index = TrigramIndex(loader)
+    assert index.best_match("inception", 0.9) == 27205
+    index.search("inception")
+    index.clear()
+    assert len(index) == 0
+    index.search("inception")
+    assert len(calls) == 2
+
+
+def test_typo_resolves_without_error(fake_tmdb):
+    tmdb_model.get_movie_summary("Inception")
+    assert tmdb_model.get_movie_summary("Incepton").startswith("A thief")
+
+
+def test_confident_local_match_skips_search(fake_tmdb):
+    tmdb_model.get_movie_summary("Inception")
+    tmdb_model.get_recommendations_from_movie("Inception (2010)")
+    assert fake_tmdb.count("/search/movie") == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from models.title_resolution import TitleResolver, normalize_title
+
+
+def test_normalize_title():
+    assert normalize_title("  Spider-Man: No Way Home ") == "spider man no way home"
+    assert normalize_title("ＡＭＥＬＩＥ") == "amelie"
+
+
+def test_found_titles_persist_across_resolvers():
+    searches = []
+
+    def search(title, language):
+        searches.append(title)
+        return 155
+
+    assert TitleResolver(search).resolve("The Dark Knight") == 155
+    assert TitleResolver(search).resolve("the dark knight!") == 155
+    assert searches == ["The Dark Knight"]
+
+
+def test_not_found_titles_are_negatively_cached():
+    searches = []
+    resolver = TitleResolver(lambda title, language: searches.append(title))
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            resolver.resolve("No Such Film")
+    assert len(searches) == 1
+
+
+def test_expired_resolutions_are_searched_again():
+    now = [0.0]
+    searches = []
+
+    def search(title, language):
+        searches.append(title)
+        return 27205
+
+    TitleResolver(search, ttl=10, clock=lambda: now[0]).resolve("Inception")
+    now[0] = 11
+    TitleResolver(search, ttl=10, clock=lambda: now[0]).resolve("Inception")
+    assert len(searches) == 2
+
+
+def test_cached_misses_give_way_to_titles_learned_later():
+    known = {}
+    searches = []
+
+    def search(title, language):
+        searches.append(title)
+        return None
+
+    resolver = TitleResolver(search, recheck=lambda title, language: known.get(title))
+    with pytest.raises(ValueError):
+        resolver.resolve("Incepton")
+
+    # The fuzzy index has since learned the title
+    known["Incepton"] = 27205
+    assert resolver.resolve("Incepton") == 27205
+    known.clear()
+    assert TitleResolver(search).resolve("Incepton") == 27205
+    assert searches == ["Incepton"]
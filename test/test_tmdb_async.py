@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import pytest
+
+from models import tmdb_async, tmdb_model
+from utils.shared_cache import SharedCache
+
+
+def test_async_functions_match_blocking_ones(fake_tmdb):
+    async def run():
+        return await asyncio.gather(
+            tmdb_async.get_recommendations_for_genre("Action"),
+            tmdb_async.get_recommendations_from_movie("Inception"),
+            tmdb_async.get_random_recommendation(),
+            tmdb_async.get_movie_summary("The Dark Knight"),
+            tmdb_async.get_trending_movies_tmdb(),
+        )
+
+    genre, related, popular, summary, trending = asyncio.run(run())
+    tmdb_model.response_cache.clear()
+
+    assert genre == tmdb_model.get_recommendations_for_genre("Action")
+    assert related == tmdb_model.get_recommendations_from_movie("Inception")
+    assert popular == tmdb_model.get_random_recommendation()
+    assert summary == tmdb_model.get_movie_summary("The Dark Knight")
+    assert trending == tmdb_model.get_trending_movies_tmdb()
+
+
+def test_unknown_movie_raises(fake_tmdb):
+    with pytest.raises(ValueError):
+        asyncio.run(tmdb_async.get_movie_summary("No Such Film"))
+
+
+def test_concurrent_identical_calls_are_coalesced(fake_tmdb):
+    async def run():
+        return await asyncio.gather(*[tmdb_async.get_movie_summary("Inception") for _ in range(50)])
+
+    summaries = asyncio.run(run())
+
+    assert len(set(summaries)) == 1
+    assert fake_tmdb.count("/search/movie") == 1
+    assert fake_tmdb.count("/movie/27205") == 1
+
+
+def test_client_is_shared_across_event_loops(fake_tmdb):
+    for n in range(1, 4):
+        asyncio.run(tmdb_async.get_movie_summary(f"Movie {n}"))
+    assert len(fake_tmdb.connections) == 1
+
+
+def test_batch_reports_errors_per_item(fake_tmdb):
+    queries = [{"title": "Inception"}, {"genre": "Comedy"}, {"title": "No Such Film"}, {}]
+    results = asyncio.run(tmdb_async.get_batch_recommendations(queries, max_concurrency=2))
+
+    assert [result["query"] for result in results] == queries
+    assert "The Dark Knight" in results[0]["recommendations"]
+    assert results[1]["recommendations"]
+    assert "not found" in results[2]["error"]
+    assert "title or a genre" in results[3]["error"]
+
+
+def test_blocking_lookups_run_off_the_event_loop(fake_tmdb, tmp_path, monkeypatch):
+    monkeypatch.setattr(tmdb_model, "shared_cache", SharedCache(str(tmp_path / "shared.sqlite")))
+    threads = {}
+
+    def recording(name, fn):
+        def call(*args, **kwargs):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return fn(*args, **kwargs)
+        return call
+
+    for name in ("_catalog_movie", "_catalog_recommendations", "_match_title", "_shared_get", "_shared_set"):
+        monkeypatch.setattr(tmdb_model, name, recording(name, getattr(tmdb_model, name)))
+    monkeypatch.setattr(tmdb_model.genre_index, "lookup", recording("genre", tmdb_model.genre_index.lookup))
+    monkeypatch.setattr(tmdb_model.title_resolver, "_load", recording("resolver", tmdb_model.title_resolver._load))
+    monkeypatch.setattr(tmdb_model.catalog, "remember", recording("remember", tmdb_model.catalog.remember))
+
+    async def run():
+        loop_thread = threading.get_ident()
+        await asyncio.gather(
+            tmdb_async.get_recommendations_for_genre("Action"),
+            tmdb_async.get_recommendations_from_movie("Inception"),
+            tmdb_async.get_movie_summary("The Dark Knight"),
+        )
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+
+    assert set(threads) == {"_catalog_movie", "_catalog_recommendations", "_match_title", "_shared_get",
+                            "_shared_set", "genre", "resolver", "remember"}
+    assert all(loop_thread not in idents for idents in threads.values())
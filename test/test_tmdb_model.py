@@ -0,0 +1,90 @@
+import pytest
+
+from models import tmdb_model
+from utils import rate_limit
+from utils.circuit_breaker import note_stale_result, stale_results, start_stale_tracking, stop_stale_tracking
+from utils.rate_limit import background_priority
+
+
+def test_recommendations_for_genre(fake_tmdb):
+    titles = tmdb_model.get_recommendations_for_genre("action")
+    assert "The Dark Knight" in titles
+    assert fake_tmdb.count("/discover/movie") == 1
+
+
+def test_unknown_genre_raises(fake_tmdb):
+    with pytest.raises(ValueError):
+        tmdb_model.get_recommendations_for_genre("not-a-genre")
+
+
+def test_movie_summary(fake_tmdb):
+    assert tmdb_model.get_movie_summary("Inception").startswith("A thief")
+
+
+def test_unknown_movie_raises(fake_tmdb):
+    with pytest.raises(ValueError):
+        tmdb_model.get_recommendations_from_movie("No Such Film")
+
+
+def test_client_reuses_connections(fake_tmdb):
+    for _ in range(5):
+        tmdb_model.get_recommendations_from_movie("The Dark Knight")
+    assert len(fake_tmdb.connections) == 1
+
+
+def test_repeat_lookups_are_cached(fake_tmdb):
+    first = tmdb_model.get_trending_movies_tmdb()
+    second = tmdb_model.get_trending_movies_tmdb()
+    assert first == second
+    assert fake_tmdb.count("/trending/movie/week") == 1
+
+
+def test_genre_list_loaded_once(fake_tmdb):
+    tmdb_model.get_recommendations_for_genre("Comedy")
+    tmdb_model.get_recommendations_for_genre("sci-fi")
+    with pytest.raises(ValueError):
+        tmdb_model.get_recommendations_for_genre("not-a-genre")
+    assert fake_tmdb.count("/genre/movie/list") == 1
+
+
+def test_summary_and_recommendations_share_title_resolution(fake_tmdb):
+    tmdb_model.get_movie_summary("Inception")
+    tmdb_model.get_recommendations_from_movie("inception")
+    assert fake_tmdb.count("/search/movie") == 1
+
+
+def test_multiple_pages_in_order(fake_tmdb):
+    pages = list(tmdb_model.iter_trending_movies(pages=3))
+
+    assert [page for page, _ in pages] == [1, 2, 3]
+    assert tmdb_model.get_trending_movies_tmdb(pages=3) == [t for _, titles in pages for t in titles]
+    assert len(pages[2][1]) == 20
+
+
+def test_every_page_is_fetched_in_the_callers_context(fake_tmdb, monkeypatch):
+    seen = []
+    fetch = tmdb_model._fetch
+
+    def recording_fetch(endpoint, path, params):
+        seen.append((params["page"], rate_limit._priority.get(), len(stale_results())))
+        return fetch(endpoint, path, params)
+
+    monkeypatch.setattr(tmdb_model, "_fetch", recording_fetch)
+    token = start_stale_tracking()
+    try:
+        note_stale_result("earlier")
+        with background_priority():
+            pages = tmdb_model.iter_trending_movies(pages=3)
+        # Consumed outside the block, as a streamed response body is
+        list(pages)
+    finally:
+        stop_stale_tracking(token)
+
+    assert sorted(seen) == [(page, rate_limit.BACKGROUND, 1) for page in (1, 2, 3)]
+
+
+def test_pages_stop_at_last_upstream_page(fake_tmdb):
+    titles = tmdb_model.get_random_recommendation(pages=50)
+
+    assert len(titles) == 100
+    assert fake_tmdb.count("/movie/popular") == 5
@@ -0,0 +1,225 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from utils.shared_cache import SharedDatabase
+
+_SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_username ON sessions (username);
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+"""
+
+
+class TokenStore:
+    """
+    In-memory store of signed session tokens.
+
+    A token is ``<id>.<signature>``, the signature being an HMAC of the id
+    under the store's secret, so forged or mangled tokens are rejected
+    before any lookup. Valid tokens map to their username in an ordered
+    dict, so verifying one is a dictionary lookup with no database query.
+    Tokens expire ``ttl`` seconds after they are issued; past
+    ``max_tokens`` the least recently used token is evicted.
+
+    Args:
+        secret (str): Signing key; a random per-process key if omitted,
+            which invalidates tokens on restart.
+        ttl (float): Lifetime of a token in seconds.
+        max_tokens (int): Most tokens kept at once.
+        clock (callable): Returns the current time in seconds.
+    """
+
+    def __init__(self, secret: str = None, ttl: float = 24 * 3600, max_tokens: int = 100000,
+                 clock=time.monotonic) -> None:
+        self._secret = (secret or secrets.token_hex(32)).encode()
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self._clock = clock
+        self._tokens = OrderedDict()  # token id -> (username, expires_at)
+        self._by_user = {}  # username -> set of token ids
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def issue(self, username: str) -> str:
+        """
+        Create a token for a user.
+
+        Returns:
+            str: The signed token to hand to the client.
+        """
+        token_id = secrets.token_urlsafe(24)
+        with self._lock:
+            self._tokens[token_id] = (username, self._clock() + self.ttl)
+            self._by_user.setdefault(username, set()).add(token_id)
+            while len(self._tokens) > self.max_tokens:
+                evicted, (owner, _) = self._tokens.popitem(last=False)
+                self._forget(evicted, owner)
+                self.evictions += 1
+        return f"{token_id}.{self._sign(token_id)}"
+
+    def verify(self, token: str):
+        """
+        Return the username a token was issued to, or None if it is
+        malformed, forged, expired or revoked.
+        """
+        token_id = self._token_id(token)
+        if token_id is None:
+            return None
+        with self._lock:
+            entry = self._tokens.get(token_id)
+            if entry is None:
+                return None
+            username, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._tokens[token_id]
+                self._forget(token_id, username)
+                return None
+            self._tokens.move_to_end(token_id)
+            return username
+
+    def revoke(self, token: str) -> None:
+        """Invalidate a single token."""
+        token_id = self._token_id(token)
+        with self._lock:
+            entry = self._tokens.pop(token_id, None)
+            if entry is not None:
+                self._forget(token_id, entry[0])
+
+    def revoke_user(self, username: str) -> int:
+        """
+        Invalidate every token of a user, e.g. after a password change.
+
+        Returns:
+            int: Number of tokens revoked.
+        """
+        with self._lock:
+            token_ids = self._by_user.pop(username, set())
+            for token_id in token_ids:
+                self._tokens.pop(token_id, None)
+        return len(token_ids)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def _sign(self, token_id: str) -> str:
+        digest = hmac.new(self._secret, token_id.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def _token_id(self, token):
+        if not isinstance(token, str) or token.count(".") != 1:
+            return None
+        token_id, signature = token.split(".")
+        if not hmac.compare_digest(signature.encode(), self._sign(token_id).encode()):
+            return None
+        return token_id
+
+    def _forget(self, token_id: str, username: str) -> None:
+        user_tokens = self._by_user.get(username)
+        if user_tokens is not None:
+            user_tokens.discard(token_id)
+            if not user_tokens:
+                del self._by_user[username]
+
+
+class SharedTokenStore(TokenStore):
+    """
+    Session tokens kept in a SQLite file shared by every worker process.
+
+    Tokens are signed as in :class:`TokenStore`, so forged ones are still
+    rejected before any lookup. A token issued by one worker verifies on
+    every worker, and revoking tokens revokes them everywhere. Verifying
+    a token takes one indexed read of a local file. Expired tokens are
+    deleted every ``prune_every`` issues, and past ``max_tokens`` the
+    tokens closest to expiry go first.
+
+    Args:
+        path (str): SQLite file shared by the workers.
+        secret (str): Signing key; required, since every worker must use the same one.
+        ttl (float): Lifetime of a token in seconds.
+        max_tokens (int): Most tokens kept at once.
+        clock (callable): Wall-clock time source, shared by all processes.
+        prune_every (int): Issues by one process between clean-ups.
+
+    Raises:
+        ValueError: If no secret is given.
+    """
+
+    def __init__(self, path: str, secret: str, ttl: float = 24 * 3600, max_tokens: int = 100000,
+                 clock=time.time, prune_every: int = 256) -> None:
+        if not secret:
+            raise ValueError("A shared token store needs a secret that every worker signs with")
+        super().__init__(secret, ttl, max_tokens, clock)
+        self.path = path
+        self.prune_every = prune_every
+        self._database = SharedDatabase(path, _SESSION_SCHEMA)
+        self._issued = 0
+
+    def issue(self, username: str) -> str:
+        """See :meth:`TokenStore.issue`."""
+        token_id = secrets.token_urlsafe(24)
+        self._database.connection().execute(
+            "INSERT INTO sessions (token_id, username, expires_at) VALUES (?, ?, ?)",
+            (token_id, username, self._clock() + self.ttl))
+        with self._lock:
+            self._issued += 1
+            prune = self._issued % self.prune_every == 0
+        if prune:
+            self.prune()
+        return f"{token_id}.{self._sign(token_id)}"
+
+    def verify(self, token: str):
+        """See :meth:`TokenStore.verify`."""
+        token_id = self._token_id(token)
+        if token_id is None:
+            return None
+        connection = self._database.connection()
+        row = connection.execute("SELECT username, expires_at FROM sessions WHERE token_id = ?",
+                                 (token_id,)).fetchone()
+        if row is None:
+            return None
+        username, expires_at = row
+        if self._clock() >= expires_at:
+            connection.execute("DELETE FROM sessions WHERE token_id = ?", (token_id,))
+            return None
+        return username
+
+    def revoke(self, token: str) -> None:
+        """Invalidate a single token, on every worker."""
+        token_id = self._token_id(token)
+        if token_id is not None:
+            self._database.connection().execute("DELETE FROM sessions WHERE token_id = ?", (token_id,))
+
+    def revoke_user(self, username: str) -> int:
+        """See :meth:`TokenStore.revoke_user`; applies to every worker."""
+        return self._database.connection().execute("DELETE FROM sessions WHERE username = ?", (username,)).rowcount
+
+    def prune(self) -> int:
+        """
+        Delete expired tokens, then the ones closest to expiry past max_tokens.
+
+        Returns:
+            int: Number of tokens deleted.
+        """
+        connection = self._database.connection()
+        removed = connection.execute("DELETE FROM sessions WHERE expires_at <= ?", (self._clock(),)).rowcount
+        excess = len(self) - self.max_tokens
+        if excess > 0:
+            evicted = connection.execute(
+                "DELETE FROM sessions WHERE token_id IN "
+                "(SELECT token_id FROM sessions ORDER BY expires_at LIMIT ?)", (excess,)).rowcount
+            with self._lock:
+                self.evictions += evicted
+            removed += evicted
+        return removed
+
+    def __len__(self) -> int:
+        return self._database.connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
@@ -0,0 +1,333 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+# Counters TTLCache.stats() reports; they only ever grow, as /metrics exports them as counters
+_COUNTERS = ("hits", "stale_hits", "misses", "evictions", "refresh_errors")
+
+
+def _json_size(value) -> int:
+    """Approximate the memory held by a JSON-shaped value by its encoded length."""
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+class _Entry:
+    __slots__ = ("value", "size", "fresh_until", "stale_until")
+
+    def __init__(self, value, size, fresh_until, stale_until):
+        self.value = value
+        self.size = size
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry TTL and LRU eviction by size.
+
+    Entries past their TTL are still served for a grace period while a
+    background refresh replaces them (stale-while-revalidate).
+
+    Args:
+        max_bytes (int): Memory budget; least recently used entries are
+            evicted once the summed entry sizes exceed it.
+        stale_factor (float): Grace period after expiry, as a multiple of
+            the entry's TTL, during which the stale value is still served.
+        sizeof (callable): Returns the size in bytes charged for a value.
+        clock (callable): Monotonic time source, injectable for tests.
+        keep_expired (bool): Keep entries past their grace period, until
+            evicted, so :meth:`get_stale` can fall back on them.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, stale_factor: float = 1.0,
+                 sizeof=_json_size, clock=time.monotonic, keep_expired: bool = False) -> None:
+        self.max_bytes = max_bytes
+        self.stale_factor = stale_factor
+        self.keep_expired = keep_expired
+        self._sizeof = sizeof
+        self._clock = clock
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_errors = 0
+
+    def get_or_load(self, key, loader, ttl: float, refresh=None):
+        """
+        Return the cached value for ``key``, calling ``loader`` on a miss.
+
+        A stale entry is returned immediately and refreshed in the background.
+
+        Args:
+            key: Hashable cache key.
+            loader (callable): Zero-argument function producing the value.
+            ttl (float): Seconds the loaded value stays fresh.
+            refresh (callable): Zero-argument function used to refresh stale
+                entries on the background thread pool; defaults to ``loader``.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        found, value = self._lookup(key, refresh or loader, ttl)
+        if found:
+            return value
+        value = loader()
+        self.set(key, value, ttl)
+        return value
+
+    async def get_or_load_async(self, key, loader, ttl: float, refresh):
+        """
+        Coroutine counterpart of :meth:`get_or_load`.
+
+        Args:
+            key: Hashable cache key.
+            loader (callable): Coroutine function producing the value on a miss.
+            ttl (float): Seconds the loaded value stays fresh.
+            refresh (callable): Blocking zero-argument function used to
+                refresh stale entries on the background thread pool.
+
+        Returns:
+            The cached or freshly loaded value.
+        """
+        found, value = self._lookup(key, refresh, ttl)
+        if found:
+            return value
+        value = await loader()
+        self.set(key, value, ttl)
+        return value
+
+    def get(self, key, default=None):
+        """Return the value for ``key`` if it is present and fresh, without loading."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or self._clock() >= entry.fresh_until:
+                return default
+            self._data.move_to_end(key)
+            return entry.value
+
+    def get_stale(self, key, default=None):
+        """
+        Return the value held for ``key`` however old it is, without loading.
+
+        Meant as a last resort when loading fails; the entry's recency is
+        left alone so values nobody can refresh still age out.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            return default if entry is None else entry.value
+
+    def set(self, key, value, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        now = self._clock()
+        entry = _Entry(value, size, now + ttl, now + ttl * (1 + self.stale_factor))
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        """Drop ``key`` from the cache if present."""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry; the counters keep their totals."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def close(self) -> None:
+        """Stop the background refresh threads, if any were started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "refresh_errors": self.refresh_errors,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key, refresh, ttl):
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if now < entry.fresh_until:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, entry.value
+                if now < entry.stale_until:
+                    self._data.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._refresh_executor().submit(self._refresh, key, refresh, ttl)
+                    return True, entry.value
+                if not self.keep_expired:
+                    self._remove(key)
+            self.misses += 1
+        return False, None
+
+    def _remove(self, key) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _refresh_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+        return self._executor
+
+    def _refresh(self, key, loader, ttl) -> None:
+        try:
+            self.set(key, loader(), ttl)
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning("Background refresh failed for %s: %s", key, str(e))
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class PartitionedCache:
+    """
+    A set of TTLCaches with separate memory budgets, e.g. one per locale.
+
+    Partitions are created on first use, so a partition nobody asks for
+    costs nothing. Each one evicts only its own entries, which stops a busy
+    partition from pushing out a quieter one's working set. Once more than
+    ``max_partitions`` exist, the least recently used partition is dropped
+    whole; ``pinned`` partitions are never dropped. Memory is therefore
+    bounded by ``partition_bytes * max_partitions`` however many
+    partitions are requested over time. A dropped partition's counters are
+    kept, so the totals :meth:`stats` reports per name never go down.
+
+    Args:
+        partition_of (callable): Maps a cache key to its partition name.
+        partition_bytes (int): Memory budget of each partition.
+        max_partitions (int): Partitions kept at once.
+        pinned (iterable): Partitions that are never dropped.
+        **options: Further TTLCache arguments shared by every partition.
+    """
+
+    def __init__(self, partition_of, partition_bytes: int = 64 * 1024 * 1024, max_partitions: int = 4,
+                 pinned=(), **options) -> None:
+        self._partition_of = partition_of
+        self.partition_bytes = partition_bytes
+        self.max_partitions = max_partitions
+        self.pinned = set(pinned)
+        self._options = options
+        self._partitions = OrderedDict()
+        self._retired = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def partition(self, name) -> TTLCache:
+        """Return the partition called ``name``, creating it if needed."""
+        with self._lock:
+            cache = self._partitions.get(name)
+            if cache is not None:
+                self._partitions.move_to_end(name)
+                return cache
+            cache = self._partitions[name] = TTLCache(max_bytes=self.partition_bytes, **self._options)
+            droppable = [other for other in self._partitions if other not in self.pinned and other != name]
+            while len(self._partitions) > self.max_partitions and droppable:
+                self._retire(droppable.pop(0))
+                self.dropped += 1
+            return cache
+
+    def get_or_load(self, key, loader, ttl: float, refresh=None):
+        """See :meth:`TTLCache.get_or_load`."""
+        return self.partition(self._partition_of(key)).get_or_load(key, loader, ttl, refresh)
+
+    async def get_or_load_async(self, key, loader, ttl: float, refresh):
+        """See :meth:`TTLCache.get_or_load_async`."""
+        return await self.partition(self._partition_of(key)).get_or_load_async(key, loader, ttl, refresh)
+
+    def get(self, key, default=None):
+        """Return the value for ``key`` if it is present and fresh, without loading."""
+        cache = self._partitions.get(self._partition_of(key))
+        return default if cache is None else cache.get(key, default)
+
+    def get_stale(self, key, default=None):
+        """See :meth:`TTLCache.get_stale`."""
+        cache = self._partitions.get(self._partition_of(key))
+        return default if cache is None else cache.get_stale(key, default)
+
+    def set(self, key, value, ttl: float) -> None:
+        """Store ``value`` under ``key`` in its partition for ``ttl`` seconds."""
+        self.partition(self._partition_of(key)).set(key, value, ttl)
+
+    def delete(self, key) -> None:
+        """Drop ``key`` from its partition if present."""
+        cache = self._partitions.get(self._partition_of(key))
+        if cache is not None:
+            cache.delete(key)
+
+    def clear(self) -> None:
+        """Drop every partition; their counters keep their totals."""
+        with self._lock:
+            for name in list(self._partitions):
+                self._retire(name)
+            self.dropped = 0
+
+    def stats(self) -> dict:
+        """Return the counters of every partition, dropped ones included, keyed by partition name."""
+        with self._lock:
+            partitions = list(self._partitions.items())
+            retired = {name: dict(counts) for name, counts in self._retired.items()}
+        stats = {name: dict(counts, entries=0, bytes=0, max_bytes=self.partition_bytes)
+                 for name, counts in retired.items()}
+        for name, cache in partitions:
+            live = cache.stats()
+            for field, count in retired.get(name, {}).items():
+                live[field] += count
+            stats[name] = live
+        return stats
+
+    def __len__(self) -> int:
+        return sum(len(cache) for cache in list(self._partitions.values()))
+
+    def _retire(self, name) -> None:
+        # Called with the lock held; the partition's counts live on under its name
+        cache = self._partitions.pop(name)
+        cache.close()
+        counts = cache.stats()
+        retired = self._retired.setdefault(name, dict.fromkeys(_COUNTERS, 0))
+        for field in _COUNTERS:
+            retired[field] += counts[field]
@@ -0,0 +1,198 @@
+"""
+Fail fast while TMDB is down, and serve what we last knew instead.
+
+A :class:`CircuitBreaker` counts consecutive upstream failures (timeouts,
+connection errors, 5xx answers). After ``failure_threshold`` of them it
+opens: calls fail at once with :class:`UpstreamUnavailable` instead of
+tying up a worker until they time out. After ``reset_timeout`` one call
+is let through as a probe; its success closes the circuit, its failure
+opens it again.
+
+While upstream calls fail, callers may fall back to the last good
+result they hold. They report it with :func:`note_stale_result`, so the
+response can be marked as stale.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+import requests
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_stale_results = ContextVar("stale_upstream_results", default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised instead of calling an endpoint whose circuit is open.
+
+    Attributes:
+        retry_after (float): Seconds until the circuit lets a probe through.
+    """
+
+    def __init__(self, endpoint: str, retry_after: float) -> None:
+        super().__init__(f"TMDB {endpoint} is failing; next try in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Return True if an error means TMDB is down or too slow, rather than that it refused the request."""
+    if isinstance(error, UpstreamUnavailable):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if type(error).__module__.startswith("httpx"):
+        # Only the async client raises these, and it has already imported httpx
+        import httpx
+        return isinstance(error, httpx.TransportError)
+    return False
+
+
+class CircuitBreaker:
+    """
+    The closed/open/half-open state of one upstream endpoint.
+
+    Args:
+        name (str): Endpoint the breaker guards, used in errors and logs.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open before a probe.
+        clock (callable): Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock=time.monotonic) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._clock = clock
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Ask to make a call.
+
+        Raises:
+            UpstreamUnavailable: If the circuit is open, or half open with
+                its probe already in flight.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            # One probe at a time; everyone else keeps failing fast until it reports back
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise UpstreamUnavailable(self.name, max(remaining, 0.0))
+
+    def record_success(self) -> None:
+        """Record that the endpoint answered; a successful probe closes the circuit."""
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("TMDB %s recovered; closing its circuit", self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Record a failed call; opens the circuit at the threshold or when a probe fails."""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning("TMDB %s failed %d times in a row; opening its circuit for %.0fs",
+                               self.name, self.failures, self.reset_timeout)
+                self.state = OPEN
+                self._opened_at = self._clock()
+
+    def record_status(self, status: int) -> None:
+        """Record the HTTP status TMDB answered with; only 5xx counts as a failure."""
+        if status >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_error(self, error: BaseException) -> None:
+        """Record an exception raised by a call; errors that aren't upstream failures just end the call."""
+        if is_upstream_failure(error):
+            self.record_failure()
+        else:
+            self.abandon()
+
+    def abandon(self) -> None:
+        """Release the probe slot of a call that ended without telling whether TMDB is healthy."""
+        with self._lock:
+            self._probing = False
+
+
+class CircuitBreakers:
+    """
+    One :class:`CircuitBreaker` per endpoint, created on first use.
+
+    Args:
+        failure_threshold (int): See :class:`CircuitBreaker`.
+        reset_timeout (float): See :class:`CircuitBreaker`.
+        clock (callable): Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        """Return the breaker of ``endpoint``, e.g. ``"/movie/{id}"``."""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    endpoint, CircuitBreaker(endpoint, self.failure_threshold, self.reset_timeout, self._clock))
+        return breaker
+
+    def states(self) -> dict:
+        """Return the state of every breaker created so far, keyed by endpoint."""
+        return {endpoint: breaker.state for endpoint, breaker in list(self._breakers.items())}
+
+
+def start_stale_tracking():
+    """Start collecting the stale results served in the current context; returns a token for :func:`stop_stale_tracking`."""
+    return _stale_results.set([])
+
+
+def stop_stale_tracking(token) -> None:
+    """Stop the collection started with ``token``."""
+    _stale_results.reset(token)
+
+
+def note_stale_result(key) -> None:
+    """Report that the current request was given a stale result for ``key``."""
+    results = _stale_results.get()
+    if results is not None:
+        # The list is shared with the tasks and threads the request fans out to
+        results.append(key)
+
+
+def stale_results() -> list:
+    """Return the keys of the stale results served in the current context."""
+    return _stale_results.get() or []
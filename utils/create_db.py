@@ -1,32 +1,46 @@
+import logging
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from utils.db_config import Base
-import sqlite3
+
+from utils.db_config import get_engine
 from utils.logger import configure_logger
-import logging
+from utils.migrations import migrate
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+def create_db(reset: bool = False) -> int:
+    """
+    Create or upgrade the database schema.
+
+    Existing data is kept: only migrations newer than the database's
+    schema version run.
 
+    Args:
+        reset (bool): Delete the SQLite database file first, e.g. for a
+            fresh local setup.
 
-def create_db():
-    # Paths to database and SQL file
-    db_file = "app.db"
-    sql_file = "utils/user.sql"
+    Returns:
+        int: The schema version after migrating.
+    """
+    engine = get_engine()
+    db_file = engine.url.database
+    if reset and engine.dialect.name == "sqlite" and db_file and os.path.exists(db_file):
+        engine.dispose()
+        for path in (db_file, f"{db_file}-wal", f"{db_file}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        logger.info("Deleted existing database at %s", db_file)
 
-    # Configure logging
-    logger = logging.getLogger(__name__)
-    configure_logger(logger)
+    version = migrate(engine)
+    logger.info("Database setup complete at schema version %d.", version)
+    return version
 
-    # Check if the database file exists
-    if os.path.exists(db_file):
-        os.remove(db_file)  # Delete the existing database file
-        print(f"Deleted existing database at {db_file}")
 
-    # Create the new database and initialize the schema
-    with sqlite3.connect(db_file) as conn:
-        with open(sql_file, 'r') as f:
-            sql_script = f.read()
-        conn.executescript(sql_script)
-        print(f"Database initialized at {db_file}")
+if __name__ == "__main__":
+    import argparse
 
-    # Log database setup completion
-    logger.info("Database setup complete.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create or upgrade the app database.")
+    parser.add_argument("--reset", action="store_true", help="delete the existing database first")
+    args = parser.parse_args()
+    create_db(reset=args.reset)
@@ -1,13 +1,152 @@
 # db_config.py
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from utils.metrics import registry
+from utils.profiling import record_span
 
 db_file = "app.db"
 Base = declarative_base()
 
-# Set up the SQLAlchemy engine and session
-DATABASE_URL = f"sqlite:///{db_file}"
-engine = create_engine(DATABASE_URL, echo=True)
-Base.metadata.create_all(engine)  # Ensure tables are created from ORM models
-Session = sessionmaker(bind=engine)
\ No newline at end of file
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{db_file}")
+
+# "production" enables WAL and a sized connection pool; "development" keeps SQLAlchemy's defaults
+DB_MODE = os.getenv("DB_MODE", "development")
+
+# Log every SQL statement; off unless asked for
+SQL_ECHO = os.getenv("SQL_ECHO", "0").lower() in ("1", "true", "yes")
+
+# Connection pool sizing in production mode
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Milliseconds a SQLite writer waits for a competing lock before failing
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+QUERY_LATENCY = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time in seconds, by statement type.", ("operation",))
+
+
+def _sqlite_pragmas(production: bool) -> list:
+    pragmas = [f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}"]
+    if production:
+        # WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL
+        pragmas += [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+    return pragmas
+
+
+def make_engine(url: str = DATABASE_URL, mode: str = DB_MODE, echo: bool = SQL_ECHO):
+    """
+    Create the SQLAlchemy engine for a database URL.
+
+    Args:
+        url (str): Database URL.
+        mode (str): "production" or "development".
+        echo (bool): Log every SQL statement.
+
+    Returns:
+        Engine: The configured engine.
+    """
+    production = mode == "production"
+    options = {"echo": echo}
+    if production:
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT, pool_pre_ping=True)
+    engine = create_engine(url, **options)
+    _time_queries(engine)
+
+    if engine.dialect.name == "sqlite":
+        pragmas = _sqlite_pragmas(production)
+
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return engine
+
+
+def _time_queries(engine):
+    """Record how long each statement on ``engine`` takes in QUERY_LATENCY and any request profile."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        QUERY_LATENCY.observe(elapsed, operation)
+        record_span(f"sql {operation}", elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def drop_timer(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+_engine = None
+_engine_settings = {}
+_engine_lock = threading.Lock()
+
+
+def configure_engine(url: str = None, mode: str = None, echo: bool = None) -> None:
+    """
+    Override the engine settings; the engine is (re)created on next use.
+
+    Args:
+        url (str): Database URL, defaults to DATABASE_URL.
+        mode (str): "production" or "development", defaults to DB_MODE.
+        echo (bool): Log every SQL statement, defaults to SQL_ECHO.
+    """
+    global _engine
+    with _engine_lock:
+        _engine_settings.update({key: value for key, value in
+                                 (("url", url), ("mode", mode), ("echo", echo)) if value is not None})
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+        Session.configure(bind=None)
+
+
+def get_engine():
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = make_engine(**_engine_settings)
+    return _engine
+
+
+class LazySessionmaker(sessionmaker):
+    """A sessionmaker that binds to :func:`get_engine` when its first session is opened."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+# Sessions connect lazily, so importing the models opens no database
+Session = LazySessionmaker()
+
+# One session per thread for request handlers; the app removes it when each request ends
+db_session = scoped_session(Session)
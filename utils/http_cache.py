@@ -0,0 +1,139 @@
+"""
+Conditional and compressed JSON responses.
+
+Bodies get a weak ETag from a content hash, so a client that sends it
+back in ``If-None-Match`` receives an empty 304 instead of the list it
+already has. Bodies above MIN_COMPRESS_BYTES are sent gzip- or
+Brotli-encoded, whichever the client prefers. :class:`EncodedPayload`
+holds a body with its hash and compressed forms, so payloads served
+over and over are serialized and compressed once.
+"""
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Smaller bodies fit in a packet anyway and are sent uncompressed
+MIN_COMPRESS_BYTES = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def content_etag(body: bytes) -> str:
+    """Return the ETag value (without quotes) of a response body."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with ``"gzip"`` or ``"br"``."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def supported_encodings() -> tuple:
+    """Return the content codings this process can produce, preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encodings, available=None):
+    """
+    Pick the content coding to send.
+
+    Args:
+        accept_encodings: The request's parsed ``Accept-Encoding`` header.
+        available (tuple): Codings on offer, preferred first; defaults to
+            :func:`supported_encodings`.
+
+    Returns:
+        str: ``"br"`` or ``"gzip"``, or None to send the body as is.
+    """
+    best, best_quality = None, 0
+    for encoding in available if available is not None else supported_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class EncodedPayload:
+    """
+    A response body with its ETag and compressed forms, built once and reused.
+
+    Args:
+        body (bytes): The uncompressed body.
+        mimetype (str): Content type of the body.
+    """
+
+    __slots__ = ("body", "mimetype", "etag", "encoded")
+
+    def __init__(self, body: bytes, mimetype: str = "application/json") -> None:
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = content_etag(body)
+        self.encoded = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            for encoding in supported_encodings():
+                self.encoded[encoding] = compress(body, encoding)
+
+    @property
+    def size(self) -> int:
+        """Bytes held, counting every encoding."""
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+
+def not_modified(request, etag: str) -> bool:
+    """Return True if the request already holds the body tagged ``etag``."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def payload_response(response_class, request, payload: EncodedPayload, status: int = 200):
+    """
+    Build the response for a pre-encoded payload.
+
+    Returns a bodiless 304 when the client's ``If-None-Match`` matches, and
+    otherwise the stored encoding the client accepts best.
+    """
+    if status == 200 and not_modified(request, payload.etag):
+        response = response_class(status=304)
+    else:
+        encoding = choose_encoding(request.accept_encodings, tuple(payload.encoded))
+        response = response_class(payload.encoded[encoding] if encoding else payload.body,
+                                  status=status, mimetype=payload.mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(payload.etag, weak=True)
+    if payload.encoded:
+        response.vary.add("Accept-Encoding")
+    return response
+
+
+def finalize_response(response, request):
+    """
+    Add an ETag, a 304 short-cut and compression to a buffered JSON response.
+
+    Streamed responses, non-JSON bodies and responses that already carry
+    an ETag or a Content-Encoding are returned unchanged.
+    """
+    if (response.status_code != 200 or response.is_streamed or response.mimetype != "application/json"
+            or "ETag" in response.headers or "Content-Encoding" in response.headers):
+        return response
+
+    body = response.get_data()
+    etag = content_etag(body)
+    response.set_etag(etag, weak=True)
+    if not_modified(request, etag):
+        response.status_code = 304
+        response.set_data(b"")
+        return response
+
+    if len(body) >= MIN_COMPRESS_BYTES:
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding:
+            response.set_data(compress(body, encoding))
+            response.headers["Content-Encoding"] = encoding
+    return response
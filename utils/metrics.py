@@ -0,0 +1,297 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms keep one shard of values per thread, so
+recording a sample is a plain dict update with no lock held; a thread
+only takes the metric's lock once, the first time it records anything.
+Shards are summed when ``/metrics`` is scraped, and the shards of
+threads that have exited are folded into a single retired shard so
+short-lived request threads don't pile up. Values that already live
+elsewhere, such as cache statistics, are read at scrape time through
+callbacks.
+"""
+import bisect
+import math
+import re
+import threading
+
+# Upper bounds, in seconds, of the default latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def path_template(path: str) -> str:
+    """Replace numeric path segments with ``{id}``, e.g. ``/movie/155`` → ``/movie/{id}``."""
+    return _NUMERIC_SEGMENT.sub("/{id}", path)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _ShardedMetric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _collect(self) -> dict:
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = live
+            merged = {}
+            self._merge(merged, self._retired)
+            for _, shard in live:
+                # Copy first; the owning thread may add keys while we read
+                self._merge(merged, dict(shard))
+        return merged
+
+    def _merge(self, into: dict, shard: dict) -> None:
+        raise NotImplementedError
+
+    def samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(_ShardedMetric):
+    """
+    A monotonically increasing count per label set.
+
+    Args:
+        name (str): Metric name, e.g. ``"http_requests_total"``.
+        documentation (str): The ``# HELP`` text.
+        labels (tuple): Label names; :meth:`inc` takes their values in order.
+    """
+
+    type = "counter"
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        """Add ``amount`` to the count of the given label values."""
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        """Return the current total of the given label values."""
+        return self._collect().get(label_values, 0.0)
+
+    def _merge(self, into: dict, shard: dict) -> None:
+        for key, value in list(shard.items()):
+            into[key] = into.get(key, 0.0) + value
+
+    def samples(self) -> list:
+        return [(self.name, _format_labels(self.labels, key), value) for key, value in sorted(self._collect().items())]
+
+
+class Histogram(_ShardedMetric):
+    """
+    A distribution of observations per label set, in cumulative buckets.
+
+    Args:
+        name (str): Metric name, e.g. ``"http_request_duration_seconds"``.
+        documentation (str): The ``# HELP`` text.
+        labels (tuple): Label names; :meth:`observe` takes their values in order.
+        buckets (tuple): Sorted bucket upper bounds.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *label_values) -> None:
+        """Record one observation for the given label values."""
+        shard = self._shard()
+        counts = shard.get(label_values)
+        if counts is None:
+            # One slot per bucket, then +Inf, then the running sum
+            counts = shard[label_values] = [0.0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, *label_values) -> int:
+        """Return how many observations the given label values have."""
+        counts = self._collect().get(label_values)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def _merge(self, into: dict, shard: dict) -> None:
+        for key, counts in list(shard.items()):
+            total = into.get(key)
+            if total is None:
+                into[key] = list(counts)
+            else:
+                for i, value in enumerate(counts):
+                    total[i] += value
+
+    def samples(self) -> list:
+        samples = []
+        for key, counts in sorted(self._collect().items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((f"{self.name}_bucket", _format_labels(self.labels, key, le), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labels, key), counts[-1]))
+            samples.append((f"{self.name}_count", _format_labels(self.labels, key), cumulative))
+        return samples
+
+
+class Callback:
+    """
+    A metric whose values are read from ``collect`` at scrape time.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): The ``# HELP`` text.
+        type (str): ``"gauge"`` or ``"counter"``.
+        labels (tuple): Label names.
+        collect (callable): Returns a ``{label_values: value}`` dict.
+    """
+
+    def __init__(self, name: str, documentation: str, type: str, labels, collect) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.labels = tuple(labels)
+        self._collect = collect
+
+    def samples(self) -> list:
+        return [(self.name, _format_labels(self.labels, key), value) for key, value in sorted(self._collect().items())]
+
+
+class Registry:
+    """A named set of metrics, rendered together for ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        """Return the counter called ``name``, creating it on first use."""
+        return self._register(name, lambda: Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Return the histogram called ``name``, creating it on first use."""
+        return self._register(name, lambda: Histogram(name, documentation, labels, buckets))
+
+    def callback(self, name: str, documentation: str, type: str, labels, collect) -> Callback:
+        """Register (or replace) a metric read from ``collect`` at scrape time."""
+        metric = Callback(name, documentation, type, labels, collect)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A failing callback must not take the whole scrape down
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name, create):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = create()
+            return metric
+
+
+# Process-wide registry served at /metrics
+registry = Registry()
+
+_CACHE_COUNTERS = (
+    ("cache_hits_total", "hits", "Cache lookups answered with a fresh entry."),
+    ("cache_stale_hits_total", "stale_hits", "Cache lookups answered with a stale entry while it refreshes."),
+    ("cache_misses_total", "misses", "Cache lookups that had to load the value."),
+    ("cache_evictions_total", "evictions", "Entries evicted to stay within the cache's memory budget."),
+)
+
+
+def track_caches(collect, registry: Registry = registry) -> None:
+    """
+    Export cache statistics, read at scrape time.
+
+    Args:
+        collect (callable): Returns ``{cache_name: stats}``, where ``stats``
+            is a :meth:`utils.cache.TTLCache.stats` dict.
+        registry (Registry): Where the metrics are registered.
+    """
+    def field(name):
+        return lambda: {(cache,): stats[name] for cache, stats in collect().items()}
+
+    def hit_ratio():
+        ratios = {}
+        for cache, stats in collect().items():
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            ratios[(cache,)] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return ratios
+
+    for metric, name, documentation in _CACHE_COUNTERS:
+        registry.callback(metric, documentation, "counter", ("cache",), field(name))
+    # A lifetime ratio; the ratio over a window is rate() of the hit counters over rate() of all lookups
+    registry.callback("cache_hit_ratio", "Share of lookups served from the cache since the process started.",
+                      "gauge", ("cache",), hit_ratio)
+    registry.callback("cache_bytes", "Bytes held by the cache.", "gauge", ("cache",), field("bytes"))
+
+
+def track_flights(collect, registry: Registry = registry) -> None:
+    """
+    Export how many upstream calls were coalesced, read at scrape time.
+
+    Args:
+        collect (callable): Returns a :meth:`utils.singleflight.SingleFlight.stats` dict.
+        registry (Registry): Where the metrics are registered.
+    """
+    def field(name):
+        return lambda: {(): collect()[name]}
+
+    registry.callback("upstream_calls_total", "Upstream calls made, each possibly shared by several callers.",
+                      "counter", (), field("calls"))
+    registry.callback("upstream_coalesced_total", "Callers that joined an identical upstream call already in flight.",
+                      "counter", (), field("coalesced"))
+    registry.callback("upstream_call_errors_total", "Upstream calls that raised, failing every caller sharing them.",
+                      "counter", (), field("errors"))
+    registry.callback("upstream_calls_in_flight", "Upstream calls running now.", "gauge", (), field("in_flight"))
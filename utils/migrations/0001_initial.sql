@@ -0,0 +1,50 @@
+-- Users, title resolutions and the local movie catalog
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    salt TEXT NOT NULL,
+    hashed_password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS title_resolutions (
+    normalized_title TEXT NOT NULL,
+    language TEXT NOT NULL,
+    movie_id INTEGER,
+    resolved_at REAL NOT NULL,
+    PRIMARY KEY (normalized_title, language)
+);
+CREATE TABLE IF NOT EXISTS catalog_movies (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    normalized_title TEXT NOT NULL,
+    original_title TEXT,
+    release_date TEXT,
+    overview TEXT,
+    popularity REAL,
+    vote_average REAL,
+    vote_count INTEGER,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_catalog_movies_normalized_title ON catalog_movies (normalized_title);
+CREATE INDEX IF NOT EXISTS ix_catalog_movies_popularity ON catalog_movies (popularity);
+CREATE TABLE IF NOT EXISTS catalog_movie_genres (
+    movie_id INTEGER NOT NULL,
+    genre_id INTEGER NOT NULL,
+    PRIMARY KEY (movie_id, genre_id)
+);
+CREATE INDEX IF NOT EXISTS ix_catalog_movie_genres_genre_id ON catalog_movie_genres (genre_id);
+CREATE TABLE IF NOT EXISTS catalog_genres (
+    id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (id, language)
+);
+CREATE TABLE IF NOT EXISTS catalog_recommendations (
+    movie_id INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    recommended_id INTEGER NOT NULL,
+    PRIMARY KEY (movie_id, rank)
+);
+CREATE TABLE IF NOT EXISTS catalog_sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
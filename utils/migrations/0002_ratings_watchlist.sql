@@ -0,0 +1,21 @@
+-- Per-user ratings and watchlists, and the precomputed personal recommendations built from them
+CREATE TABLE IF NOT EXISTS ratings (
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    rated_at REAL NOT NULL,
+    PRIMARY KEY (user_id, movie_id)
+);
+CREATE INDEX IF NOT EXISTS ix_ratings_movie_id ON ratings (movie_id);
+CREATE TABLE IF NOT EXISTS watchlist (
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (user_id, movie_id)
+);
+CREATE INDEX IF NOT EXISTS ix_watchlist_movie_id ON watchlist (movie_id);
+CREATE TABLE IF NOT EXISTS personal_recommendations (
+    user_id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    computed_at REAL NOT NULL
+);
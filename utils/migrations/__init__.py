@@ -0,0 +1,113 @@
+"""
+Versioned, non-destructive schema migrations.
+
+Each ``NNNN_name.sql`` file in this package upgrades the schema from
+version NNNN - 1 to NNNN. The applied version is kept in SQLite's
+``PRAGMA user_version``, so starting the app on an up-to-date database
+costs a single pragma read and never touches existing data. Pending
+migrations run inside one ``BEGIN IMMEDIATE`` transaction, which also
+serializes several workers booting against the same file.
+"""
+import logging
+import os
+import re
+import sqlite3
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def migrations() -> list:
+    """Return ``(version, name, path)`` for every migration file, oldest first."""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILENAME.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(found)
+
+
+def latest_version() -> int:
+    """Return the schema version the migration files lead to."""
+    return max((version for version, _, _ in migrations()), default=0)
+
+
+def schema_version(engine) -> int:
+    """Return the schema version recorded in the database."""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine, busy_timeout: float = 30.0) -> int:
+    """
+    Bring the database up to the latest schema version.
+
+    Args:
+        engine: SQLAlchemy engine of the database.
+        busy_timeout (float): Seconds to wait for another process that is
+            migrating the same database.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    target = latest_version()
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        # No file to version; create whatever the models define
+        from utils.db_config import Base
+        Base.metadata.create_all(engine)
+        return target
+
+    if schema_version(engine) >= target:
+        return target
+
+    os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    connection = sqlite3.connect(database, timeout=busy_timeout, isolation_level=None)
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        # Re-read under the write lock; another worker may have just migrated
+        current = connection.execute("PRAGMA user_version").fetchone()[0]
+        for version, name, path in migrations():
+            if version <= current:
+                continue
+            with open(path, encoding="utf-8") as f:
+                script = f.read()
+            for statement in _statements(script):
+                connection.execute(statement)
+            logger.info("Applied migration %04d_%s", version, name)
+            current = version
+        connection.execute(f"PRAGMA user_version = {int(current)}")
+        connection.execute("COMMIT")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+    return current
+
+
+def _statements(script: str) -> list:
+    statements, pending = [], ""
+    for line in script.splitlines(keepends=True):
+        if line.lstrip().startswith("--"):
+            continue
+        pending += line
+        if sqlite3.complete_statement(pending):
+            statements.append(pending.strip())
+            pending = ""
+    if pending.strip():
+        statements.append(pending.strip())
+    return statements
+
+
+if __name__ == "__main__":
+    from utils.db_config import get_engine
+
+    print(f"Schema at version {migrate(get_engine())}")
@@ -0,0 +1,196 @@
+"""
+Opt-in profiling of single requests.
+
+A :class:`RequestProfile` runs cProfile around a request's view and
+collects wall-clock spans: code marks interesting sections, such as TMDB
+calls, JSON decoding and SQL statements, with :func:`span`. When the
+request ends the profile is saved as a ``.pstats`` file for
+``python -m pstats`` or snakeviz, and as a ``.folded`` file of spans in
+the collapsed-stack format that flamegraph.pl and speedscope read.
+
+Spans and the active profile live in context variables, so concurrent
+tasks of one request each nest their spans correctly. Outside a profiled
+request :func:`span` returns a shared no-op, so marking a section costs
+one context variable lookup.
+"""
+import cProfile
+import functools
+import inspect
+import itertools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_profile = ContextVar("request_profile", default=None)
+_span_path = ContextVar("profile_span_path", default=())
+_sequence = itertools.count(1)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("_profile", "_name", "_token", "_started")
+
+    def __init__(self, profile, name):
+        self._profile = profile
+        self._name = name.replace(";", ",")
+
+    def __enter__(self):
+        self._token = _span_path.set(_span_path.get() + (self._name,))
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._started
+        path = _span_path.get()
+        _span_path.reset(self._token)
+        self._profile.record(path, elapsed)
+        return False
+
+
+def span(name: str):
+    """
+    Time a section of the current request's profile.
+
+    Use as ``with span("GET /search/movie"): ...``. Spans opened inside
+    another span are nested under it in the ``.folded`` output.
+
+    Args:
+        name (str): Label of the section.
+
+    Returns:
+        A context manager; a no-op when no profile is active.
+    """
+    profile = _profile.get()
+    return _NO_SPAN if profile is None else _Span(profile, name)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add an already timed section under the current span, e.g. from an event hook."""
+    profile = _profile.get()
+    if profile is not None:
+        profile.record(_span_path.get() + (name.replace(";", ","),), seconds)
+
+
+class RequestProfile:
+    """
+    The cProfile statistics and spans of one request.
+
+    Args:
+        name (str): Root frame of the spans, e.g. ``"POST /get-movie-summary"``.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name.replace(";", ",")
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+        self.profiler = cProfile.Profile()
+        self.spans = {}
+        self.elapsed = None
+        self._lock = threading.Lock()
+        self._started = None
+        self._tokens = None
+
+    def start(self) -> None:
+        """Make this the active profile of the current context."""
+        self._started = time.perf_counter()
+        self._tokens = (_profile.set(self), _span_path.set((self.name,)))
+
+    def stop(self) -> None:
+        """Stop timing and deactivate the profile."""
+        self.elapsed = time.perf_counter() - self._started
+        profile_token, path_token = self._tokens
+        _span_path.reset(path_token)
+        _profile.reset(profile_token)
+
+    @contextmanager
+    def profiling(self):
+        """Run cProfile on the calling thread, inside a ``view`` span."""
+        self.profiler.enable()
+        try:
+            with span("view"):
+                yield
+        finally:
+            self.profiler.disable()
+
+    def record(self, path: tuple, seconds: float) -> None:
+        """Add ``seconds`` to the span at ``path``; spans may finish on any thread."""
+        with self._lock:
+            self.spans[path] = self.spans.get(path, 0.0) + seconds
+
+    def collapsed(self) -> str:
+        """
+        Return the spans in the collapsed-stack format.
+
+        Each line is a ``;``-joined span path and the microseconds spent in
+        that span outside its children, e.g. ``POST /x;view;GET /movie/{id} 41250``.
+        Concurrent children can add up to more than their parent; the
+        parent's own time is then 0.
+        """
+        with self._lock:
+            totals = dict(self.spans)
+        if self.elapsed is not None:
+            totals[(self.name,)] = self.elapsed
+        children = {}
+        for path, seconds in totals.items():
+            if len(path) > 1:
+                children[path[:-1]] = children.get(path[:-1], 0.0) + seconds
+        lines = []
+        for path, seconds in sorted(totals.items()):
+            own = max(seconds - children.get(path, 0.0), 0.0)
+            lines.append(f"{';'.join(path)} {round(own * 1_000_000)}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, directory: str) -> list:
+        """
+        Write ``<stem>.pstats`` and ``<stem>.folded`` to ``directory``.
+
+        Returns:
+            list: The paths written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.name).strip("-").lower()
+        stem = os.path.join(directory, f"{self.id}-{slug}")
+        self.profiler.dump_stats(f"{stem}.pstats")
+        with open(f"{stem}.folded", "w") as folded:
+            folded.write(self.collapsed())
+        return [f"{stem}.pstats", f"{stem}.folded"]
+
+
+def profiled(view):
+    """
+    Wrap a view so that cProfile runs while it executes, if its request is profiled.
+
+    Async views run on an event loop thread of their own, so the profiler
+    has to be switched on there rather than on the request thread.
+    """
+    if inspect.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            profile = _profile.get()
+            if profile is None:
+                return await view(*args, **kwargs)
+            with profile.profiling():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            profile = _profile.get()
+            if profile is None:
+                return view(*args, **kwargs)
+            with profile.profiling():
+                return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,193 @@
+"""
+Rate-limit-aware scheduling of upstream calls.
+
+TMDB limits requests per API key. :class:`UpstreamScheduler` is a token
+bucket in front of every TMDB call, kept as a GCRA "theoretical arrival
+time" so a reservation is one comparison under a lock. Interactive
+calls queue in arrival order and wait for their slot, so a spike turns
+into extra latency rather than a burst of 429s. Background work (list
+refreshes, catalog syncs, stale cache refreshes) only gets a token while
+the bucket holds more than a reserve, so it never delays a user.
+
+When TMDB answers 429 anyway, :meth:`UpstreamScheduler.throttled` pauses
+the whole bucket for the ``Retry-After`` period plus jitter, so callers
+don't retry in lockstep.
+"""
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.metrics import registry
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority = ContextVar("upstream_priority", default=INTERACTIVE)
+
+RATE_LIMIT_WAIT = registry.histogram(
+    "tmdb_rate_limit_wait_seconds", "Time TMDB calls waited for a rate limit token, by priority.", ("priority",))
+THROTTLED = registry.counter("tmdb_throttled_total", "429 answers received from TMDB.")
+
+
+class UpstreamRateLimited(Exception):
+    """
+    Raised when a call can't be made within the allowed delay.
+
+    Attributes:
+        retry_after (float): Seconds after which a retry may succeed.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"TMDB rate limit reached; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def background_priority():
+    """Mark the upstream calls made inside the block as background work."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def parse_retry_after(value):
+    """Return the seconds a ``Retry-After`` header asks for, or None if it is missing or malformed."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class UpstreamScheduler:
+    """
+    Token bucket with priorities and 429 backoff, shared by every TMDB client.
+
+    Args:
+        rate (float): Tokens added per second; 0 or less means unlimited,
+            leaving only the 429 pauses.
+        burst (int): Bucket size, i.e. calls allowed back to back.
+        background_reserve (float): Share of the bucket background calls
+            leave for interactive ones.
+        max_delay (float): Longest an interactive call may queue before
+            :class:`UpstreamRateLimited` is raised instead.
+        max_retries (int): 429 answers retried before giving up.
+        backoff_base (float): Pause in seconds after a 429 without
+            ``Retry-After``; doubled on every further attempt.
+        clock (callable): Monotonic time source, replaceable in tests.
+    """
+
+    def __init__(self, rate: float = 0, burst: int = 1, background_reserve: float = 0.5,
+                 max_delay: float = 10.0, max_retries: int = 3, backoff_base: float = 0.5,
+                 clock=time.monotonic) -> None:
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+        self.background_reserve = background_reserve
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._clock = clock
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        # How far ahead of now the bucket may be booked before calls have to wait
+        self._tolerance = (self.burst - 1) * self._interval
+        self._tat = clock()
+        self._paused_until = 0.0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def reserve(self, priority: str = None):
+        """
+        Try to take a token.
+
+        Returns:
+            tuple: ``(granted, wait)``. A granted interactive call owns a
+            slot ``wait`` seconds from now. A background call that is not
+            granted should ask again after ``wait`` seconds.
+
+        Raises:
+            UpstreamRateLimited: If an interactive call would wait longer than max_delay.
+        """
+        priority = priority or _priority.get()
+        with self._lock:
+            now = self._clock()
+            ready = max(now, self._paused_until)
+            if self.rate <= 0:
+                return True, ready - now
+
+            tat = max(self._tat, ready)
+            if priority == BACKGROUND:
+                reserve = self.burst * self.background_reserve * self._interval
+                available_at = max(tat - self._tolerance + reserve, ready)
+                if available_at > now:
+                    return False, available_at - now
+                self._tat = tat + self._interval
+                return True, 0.0
+
+            wait = max(tat - self._tolerance, ready) - now
+            if wait > self.max_delay:
+                raise UpstreamRateLimited(wait)
+            self._tat = tat + self._interval
+            return True, wait
+
+    def acquire(self, priority: str = None) -> None:
+        """Block until the calling thread may make one upstream call."""
+        priority = priority or _priority.get()
+        waited = 0.0
+        while True:
+            granted, wait = self.reserve(priority)
+            if wait > 0:
+                time.sleep(wait)
+                waited += wait
+            if granted:
+                RATE_LIMIT_WAIT.observe(waited, priority)
+                return
+
+    async def acquire_async(self, priority: str = None) -> None:
+        """Coroutine counterpart of :meth:`acquire`."""
+        priority = priority or _priority.get()
+        waited = 0.0
+        while True:
+            granted, wait = self.reserve(priority)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                waited += wait
+            if granted:
+                RATE_LIMIT_WAIT.observe(waited, priority)
+                return
+
+    def pause(self, seconds: float) -> None:
+        """Hold every call for ``seconds``; calls resume at the steady rate, not in a burst."""
+        with self._lock:
+            resume = self._clock() + seconds
+            self._paused_until = max(self._paused_until, resume)
+            self._tat = max(self._tat, resume + self._tolerance)
+
+    def throttled(self, attempt: int, retry_after: str = None) -> None:
+        """
+        Record a 429 answer to the ``attempt``-th try (from 0) of a call.
+
+        Pauses the bucket for ``Retry-After``, or an exponential backoff
+        when the header is missing, plus a random share of the backoff.
+
+        Raises:
+            UpstreamRateLimited: Once max_retries retries have been used.
+        """
+        THROTTLED.inc()
+        backoff = self.backoff_base * 2 ** attempt
+        requested = parse_retry_after(retry_after)
+        delay = (requested if requested is not None else backoff) + self._random.uniform(0, backoff)
+        self.pause(delay)
+        if attempt >= self.max_retries:
+            raise UpstreamRateLimited(delay)
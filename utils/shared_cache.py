@@ -0,0 +1,206 @@
+"""
+A cache shared by every worker process on one host.
+
+Each worker keeps its own in-process :class:`utils.cache.TTLCache`. A
+:class:`SharedCache` sits behind them as a single SQLite file in WAL
+mode. A response that one worker downloaded is then found by the others
+instead of being downloaded once per worker. SQLite handles locking
+between processes and survives crashes. Readers never wait for writers,
+and a read of a recently used entry comes from the OS page cache.
+
+Values must be JSON-serializable. The cache is an optimization only:
+if the file can't be read or written, the error is logged and the call
+behaves as a miss.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+
+def _encode_key(key) -> str:
+    return json.dumps(key, separators=(",", ":"))
+
+
+class SharedDatabase:
+    """
+    A SQLite file in WAL mode that several worker processes use at once.
+
+    Each thread gets its own connection. A forked worker opens new
+    connections instead of reusing its parent's.
+
+    Args:
+        path (str): SQLite file, created on first use.
+        schema (str): Statements run on every new connection; they must
+            be idempotent, e.g. ``CREATE TABLE IF NOT EXISTS``.
+    """
+
+    def __init__(self, path: str, schema: str) -> None:
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(self.schema)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def close(self) -> None:
+        """Close the calling thread's connection, if it has one."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            self._local.connection = None
+            connection.close()
+
+
+class SharedCache:
+    """
+    Cross-process TTL cache stored in one SQLite file.
+
+    Expired entries are kept, for :meth:`get_stale`, until the file grows
+    past ``max_bytes``. The entries closest to expiry are deleted first.
+
+    Args:
+        path (str): SQLite file, created on first use. Every process that
+            should share entries must use the same path.
+        max_bytes (int): Budget for the stored values.
+        prune_every (int): Writes by one process between budget checks.
+        clock (callable): Wall-clock time source, shared by all processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, prune_every: int = 256,
+                 clock=time.time) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._clock = clock
+        self._database = SharedDatabase(path, _SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def get(self, key, default=None):
+        """Return the value stored for ``key`` if it hasn't expired."""
+        row = self._read(key)
+        fresh = row is not None and row[1] > self._clock()
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if fresh else default
+
+    def get_stale(self, key, default=None):
+        """Return the value stored for ``key`` however old it is."""
+        row = self._read(key)
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds, for every process."""
+        encoded = json.dumps(value, separators=(",", ":"))
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at) VALUES (?, ?, ?, ?)",
+                (_encode_key(key), encoded, len(encoded), self._clock() + ttl))
+        except sqlite3.Error as e:
+            self._failed("write", e)
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete the entries closest to expiry until the values fit in 90% of max_bytes; returns how many went."""
+        try:
+            connection = self._connection()
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            # Leave some room, so the next few writes don't each trigger a prune
+            excess, doomed = total - int(self.max_bytes * 0.9), []
+            for key, size in connection.execute("SELECT key, size FROM entries ORDER BY expires_at"):
+                doomed.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            connection.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        except sqlite3.Error as e:
+            self._failed("prune", e)
+            return 0
+        with self._lock:
+            self.evictions += len(doomed)
+        return len(doomed)
+
+    def clear(self) -> None:
+        """Delete every entry, for every process; this process's counters keep their totals."""
+        try:
+            self._connection().execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            self._failed("clear", e)
+
+    def stats(self) -> dict:
+        """Return this process's hit/miss/eviction counters and the file's occupancy."""
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except sqlite3.Error:
+            entries = size = 0
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "stale_hits": 0,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        """Close the calling thread's connection, if it has one."""
+        self._database.close()
+
+    def _read(self, key):
+        try:
+            return self._connection().execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (_encode_key(key),)).fetchone()
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.connection()
+
+    def _failed(self, operation, error) -> None:
+        with self._lock:
+            self.errors += 1
+        logger.warning("Shared cache %s failed at %s: %s", operation, self.path, str(error))
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while
+    it is in flight wait for and share its result, or its exception.
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def do(self, key, fn):
+        """
+        Run ``fn`` for ``key`` unless an identical call is already in flight.
+
+        Args:
+            key: Hashable identity of the call.
+            fn (callable): Zero-argument function to execute.
+
+        Returns:
+            The value returned by the (possibly shared) call.
+
+        Raises:
+            Exception: Whatever the shared call raised.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key, fn):
+        """
+        Coroutine counterpart of :meth:`do`.
+
+        Shares in-flight calls with blocking callers, so a coroutine and a
+        worker thread asking for the same key still make one request.
+
+        Args:
+            key: Hashable identity of the call.
+            fn (callable): Zero-argument coroutine function to await.
+
+        Returns:
+            The value returned by the (possibly shared) call.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        """Return call, coalesced-call and error counters."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "in_flight": len(self._calls),
+            }
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.calls += 1
+            return future, True
+
+    def _fail(self, key, future, error) -> None:
+        self._finish(key)
+        with self._lock:
+            self.errors += 1
+        future.set_exception(error)
+
+    def _finish(self, key) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
@@ -0,0 +1,396 @@
+import asyncio
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from utils.circuit_breaker import CLOSED, CircuitBreakers
+from utils.metrics import path_template, registry
+from utils.profiling import span
+from utils.rate_limit import UpstreamScheduler
+
+DEFAULT_BASE_URL = "https://api.themoviedb.org/3"
+
+# Read timeouts of the endpoints users wait on, tighter than the client default
+# so a slow TMDB gives up quickly and leaves the worker free
+ENDPOINT_TIMEOUTS = {
+    "/search/movie": 4.0,
+    "/movie/{id}": 5.0,
+    "/movie/{id}/recommendations": 5.0,
+}
+
+# Upstream calls by endpoint, with numeric ids folded so /movie/155 and /movie/27205 share a series
+UPSTREAM_REQUESTS = registry.counter(
+    "tmdb_requests_total", "TMDB API calls by endpoint and HTTP status.", ("endpoint", "status"))
+UPSTREAM_LATENCY = registry.histogram(
+    "tmdb_request_duration_seconds", "TMDB API call latency in seconds.", ("endpoint",))
+
+
+def _record_upstream(path, status, started):
+    endpoint = path_template(path)
+    UPSTREAM_REQUESTS.inc(endpoint, status)
+    UPSTREAM_LATENCY.observe(time.perf_counter() - started, endpoint)
+
+
+def parse_endpoint_timeouts(value: str) -> dict:
+    """
+    Parse read timeouts given as ``"endpoint=seconds"`` pairs separated by commas.
+
+    Args:
+        value (str): E.g. ``"/search/movie=3,/movie/{id}=4"``; may be empty.
+
+    Returns:
+        dict: Read timeouts in seconds, keyed by endpoint template.
+
+    Raises:
+        ValueError: If a pair is malformed.
+    """
+    timeouts = {}
+    for pair in filter(None, (part.strip() for part in (value or "").split(","))):
+        endpoint, separator, seconds = pair.rpartition("=")
+        if not separator or not endpoint:
+            raise ValueError(f"Expected endpoint=seconds, got {pair!r}")
+        timeouts[endpoint.strip()] = float(seconds)
+    return timeouts
+
+
+class TMDBClient:
+    """
+    Shared HTTP client for the TMDB API.
+
+    Wraps a single requests.Session so that every upstream call reuses
+    keep-alive connections instead of paying a new TCP+TLS handshake.
+
+    Args:
+        api_key (str): TMDB API key sent with every request.
+        base_url (str): API root, e.g. a local stand-in for testing.
+        pool_connections (int): Number of per-host connection pools to keep.
+        pool_maxsize (int): Maximum open connections kept per host.
+        timeout (float): Read timeout in seconds of endpoints without their own.
+        connect_timeout (float): Connect timeout in seconds.
+        endpoint_timeouts (dict): Read timeouts by endpoint template;
+            defaults to ENDPOINT_TIMEOUTS.
+        scheduler (UpstreamScheduler): Rate limiter shared with other
+            clients; by default only 429 answers slow calls down.
+        breakers (CircuitBreakers): Circuit breakers shared with other clients.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None, pool_connections: int = 4,
+                 pool_maxsize: int = 32, timeout: float = 10.0, connect_timeout: float = 3.05,
+                 endpoint_timeouts: dict = None, scheduler: UpstreamScheduler = None,
+                 breakers: CircuitBreakers = None) -> None:
+        self.api_key = api_key
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.endpoint_timeouts = ENDPOINT_TIMEOUTS if endpoint_timeouts is None else endpoint_timeouts
+        self.scheduler = scheduler or UpstreamScheduler()
+        self.breakers = breakers or CircuitBreakers()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, path: str, params: dict = None) -> dict:
+        """
+        Issue a GET against the TMDB API and return the decoded JSON body.
+
+        Args:
+            path (str): Endpoint path relative to the base URL, e.g. "/movie/popular".
+            params (dict): Query parameters; the API key is added automatically.
+
+        Returns:
+            dict: The decoded JSON response.
+
+        Raises:
+            requests.HTTPError: If TMDB answers with an error status.
+            requests.Timeout: If TMDB doesn't connect or answer in time.
+            UpstreamRateLimited: If the rate limit leaves no slot in time,
+                or TMDB still answers 429 after the scheduler's retries.
+            UpstreamUnavailable: If the endpoint's circuit is open.
+        """
+        query = {"api_key": self.api_key}
+        query.update(params or {})
+        endpoint = path_template(path)
+        breaker = self.breakers.get(endpoint)
+        timeout = (self.connect_timeout, self.endpoint_timeouts.get(endpoint, self.timeout))
+        with span(f"GET {endpoint}"):
+            attempt = 0
+            while True:
+                breaker.before_call()
+                try:
+                    self.scheduler.acquire()
+                except BaseException:
+                    breaker.abandon()
+                    raise
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(f"{self.base_url}{path}", params=query, timeout=timeout)
+                except BaseException as e:
+                    breaker.record_error(e)
+                    _record_upstream(path, "error", started)
+                    raise
+                breaker.record_status(response.status_code)
+                _record_upstream(path, str(response.status_code), started)
+                if response.status_code != 429:
+                    break
+                self.scheduler.throttled(attempt, response.headers.get("Retry-After"))
+                attempt += 1
+            response.raise_for_status()
+            with span("decode"):
+                return response.json()
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self.session.close()
+
+
+class AsyncTMDBClient:
+    """
+    asyncio client for the TMDB API.
+
+    All requests run on one dedicated background event loop that owns a
+    pooled httpx.AsyncClient, so callers on any event loop (Flask creates
+    one per async view) share the same keep-alive connections and the
+    same concurrency limit.
+
+    Args:
+        api_key (str): TMDB API key sent with every request.
+        base_url (str): API root, e.g. a local stand-in for testing.
+        max_concurrency (int): Maximum upstream requests in flight at once.
+        max_connections (int): Maximum open connections in the pool.
+        timeout (float): Read timeout in seconds of endpoints without their own.
+        connect_timeout (float): Connect timeout in seconds.
+        endpoint_timeouts (dict): Read timeouts by endpoint template;
+            defaults to ENDPOINT_TIMEOUTS.
+        scheduler (UpstreamScheduler): Rate limiter shared with other
+            clients; by default only 429 answers slow calls down.
+        breakers (CircuitBreakers): Circuit breakers shared with other clients.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None, max_concurrency: int = 200,
+                 max_connections: int = 100, timeout: float = 10.0, connect_timeout: float = 3.05,
+                 endpoint_timeouts: dict = None, scheduler: UpstreamScheduler = None,
+                 breakers: CircuitBreakers = None) -> None:
+        self.api_key = api_key
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.scheduler = scheduler or UpstreamScheduler()
+        self.breakers = breakers or CircuitBreakers()
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.endpoint_timeouts = ENDPOINT_TIMEOUTS if endpoint_timeouts is None else endpoint_timeouts
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    async def get(self, path: str, params: dict = None, timeout: float = None) -> dict:
+        """
+        Issue a GET against the TMDB API and return the decoded JSON body.
+
+        Args:
+            path (str): Endpoint path relative to the base URL.
+            params (dict): Query parameters; the API key is added automatically.
+            timeout (float): Read timeout in seconds; defaults to the endpoint's.
+
+        Returns:
+            dict: The decoded JSON response.
+
+        Raises:
+            httpx.HTTPStatusError: If TMDB answers with an error status.
+            httpx.TimeoutException: If the call exceeds its timeout.
+            UpstreamRateLimited: If the rate limit leaves no slot in time,
+                or TMDB still answers 429 after the scheduler's retries.
+            UpstreamUnavailable: If the endpoint's circuit is open.
+        """
+        endpoint = path_template(path)
+        breaker = self.breakers.get(endpoint)
+        timeout = timeout or self.endpoint_timeouts.get(endpoint, self.timeout)
+        with span(f"GET {endpoint}"):
+            attempt = 0
+            while True:
+                breaker.before_call()
+                try:
+                    # Waits on the caller's loop, where the caller's priority is known
+                    await self.scheduler.acquire_async()
+                    future = asyncio.run_coroutine_threadsafe(self._get(path, params, timeout), self._ensure_loop())
+                    response = await asyncio.wrap_future(future)
+                except BaseException as e:
+                    breaker.record_error(e)
+                    raise
+                breaker.record_status(response.status_code)
+                if response.status_code != 429:
+                    break
+                self.scheduler.throttled(attempt, response.headers.get("Retry-After"))
+                attempt += 1
+            response.raise_for_status()
+            # Decoded by the caller, off the shared loop thread
+            with span("decode"):
+                return response.json()
+
+    def close(self) -> None:
+        """Close the connection pool and stop the background loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+    async def _get(self, path, params, timeout):
+        # Already loaded by _setup
+        import httpx
+
+        query = {"api_key": self.api_key}
+        query.update(params or {})
+        async with self._semaphore:
+            # Timed from when a slot is free, so waiting on the semaphore isn't blamed on TMDB
+            started = time.perf_counter()
+            try:
+                response = await self._client.get(f"{self.base_url}{path}", params=query,
+                                                  timeout=httpx.Timeout(timeout, connect=self.connect_timeout))
+            except Exception:
+                _record_upstream(path, "error", started)
+                raise
+        _record_upstream(path, str(response.status_code), started)
+        return response
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="tmdb-async", daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _setup(self):
+        # Imported here so processes that never make an async call skip loading httpx
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.max_connections,
+                              max_keepalive_connections=self.max_connections)
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        self._client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+
+_client = None
+_async_client = None
+_scheduler = None
+_breakers = None
+_client_lock = threading.Lock()
+
+
+def _shared_scheduler() -> UpstreamScheduler:
+    """Return the rate limiter of the process-wide clients; called with _client_lock held."""
+    global _scheduler
+    if _scheduler is None:
+        # One bucket for both clients, sized to the API key's quota
+        _scheduler = UpstreamScheduler(
+            rate=float(os.getenv("TMDB_RATE_LIMIT", "40")),
+            burst=int(os.getenv("TMDB_RATE_BURST", "40")),
+            max_delay=float(os.getenv("TMDB_MAX_QUEUE_DELAY", "10")),
+            max_retries=int(os.getenv("TMDB_MAX_RETRIES", "3")),
+        )
+    return _scheduler
+
+
+def _shared_breakers() -> CircuitBreakers:
+    """Return the circuit breakers of the process-wide clients; called with _client_lock held."""
+    global _breakers
+    if _breakers is None:
+        _breakers = CircuitBreakers(
+            failure_threshold=int(os.getenv("TMDB_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("TMDB_BREAKER_COOLDOWN", "30")),
+        )
+    return _breakers
+
+
+def _timeouts() -> dict:
+    """Return the timeout arguments of the process-wide clients, read from the environment."""
+    return {
+        "timeout": float(os.getenv("TMDB_TIMEOUT", "10")),
+        "connect_timeout": float(os.getenv("TMDB_CONNECT_TIMEOUT", "3.05")),
+        "endpoint_timeouts": {**ENDPOINT_TIMEOUTS, **parse_endpoint_timeouts(os.getenv("TMDB_ENDPOINT_TIMEOUTS"))},
+    }
+
+
+def _circuit_states():
+    breakers = _breakers
+    if breakers is None:
+        return {}
+    return {(endpoint,): float(state != CLOSED) for endpoint, state in breakers.states().items()}
+
+
+registry.callback("tmdb_circuit_open", "1 while calls to a TMDB endpoint fail fast, else 0.",
+                  "gauge", ("endpoint",), _circuit_states)
+
+
+def get_client() -> TMDBClient:
+    """Return the process-wide TMDB client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # The API key may come from .env; read it only once a client is needed
+                load_dotenv()
+                _client = TMDBClient(
+                    api_key=os.getenv("TMDB_KEY"),
+                    base_url=os.getenv("TMDB_BASE_URL"),
+                    pool_connections=int(os.getenv("TMDB_POOL_CONNECTIONS", "4")),
+                    pool_maxsize=int(os.getenv("TMDB_POOL_MAXSIZE", "32")),
+                    **_timeouts(),
+                    scheduler=_shared_scheduler(),
+                    breakers=_shared_breakers(),
+                )
+    return _client
+
+
+def set_client(client: TMDBClient) -> None:
+    """Replace the process-wide TMDB client, e.g. to point at a local stand-in."""
+    global _client
+    with _client_lock:
+        if _client is not None and _client is not client:
+            _client.close()
+        _client = client
+
+
+def get_async_client() -> AsyncTMDBClient:
+    """Return the process-wide asyncio TMDB client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                load_dotenv()
+                _async_client = AsyncTMDBClient(
+                    api_key=os.getenv("TMDB_KEY"),
+                    base_url=os.getenv("TMDB_BASE_URL"),
+                    max_concurrency=int(os.getenv("TMDB_MAX_CONCURRENCY", "200")),
+                    max_connections=int(os.getenv("TMDB_ASYNC_MAX_CONNECTIONS", "100")),
+                    **_timeouts(),
+                    scheduler=_shared_scheduler(),
+                    breakers=_shared_breakers(),
+                )
+    return _async_client
+
+
+def set_async_client(client: AsyncTMDBClient) -> None:
+    """Replace the process-wide asyncio TMDB client."""
+    global _async_client
+    with _client_lock:
+        if _async_client is not None and _async_client is not client:
+            _async_client.close()
+        _async_client = client
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+``python app.py`` runs Flask's single-process debug server and is meant
+for development only.
+"""
+from app import create_app
+
+app = create_app()